@@ -1,27 +1,56 @@
 #!/usr/bin/env python
 # coding=utf-8
+import hmac
+import io
+import json
 import os
-import pandas as pd
+import time
+import zipfile
+import click
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, date, timedelta
-from functools import wraps
+from functools import wraps, lru_cache
 from os import environ as env
-from werkzeug.exceptions import HTTPException
+from werkzeug.exceptions import HTTPException, BadRequest, Forbidden, NotFound, ServiceUnavailable
+from werkzeug.utils import secure_filename
 import dominate.tags as html
 from dotenv import load_dotenv, find_dotenv
 from flask import Flask
+from flask import Response
 from flask import jsonify
 from flask import redirect
 from flask import render_template
 from flask import session
 from flask import url_for
 from flask import request
+from flask import send_file
+from flask import stream_with_context
 from flask_sslify import SSLify
+from jinja2 import FileSystemBytecodeCache
 from authlib.flask.client import OAuth
 from six.moves.urllib.parse import urlencode
 
 import constants
-from utils import delta, cnvt_date
-from workalendar.europe import Switzerland
+from utils import batch_days_between, cnvt_date, days_between
+from assets import Assets, is_stale as assets_are_stale, precompress, precompressed_is_stale
+from calendars import CANTONS, MODES, preload as preload_calendars
+from deadlines import MAX_AMOUNTS, RULES, UNITS, due_date
+from documents import TemplateCache, init_worker as init_document_worker, render_batch
+from eu261 import REASONS as FLIGHT_REASONS, AirportIndex, assess, assess_many, assessment_json
+from httpclient import PooledAdapter
+from labourlaw import ABSENCES, PARTIES, Absence, batch_terminations, termination
+from legaldrop import DropStore
+from metrics import Metrics
+from pagecache import PageCache
+from sessions import ServerSideSessionInterface, create_store
+from shab import MAX_LIMIT, ShabIndex
+from tokens import InvalidTokenError, JWKSCache, TokenVerifier
+from tools import TOOLS, render_tool
+from speedlimits import PenaltyRegistry, artifact_is_stale, compile_artifact, spreadsheets
+from speedtickets import TOLERANCES, read_rows, score as score_tickets
+from statutes import StatuteIndex, compile_index as compile_statutes, index_is_stale as statutes_are_stale, \
+    sources as statute_sources
+from watchlists import Watchlists
 
 ENV_FILE = find_dotenv()
 if ENV_FILE:
@@ -44,11 +73,45 @@ app = Flask(__name__,
 app.secret_key = constants.SECRET_KEY
 app.debug = False
 
+# e.g. SESSION_STORE=redis://localhost:6379/0 or SESSION_STORE=memory (single worker only) keeps the
+# session server-side with only its id in the cookie; unset, Flask's signed cookie sessions are used
+if env.get('SESSION_STORE'):
+    app.session_interface = ServerSideSessionInterface(create_store(env.get('SESSION_STORE')))
+
 # sslify = SSLify(app)
 
+# fingerprinted, precompressed copies of public/ under /assets, see `flask build-assets`;
+# templates link them through asset_url('css/webflow.css')
+ASSETS = Assets(os.path.join(app.root_path, 'public'))
+try:
+    ASSETS.build_if_stale()
+except OSError as ex:
+    # e.g. a read-only deployment, the files are served unfingerprinted from /public then
+    app.logger.warning('could not build assets: %s', ex)
+app.jinja_env.globals['asset_url'] = ASSETS.url
+
+# compiled templates are kept on disk, so new workers and restarts load them instead of compiling
+# them again, see warm_up
+JINJA_CACHE_DIR = env.get('JINJA_CACHE_DIR', os.path.join(app.root_path, '_jinja_cache'))
+try:
+    os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(JINJA_CACHE_DIR)
+except OSError as ex:
+    app.logger.warning('no template bytecode cache: %s', ex)
+# the static site in www/ (cf push from there) gets its .gz/.br variants from `flask build-assets`,
+# run before pushing; they are build output and not committed
+WWW_PUBLIC = os.path.join(app.root_path, 'www', 'public')
+
+
+# request, template and computation timings plus error counts of this worker, see /metrics;
+# PROFILE_SLOWEST=N keeps stack samples of the N slowest requests, see /metrics/slowest
+METRICS = Metrics(app, profile_slowest=int(env.get('PROFILE_SLOWEST', 0)))
+
 
 @app.errorhandler(Exception)
 def handle_auth_error(ex):
+    if not isinstance(ex, HTTPException):
+        app.logger.exception(ex)
     response = jsonify(message=repr(ex) + ": " + str(ex))
     response.status_code = (ex.code if isinstance(ex, HTTPException) else 500)
     return response
@@ -56,6 +119,10 @@ def handle_auth_error(ex):
 
 oauth = OAuth(app)
 
+# all calls to Auth0 (token exchange, userinfo, signing keys) go through one keep-alive pool per
+# worker, each with a timeout, so a slow provider costs a login its round-trips but no more;
+# with gevent workers (see gunicorn.conf.py) a waiting call doesn't hold up other requests
+AUTH0_HTTP = PooledAdapter(pool_maxsize=int(env.get('AUTH0_POOL_SIZE', 32)))
 
 auth0 = oauth.register(
     'auth0',
@@ -67,16 +134,37 @@ auth0 = oauth.register(
     client_kwargs={
         'scope': 'openid profile',
     },
+    compliance_fix=AUTH0_HTTP.mount,
 )
 
 
+# ID tokens are verified locally, against the signing keys of the tenant (fetched once and cached)
+TOKENS = TokenVerifier(JWKSCache(AUTH0_BASE_URL + '/.well-known/jwks.json', http=AUTH0_HTTP.session()),
+                       issuer=AUTH0_BASE_URL + '/',
+                       audience=AUTH0_CLIENT_ID)
+
+
+def store_profile(userinfo):
+    # Store the user information in flask session.
+    session[constants.JWT_PAYLOAD] = userinfo
+    session[constants.PROFILE_KEY] = {
+        'user_id': userinfo['sub'],
+        'name': userinfo.get('name', ''),
+        'picture': userinfo.get('picture', '')
+    }
+
+
 def requires_auth(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         # return f(*args, **kwargs)
         if constants.PROFILE_KEY not in session:
-            # Redirect to / home-page here if we don't want to send people straight to the sign-up page
-            return redirect('/login')
+            # a still valid ltjwt cookie restores the profile without asking Auth0
+            try:
+                store_profile(TOKENS.verify(request.cookies.get('ltjwt')))
+            except InvalidTokenError:
+                # Redirect to / home-page here if we don't want to send people straight to the sign-up page
+                return redirect('/login')
         return f(*args, **kwargs)
     return decorated
 
@@ -125,16 +213,19 @@ def home():
 def callback_handling():
     # Handles response from token endpoint
     token = auth0.authorize_access_token()
-    resp = auth0.get('userinfo')
-    userinfo = resp.json()
-
-    # Store the user information in flask session.
-    session[constants.JWT_PAYLOAD] = userinfo
-    session[constants.PROFILE_KEY] = {
-        'user_id': userinfo['sub'],
-        'name': userinfo['name'],
-        'picture': userinfo['picture']
-    }
+    try:
+        # the id_token already carries sub, name and picture
+        userinfo = TOKENS.verify(token.get('id_token'))
+    except InvalidTokenError:
+        userinfo = None
+    if not userinfo or 'name' not in userinfo or 'picture' not in userinfo:
+        resp = auth0.get('userinfo')
+        userinfo = resp.json()
+
+    store_profile(userinfo)
+    # against session fixation, the logged-in session gets a new id (server-side sessions only)
+    if hasattr(session, 'rotate'):
+        session.rotate()
 
     # Store the token as a cookie
     response = redirect('/dashboard')
@@ -151,6 +242,53 @@ def callback_handling():
     return response
 
 
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    return ASSETS.response(filename)
+
+
+@app.cli.command('build-assets')
+@click.option('--check', is_flag=True, help='Only check, exit with 1 if the build is out of date.')
+def build_assets(check):
+    """Fingerprints and precompresses public/, precompresses www/public."""
+    stale = assets_are_stale(ASSETS.root, ASSETS.out) or precompressed_is_stale(WWW_PUBLIC)
+    if check:
+        click.echo('out of date' if stale else 'up to date')
+        raise SystemExit(1 if stale else 0)
+    ASSETS.build_if_stale()
+    click.echo(f'{len(ASSETS.manifest)} assets in {ASSETS.out}')
+    click.echo(f'{precompress(WWW_PUBLIC)} files precompressed in {WWW_PUBLIC}')
+
+
+# the scraper sends `Authorization: Bearer $METRICS_TOKEN`; without a token only direct local
+# requests (a scraper or agent on the same host, not forwarded by a proxy) get the metrics
+METRICS_TOKEN = env.get('METRICS_TOKEN')
+
+
+def require_metrics_access():
+    if METRICS_TOKEN:
+        given = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(given.encode(), f'Bearer {METRICS_TOKEN}'.encode()):
+            raise Forbidden()
+    elif request.remote_addr not in ('127.0.0.1', '::1') or 'X-Forwarded-For' in request.headers:
+        raise Forbidden()
+
+
+@app.route('/metrics')
+def metrics():
+    # every worker answers with its own counters, told apart by their pid label
+    require_metrics_access()
+    return Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/metrics/slowest')
+def metrics_slowest():
+    require_metrics_access()
+    if not METRICS.profile_slowest:
+        raise NotFound()
+    return Response(METRICS.render_slowest(), mimetype='text/plain')
+
+
 @app.route('/dashboard')
 @requires_auth
 def dashboard():
@@ -161,12 +299,35 @@ def dashboard():
                            userinfo=session[constants.PROFILE_KEY])
 
 
+WEEKDAYS = ['Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag', 'Samstag', 'Sonntag']
+
+
+def select_options(choices, selected):
+    # adds an <option> per (value, label) of `choices` to the enclosing dominate element
+    for value, label in choices.items():
+        if value == selected:
+            html.option(label, value=value, selected='selected')
+        else:
+            html.option(label, value=value)
+
+
+# static pages are rendered once and only get the user block filled in per request
+PAGES = PageCache(os.path.join(app.root_path, app.template_folder), dependencies=(ASSETS.manifest_path,))
+
+
+def page_user():
+    # (pageinfo, userinfo) for the header of pages open to everyone
+    if constants.PROFILE_KEY in session:
+        return ({'log_name': 'LogOut', 'log_link': '/logout', 'pic_display': 'block'},
+                session[constants.PROFILE_KEY])
+    return {'log_name': 'LogIn', 'log_link': '/login', 'pic_display': 'none'}, {'picture': ''}
+
+
 ##################################
 #      ALL APPS LINKED HERE      #
 
 
-@app.route('/disclaimer')
-def disclaimer():
+def disclaimer_content():
 
     content = html.div(cls='app-wrapper')
     content.add(html.h1('Disclaimer', cls='serif'))
@@ -192,15 +353,7 @@ def disclaimer():
     content.add(html.span('Im Übrigen gelten die'))
     content.add(html.span(html.a('AGBs', href='/agb')))
 
-    return render_template('generic.html',
-                           appinfo={'external_src': 'https://legaldrop.duckdns.org',  # https://drop.lawyer.tools
-                                    'iframe_height': '1024',
-                                    'iframe_width': '100%'},
-                           pageinfo={'log_name': 'LogOut',
-                                     'log_link': '/logout',
-                                     'pic_display': 'block',
-                                     'content': content},
-                           userinfo=session[constants.PROFILE_KEY])
+    return content
 
 #
 # @app.route('/impressum')
@@ -223,27 +376,17 @@ def disclaimer():
 #                            userinfo=session[constants.PROFILE_KEY])
 
 
-@app.route('/agb')
-def agb():
+def agb_content():
 
     content = html.div(cls='app-wrapper')
     content.add(html.h1('AGB', cls='serif'))
 
-    content.add(html.a('Dokument hier herunterladen', href='/public/data/agb.docx'))
+    content.add(html.a('Dokument hier herunterladen', href=ASSETS.url('data/agb.docx')))
 
-    return render_template('generic.html',
-                           appinfo={'external_src': 'https://legaldrop.duckdns.org',  # https://drop.lawyer.tools
-                                    'iframe_height': '1024',
-                                    'iframe_width': '100%'},
-                           pageinfo={'log_name': 'LogOut',
-                                     'log_link': '/logout',
-                                     'pic_display': 'block',
-                                     'content': content},
-                           userinfo=session[constants.PROFILE_KEY])
+    return content
 
 
-@app.route('/contact')
-def contact():
+def contact_content():
 
     content = html.div()
     content.add(html.h1('Hello', cls='h1 serif'))
@@ -266,55 +409,44 @@ def contact():
             with html.a(cls='team-member-box w-inline-block'):
 
                     with html.div(cls='portrait-image'):
-                        html.img(src='/public/images/portrait_simon.jpg', cls='image')
+                        html.img(src=ASSETS.url('images/portrait_simon.jpg'), cls='image')
                     html.h4('Simon Schnetzler', cls='h4')
                     html.p('Lic. iur. ', cls='p')
             with html.a(cls='team-member-box w-inline-block'):
 
                     with html.div(cls='portrait-image'):
-                        html.img(src='/public/images/portrait_gregor.jpg', cls='image')
+                        html.img(src=ASSETS.url('images/portrait_gregor.jpg'), cls='image')
                     html.h4('Gregor Münch', cls='h4')
                     html.p('Lic. iur. ', cls='p')
             with html.a(cls='team-member-box w-inline-block'):
 
                     with html.div(cls='portrait-image'):
-                        html.img(src='/public/images/portrait_christoph.jpg', cls='image')
+                        html.img(src=ASSETS.url('images/portrait_christoph.jpg'), cls='image')
                     html.h4('Christoph Russ', cls='h4')
                     html.p('Dr. sc. ETH', cls='p')
             with html.a(cls='team-member-box w-inline-block'):
 
                     with html.div(cls='portrait-image'):
-                        html.img(src='/public/images/portrait_christian.jpg', cls='image')
+                        html.img(src=ASSETS.url('images/portrait_christian.jpg'), cls='image')
                     html.h4('Christian Wengert', cls='h4')
                     html.p('Dr. sc. ETH', cls='p')
 
-    return render_template('generic.html',
-                           appinfo={'external_src': 'https://legaldrop.duckdns.org',  # https://drop.lawyer.tools
-                                    'iframe_height': '1024',
-                                    'iframe_width': '100%'},
-                           pageinfo={'log_name': 'LogOut',
-                                     'log_link': '/logout',
-                                     'pic_display': 'block',
-                                     'content': content},
-                           userinfo=session[constants.PROFILE_KEY])
+    return content
 
 
-@app.route('/legaldrop')
-@requires_auth
-def legaldrop():
-    content = html.iframe(src='https://legaldrop.lawyer.tools', height='600', width='100%', frameborder=0)
-
-    return render_template('application.html',
-                           appinfo={'title1': 'Legal',
-                                    'title2': 'Drop',
-                                    'short_text': 'Mit Legal Drop versenden Sie Ihre Daten End-zu-End verschlüsselt an Ihre Klienten.',
-                                    'app_content': content,
-                                    'more_title': 'Volle Sicherheit',
-                                    'more_content': 'Senden Sie Dateien über einen sicheren, privaten und verschlüsselten Link, der automatisch abläuft, damit Ihre Daten nicht für immer im Internet bleiben.'},
-                           pageinfo={'log_name': 'LogOut',
-                                     'log_link': '/logout',
-                                     'pic_display': 'block'},
-                           userinfo=session[constants.PROFILE_KEY])
+@app.route('/disclaimer')
+def disclaimer():
+    return PAGES.response('disclaimer', disclaimer_content, *page_user())
+
+
+@app.route('/agb')
+def agb():
+    return PAGES.response('agb', agb_content, *page_user())
+
+
+@app.route('/contact')
+def contact():
+    return PAGES.response('contact', contact_content, *page_user())
 
 
 @app.route('/datedelta')
@@ -324,14 +456,22 @@ def datedelta():
     args = request.args
     start = args.get('start', '')
     end = args.get('end', '')
-
-    result = delta(start, end)
+    mode = args.get('mode', 'calendar')
+    canton = args.get('canton', 'ZH')
+
+    result = None
+    if mode in MODES and canton in CANTONS:
+        try:
+            with METRICS.timer('datedelta'):
+                result = days_between(start, end, mode=mode, canton=canton)
+        except ValueError as ex:
+            raise BadRequest(str(ex))
     content = html.div(cls='form-block w-form')
-    if result:
+    if result is not None:
 
         with content:
             with html.div(cls='answer w-form'):
-                html.div(f'Anzahl Tage zwischen diesen Daten: {result.days}', cls='h2 white')
+                html.div(f'Anzahl {MODES[mode]} zwischen diesen Daten: {result}', cls='h2 white')
                 html.div()
                 html.div(html.a('Neu berechnen', href='/datedelta', cls='white w--current button'),
                          cls='')
@@ -341,57 +481,175 @@ def datedelta():
         form = content.add(html.form(action='/datedelta', method='GET'))
         with form.add(html.div()):
             html.label('Startdatum', fr='start', cls='formfield-title')
-            html.input(name='start', type='date', value=start, cls='formfield-default w-input',
+            html.input_(name='start', type='date', value=start, cls='formfield-default w-input',
                        placeholder='2018-01-01')
 
         with form.add(html.div()):
             html.label('Enddatum', fr='end', cls='formfield-title')
-            html.input(name='end', type='date', value=end, cls='formfield-default w-input',
+            html.input_(name='end', type='date', value=end, cls='formfield-default w-input',
                        placeholder='2018-01-18')
 
         with form.add(html.div()):
-            html.input('Abschicken', type='submit', cls='button white w-button')
-
-    return render_template('application.html',
-                           appinfo={'app_name': 'APP',
-                                    'app_logo': 'LOGO',
-                                    'title1': 'Date',
-                                    'title2': 'Delta',
-                                    'short_text': 'Datums Delta berechnet die Anzahl Tage zwischen zwei Daten.',
-                                    'app_content': content,
-                                    'more_title': 'Berechnungsformel',
-                                    'more_content': 'Differenz zwischen zwei Daten - ohne Feiertage'},
+            html.label('Zählweise', fr='mode', cls='formfield-title')
+            with html.select(name='mode', cls='formfield-default w-select'):
+                select_options(MODES, mode)
 
-                           pageinfo={'log_name': 'LogOut',
-                                     'log_link': '/logout',
-                                     'pic_display': 'block'},
-                           userinfo=session[constants.PROFILE_KEY])
+        with form.add(html.div()):
+            html.label('Kanton (für Feiertage)', fr='canton', cls='formfield-title')
+            with html.select(name='canton', cls='formfield-default w-select'):
+                select_options(CANTONS, canton)
+
+        with form.add(html.div()):
+            html.input_('Abschicken', type='submit', cls='button white w-button')
+
+    return render_tool(PAGES, 'datedelta', *page_user(), content=content)
+
+
+@app.route('/datedelta/batch', methods=['POST'])
+@requires_auth
+def datedelta_batch():
+    # [{"start": "2018-01-01", "end": "2018-03-01", "canton": "ZH", "mode": "business"}, ...]
+    # answers with one JSON line per row, in order, while the rows are being computed
+    rows = request.get_json(force=True, silent=True)
+    if isinstance(rows, dict):
+        rows = rows.get('rows')
+    if not isinstance(rows, list):
+        raise BadRequest('expected a list of rows')
+
+    def lines():
+        with METRICS.timer('datedelta_batch'):
+            for result in batch_days_between(rows):
+                yield json.dumps(result) + '\n'
+
+    return Response(stream_with_context(lines()), mimetype='application/x-ndjson')
 
 
 @app.route('/duedate')
 @requires_auth
 def duedate():
 
+    args = request.args
+    start = args.get('start', '')
+    amount = args.get('amount', '')
+    unit = args.get('unit', 'days')
+    rule = args.get('rule', 'zpo')
+    canton = args.get('canton', 'ZH')
+
+    trigger = cnvt_date(start)
+    result = None
+    if trigger and amount.isdigit() and unit in UNITS and rule in RULES and canton in CANTONS:
+        if int(amount) > MAX_AMOUNTS[unit]:
+            raise BadRequest(f'Frist zu lang, höchstens {MAX_AMOUNTS[unit]} {UNITS[unit]}')
+        try:
+            with METRICS.timer('duedate'):
+                result = due_date(trigger.date(), int(amount), unit=unit, rule=rule, canton=canton)
+        except ValueError as ex:
+            raise BadRequest(str(ex))
+
     content = html.div(cls='form-block w-form')
-    
-
-    return render_template('application.html',
-                           appinfo={'app_name': 'APP',
-                                    'app_logo': 'LOGO',
-                                    'title1': 'Due',
-                                    'title2': 'Date',
-                                    'short_text': 'Berechnen Sie Ihre Frist in Sekundenschnelle',
-                                    'app_content': content,
-                                    'more_title': 'Berechnungsformel',
-                                    'more_content': 'Siehe die betreffenden Rechtsgrundlagen'},
-                           pageinfo={'log_name': 'LogOut',
-                                     'log_link': '/logout',
-                                     'pic_display': 'block'},
-                           userinfo=session[constants.PROFILE_KEY])
+    if result:
 
+        with content:
+            with html.div(cls='answer w-form'):
+                html.div(f'Fristende: {WEEKDAYS[result.end.weekday()]}, {result.end:%d.%m.%Y}', cls='h2 white')
+                for note in result.notes:
+                    html.div(note, cls='white')
+                html.div()
+                html.div(html.a('Neu berechnen', href='/duedate', cls='white w--current button'),
+                         cls='')
+
+    else:
+
+        form = content.add(html.form(action='/duedate', method='GET'))
+        with form.add(html.div()):
+            html.label('Fristauslösendes Ereignis (z.B. Zustellung)', fr='start', cls='formfield-title')
+            html.input_(name='start', type='date', value=start, cls='formfield-default w-input',
+                       placeholder='2018-01-01')
 
-path = os.path.join(os.path.dirname(__file__), 'data', 'Datensatz High Limits.xlsx')
-SPEED_LIMITS = pd.read_excel(path, index_col=[0, 1])
+        with form.add(html.div()):
+            html.label('Frist', fr='amount', cls='formfield-title')
+            html.input_(name='amount', type='number', min='0', value=amount, cls='formfield-default w-input',
+                       placeholder='30')
+            with html.select(name='unit', cls='formfield-default w-select'):
+                select_options(UNITS, unit)
+
+        with form.add(html.div()):
+            html.label('Verfahren', fr='rule', cls='formfield-title')
+            with html.select(name='rule', cls='formfield-default w-select'):
+                select_options(RULES, rule)
+
+        with form.add(html.div()):
+            html.label('Kanton (Gerichtsort)', fr='canton', cls='formfield-title')
+            with html.select(name='canton', cls='formfield-default w-select'):
+                select_options(CANTONS, canton)
+
+        with form.add(html.div()):
+            html.input_('Abschicken', type='submit', cls='button white w-button')
+
+    return render_tool(PAGES, 'duedate', *page_user(), content=content)
+
+
+# one dataset per canton and effective date, <canton>_<yyyy-mm-dd>.json (see speedlimits.DATASET_RE)
+SPEED_LIMITS_DIR = env.get('SPEED_LIMITS_DIR', os.path.join(os.path.dirname(__file__), 'data', 'speedlimits'))
+# seconds between checks for new or changed datasets, in a background thread of each worker
+# (0: only read when the worker starts)
+SPEED_LIMITS_RELOAD_INTERVAL = float(env.get('SPEED_LIMITS_RELOAD_INTERVAL', 30))
+SPEED_LIMITS_CANTON = 'ZH'
+
+
+@lru_cache(maxsize=None)
+def speed_limit_datasets():
+    # loaded on first use, so importing the app stays cheap
+    registry = PenaltyRegistry(SPEED_LIMITS_DIR)
+    registry.scan()
+    return registry
+
+
+@app.before_request
+def start_speed_limits_watcher():
+    if SPEED_LIMITS_RELOAD_INTERVAL > 0:
+        speed_limit_datasets().start(SPEED_LIMITS_RELOAD_INTERVAL)
+
+
+def speed_limits(canton=SPEED_LIMITS_CANTON, day=''):
+    """The dataset of `canton` in force on `day` (a date as entered, today if empty)."""
+    on = cnvt_date(day) if day else datetime.now()
+    if on is None:
+        raise BadRequest(f'invalid date {day}')
+    try:
+        return speed_limit_datasets().dataset(canton, on.date())
+    except KeyError:
+        raise BadRequest(f'Keine Strafmasstabelle für {canton} am {on:%d.%m.%Y}')
+
+
+@app.cli.command('build-speedlimits')
+@click.option('--check', is_flag=True, help='Only check, exit with 1 if an artifact is out of date.')
+@click.option('--force', is_flag=True, help='Rebuild even if the artifacts are up to date.')
+def build_speedlimits(check, force):
+    """Compiles the speed-limit spreadsheets of SPEED_LIMITS_DIR into their .json artifacts."""
+    stale = [(xlsx, artifact) for xlsx, artifact in spreadsheets(SPEED_LIMITS_DIR)
+             if (force and not check) or artifact_is_stale(xlsx, artifact)]
+    if check:
+        for _, artifact in stale:
+            click.echo(f'out of date: {artifact}')
+        click.echo('out of date' if stale else 'up to date')
+        raise SystemExit(1 if stale else 0)
+    # running workers pick the new artifacts up within SPEED_LIMITS_RELOAD_INTERVAL
+    for xlsx, artifact in stale:
+        compile_artifact(xlsx, artifact)
+        click.echo(f'wrote {artifact}')
+    if not stale:
+        click.echo('up to date')
+
+
+def penalty_json(penalty):
+    if penalty is None:
+        return None
+    return {'band': penalty.band,
+            'consequence': penalty.consequence,
+            'criminal_record': penalty.criminal_record,
+            'criminal_record_text': penalty.criminal_record_text,
+            'source': penalty.source}
 
 
 @app.route('/speedlimits')
@@ -399,141 +657,890 @@ SPEED_LIMITS = pd.read_excel(path, index_col=[0, 1])
 def speedlimits():
     speed = request.args.get('speed', '')
     zone = request.args.get('zone', '')
+    canton = request.args.get('canton', SPEED_LIMITS_CANTON)
+    day = request.args.get('date', '')
 
+    try:
+        speed_value = float(speed)
+    except ValueError:
+        speed_value = None
+
+    dataset = speed_limits(canton, day)
+    table = dataset.table
     content = html.div(cls='form-block w-form')
+    if speed_value is not None and zone in table.zones:
 
-    
-
-    return render_template('application.html',
-                           appinfo={'app_name': 'APP',
-                                    'app_logo': 'LOGO',
-                                    'title1': 'Speed',
-                                    'title2': 'Limits',
-                                    'short_text': 'Was droht Ihrem Klienten bei einer Geschwindigkeitsübertretung',
-                                    'app_content': content,
-                                    'more_title': 'Methodik',
-                                    'more_content': 'Siehe die einschlägigen Rechtsquellen'},
-                           pageinfo={'log_name': 'LogOut',
-                                     'log_link': '/logout',
-                                     'pic_display': 'block'},
-                           userinfo=session[constants.PROFILE_KEY])
+        with METRICS.timer('speedlimits'):
+            penalty = table.lookup(zone, speed_value)
+        with content:
+            with html.div(cls='answer w-form'):
+                if penalty is None:
+                    html.div('Keine Übertretung', cls='h2 white')
+                else:
+                    html.div(penalty.consequence, cls='h2 white')
+                    html.div(f'Strafregistereintrag: {penalty.criminal_record_text}', cls='white')
+                    if penalty.source:
+                        html.div(f'Quelle: {penalty.source}', cls='white')
+                html.div(f'Strafmasstabelle {CANTONS.get(canton, canton)}, gültig ab {dataset.effective:%d.%m.%Y}',
+                         cls='white')
+                html.div()
+                html.div(html.a('Neu berechnen', href='/speedlimits', cls='white w--current button'),
+                         cls='')
 
+    else:
 
-@app.route('/visiblearticle')
-@requires_auth
-def visiblearticle():
-    content = html.iframe(src='https://va.lawyer.tools', height='1024', width='100%', frameborder=0)
-
-    return render_template('application.html',
-                           appinfo={'title1': 'Visible',
-                                    'title2': 'Article',
-                                    'short_text': 'Schnelle Popups von Gesetzestexten bei Ihrer Onlinerecherche',
-                                    'app_content': content,
-                                    'more_title': 'Verlinkte Rechtsquellen',
-                                    'more_content': 'ARG, ATSG, AUG, BGG, BV, BVG, DBG, DSG, INDEX, KVG, MWSTG, OBV, OR, SCHKG, STGB, STPO, SVG, UVG, VRV, VTS, ZGB, ZPO'},
-                           pageinfo={'log_name': 'LogOut',
-                                     'log_link': '/logout',
-                                     'pic_display': 'block'},
-                           userinfo=session[constants.PROFILE_KEY]
-                           )
+        form = content.add(html.form(action='/speedlimits', method='GET'))
+        with form.add(html.div()):
+            html.label('Kanton', fr='canton', cls='formfield-title')
+            with html.select(name='canton', cls='formfield-default w-select'):
+                select_options({name: CANTONS.get(name, name) for name in speed_limit_datasets().cantons}, canton)
+
+        with form.add(html.div()):
+            html.label('Tatdatum (leer: heute)', fr='date', cls='formfield-title')
+            html.input_(name='date', type='date', value=day, cls='formfield-default w-input')
+
+        with form.add(html.div()):
+            html.label('Zone', fr='zone', cls='formfield-title')
+            with html.select(name='zone', cls='formfield-default w-select'):
+                select_options({name: name for name in table.zones}, zone)
+
+        with form.add(html.div()):
+            html.label('Geschwindigkeit (km/h), nach Toleranzabzug', fr='speed', cls='formfield-title')
+            html.input_(name='speed', type='number', min='0', value=speed, cls='formfield-default w-input',
+                       placeholder='12')
+
+        with form.add(html.div()):
+            html.input_('Abschicken', type='submit', cls='button white w-button')
+
+        upload = content.add(html.form(action='/speedlimits/upload', method='POST', enctype='multipart/form-data'))
+        with upload.add(html.div()):
+            html.label('Datei mit Übertretungen (CSV oder XLSX, Spalten Gemessen, Limit und optional Zone, '
+                       'Messart)', fr='file', cls='formfield-title')
+            html.input_(name='file', type='file', accept='.csv,.xlsx', cls='formfield-default w-input')
+
+        with upload.add(html.div()):
+            html.label('Kanton', fr='canton', cls='formfield-title')
+            with html.select(name='canton', cls='formfield-default w-select'):
+                select_options({name: CANTONS.get(name, name) for name in speed_limit_datasets().cantons}, canton)
+
+        with upload.add(html.div()):
+            html.label('Tatdatum (leer: heute)', fr='date', cls='formfield-title')
+            html.input_(name='date', type='date', value=day, cls='formfield-default w-input')
+
+        with upload.add(html.div()):
+            html.label('Messart, wo die Datei keine angibt', fr='method', cls='formfield-title')
+            with html.select(name='method', cls='formfield-default w-select'):
+                select_options({'radar': 'Radar', 'laser': 'Laser'}, 'radar')
+
+        with upload.add(html.div()):
+            html.input_('Auswerten', type='submit', cls='button white w-button')
+
+    return render_tool(PAGES, 'speedlimits', *page_user(), content=content)
 
 
-@app.route('/founderbot')
+@app.route('/speedlimits/upload', methods=['POST'])
 @requires_auth
-def founderbot():
-    content = html.iframe(src='https://gr.lawyer.tools', height='1024', width='100%', frameborder=0)
-
-    return render_template('application.html',
-                           appinfo={'title1': 'Founder',
-                                    'title2': 'Bot',
-                                    'short_text': 'Erstellen der kompletten Gründungsunterlagen mit wenigen Klicks. Bekannt vom Swisslegaltech Hackathon 2017!',
-                                    'app_content': content,
-                                    'more_title': 'Output',
-                                    'more_content': 'Es werden die benötigten Gründungsunterlagen schnell und einfach mit Ihren Eingaben abgemischt'},
-                           pageinfo={'log_name': 'LogOut',
-                                     'log_link': '/logout',
-                                     'pic_display': 'block'},
-                           userinfo=session[constants.PROFILE_KEY])
+def speedlimits_upload():
+    # scores a file of recorded violations, the annotated CSV is streamed back chunk by chunk
+    upload = request.files.get('file')
+    method = request.form.get('method', 'radar')
+    if upload is None or not upload.filename:
+        raise BadRequest('file is required')
+    if method not in TOLERANCES:
+        raise BadRequest(f'unknown method {method}')
+    # one table for the whole file, the one in force on the given day
+    table = speed_limits(request.form.get('canton', SPEED_LIMITS_CANTON), request.form.get('date', '')).table
+    try:
+        header, rows = read_rows(upload.stream, upload.filename)
+        chunks = score_tickets(table, header, rows, method=method)
+    except ValueError as ex:
+        raise BadRequest(str(ex))
+
+    def timed():
+        with METRICS.timer('speedlimits_upload'):
+            yield from chunks
+
+    name = secure_filename(os.path.splitext(upload.filename)[0] + '_bewertet.csv')
+    return Response(stream_with_context(timed()), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename="{name}"'})
+
+
+@app.route('/speedlimits/batch', methods=['POST'])
+@requires_auth
+def speedlimits_batch():
+    # {"zone": "Innerorts", "speeds": [3, 17, 42]} or one zone per speed in "zones", optionally
+    # with "canton" (ZH) and "date" (today) of the table to use
+    data = request.get_json(force=True, silent=True)
+    if not isinstance(data, dict):
+        raise BadRequest('expected an object')
+    zones = data.get('zones', data.get('zone'))
+    speeds = data.get('speeds')
+    if zones is None or not isinstance(speeds, list):
+        raise BadRequest('zone(s) and speeds are required')
+    if not isinstance(zones, str) and not (isinstance(zones, list) and all(isinstance(z, str) for z in zones)):
+        raise BadRequest('zone(s) must be a string or a list of strings')
+    table = speed_limits(str(data.get('canton', SPEED_LIMITS_CANTON)), str(data.get('date', ''))).table
+    unknown = set([zones] if isinstance(zones, str) else zones) - set(table.zones)
+    if unknown:
+        raise BadRequest(f'unknown zone(s): {", ".join(sorted(map(str, unknown)))}')
+
+    try:
+        with METRICS.timer('speedlimits_batch'):
+            penalties = table.lookup_many(zones, speeds)
+    except (TypeError, ValueError) as ex:
+        raise BadRequest(str(ex))
+    return jsonify(results=[penalty_json(p) for p in penalties])
+
+
+AIRPORTS_CSV = os.path.join(os.path.dirname(__file__), 'data', 'airports.csv')
+FLIGHT_KINDS = {'delay': 'Verspätung', 'cancellation': 'Annullierung', 'denied_boarding': 'Nichtbeförderung'}
+
+
+@lru_cache(maxsize=None)
+def airports():
+    return AirportIndex.from_csv(AIRPORTS_CSV)
+
+
+def optional_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
 
 
 @app.route('/flightdelay')
 @requires_auth
 def flightdelay():
-    return render_template('application.html',
-                           appinfo={'app_name': 'APP',
-                                    'app_logo': 'LOGO',
-                                    'title1': 'Flight',
-                                    'title2': 'Delay',
-                                    'more_title': '',
-                                    'more_content': ''},
-                           pageinfo={'log_name': 'LogOut',
-                                     'log_link': '/logout',
-                                     'pic_display': 'block'},
-                           userinfo=session[constants.PROFILE_KEY])
+    args = request.args
+    origin = args.get('origin', '').strip().upper()
+    destination = args.get('destination', '').strip().upper()
+    kind = args.get('kind', 'delay')
+    delay = args.get('delay', '')
+    notice = args.get('notice', '')
+    early = args.get('early', '')
+    late = args.get('late', '')
+    eu_carrier = args.get('eu_carrier') == 'on'
+    extraordinary = args.get('extraordinary') == 'on'
+
+    index = airports()
+    result = None
+    if origin in index and destination in index and kind in FLIGHT_KINDS:
+        with METRICS.timer('flightdelay'):
+            result = assess(index, origin, destination, kind,
+                            delay_minutes=optional_float(delay) or 0,
+                            notice_days=optional_float(notice) or 0,
+                            reroute_departure_early_minutes=optional_float(early),
+                            reroute_arrival_delay_minutes=optional_float(late),
+                            eu_carrier=eu_carrier,
+                            extraordinary=extraordinary)
+
+    content = html.div(cls='form-block w-form')
+    if result:
+
+        with content:
+            with html.div(cls='answer w-form'):
+                if result.eligible:
+                    html.div(f'Ausgleichszahlung: EUR {result.amount_eur:.0f}', cls='h2 white')
+                else:
+                    html.div('Keine Ausgleichszahlung', cls='h2 white')
+                    html.div(FLIGHT_REASONS[result.reason], cls='white')
+                html.div(f'{index.get(origin).city} – {index.get(destination).city}: '
+                         f'{result.distance_km:.0f} km (Grosskreisentfernung)', cls='white')
+                html.div()
+                html.div(html.a('Neu berechnen', href='/flightdelay', cls='white w--current button'),
+                         cls='')
 
+    else:
+
+        form = content.add(html.form(action='/flightdelay', method='GET'))
+        with form.add(html.div()):
+            html.label('Von (IATA-Code)', fr='origin', cls='formfield-title')
+            html.input_(name='origin', type='text', maxlength='3', value=origin, cls='formfield-default w-input',
+                       placeholder='ZRH')
+            html.label('Nach (IATA-Code)', fr='destination', cls='formfield-title')
+            html.input_(name='destination', type='text', maxlength='3', value=destination,
+                       cls='formfield-default w-input', placeholder='JFK')
+
+        with form.add(html.div()):
+            html.label('Ereignis', fr='kind', cls='formfield-title')
+            with html.select(name='kind', cls='formfield-default w-select'):
+                select_options(FLIGHT_KINDS, kind)
+            html.label('Ankunftsverspätung (Minuten)', fr='delay', cls='formfield-title')
+            html.input_(name='delay', type='number', min='0', value=delay, cls='formfield-default w-input',
+                       placeholder='180')
+            html.label('Annullierung angekündigt (Tage vor Abflug)', fr='notice', cls='formfield-title')
+            html.input_(name='notice', type='number', min='0', value=notice, cls='formfield-default w-input',
+                       placeholder='0')
+
+        with form.add(html.div()):
+            html.label('Ersatzflug: Abflug früher (Minuten)', fr='early', cls='formfield-title')
+            html.input_(name='early', type='number', min='0', value=early, cls='formfield-default w-input')
+            html.label('Ersatzflug: Ankunft später (Minuten)', fr='late', cls='formfield-title')
+            html.input_(name='late', type='number', min='0', value=late, cls='formfield-default w-input')
+
+        with form.add(html.div()):
+            html.label('Fluggesellschaft mit Betriebsgenehmigung in der EU/Schweiz', fr='eu_carrier',
+                       cls='formfield-title')
+            if eu_carrier or not args:
+                html.input_(name='eu_carrier', type='checkbox', checked='checked')
+            else:
+                html.input_(name='eu_carrier', type='checkbox')
+            html.label('Aussergewöhnliche Umstände (z.B. Unwetter, Streik der Flugsicherung)', fr='extraordinary',
+                       cls='formfield-title')
+            if extraordinary:
+                html.input_(name='extraordinary', type='checkbox', checked='checked')
+            else:
+                html.input_(name='extraordinary', type='checkbox')
 
-@app.route('/highdrive')
+        with form.add(html.div()):
+            html.input_('Abschicken', type='submit', cls='button white w-button')
+
+    return render_tool(PAGES, 'flightdelay', *page_user(), content=content)
+
+
+@app.route('/flightdelay/batch', methods=['POST'])
 @requires_auth
-def highdrive():
-    return render_template('application.html',
-                           appinfo={'app_name': 'APP',
-                                    'app_logo': 'LOGO',
-                                    'title1': 'High',
-                                    'title2': 'Drive',
-                                    'more_title': '',
-                                    'more_content': ''},
-                           pageinfo={'log_name': 'LogOut',
-                                     'log_link': '/logout',
-                                     'pic_display': 'block'},
-                           userinfo=session[constants.PROFILE_KEY])
+def flightdelay_batch():
+    # {"flights": [{"origin": "ZRH", "destination": "JFK", "kind": "delay", "delay_minutes": 200}, ...]},
+    # optional per flight: notice_days, reroute_departure_early_minutes, reroute_arrival_delay_minutes,
+    # eu_carrier (default true), extraordinary (default false)
+    data = request.get_json(force=True, silent=True) or {}
+    flights = data.get('flights')
+    if not isinstance(flights, list) or not all(isinstance(flight, dict) for flight in flights):
+        raise BadRequest('flights must be a list of objects')
+
+    def column(name, default=None):
+        return [flight.get(name, default) for flight in flights]
+
+    for name in ('eu_carrier', 'extraordinary'):
+        if not all(isinstance(value, bool) for value in column(name, False)):
+            raise BadRequest(f'{name} must be true or false')
+    try:
+        with METRICS.timer('flightdelay_batch'):
+            results = assess_many(airports(), column('origin', ''), column('destination', ''),
+                                  column('kind', 'delay'), column('delay_minutes', 0), column('notice_days', 0),
+                                  column('reroute_departure_early_minutes'), column('reroute_arrival_delay_minutes'),
+                                  column('eu_carrier', True), column('extraordinary', False))
+    except (TypeError, ValueError) as ex:
+        raise BadRequest(str(ex))
+    return jsonify(results=[assessment_json(result) for result in results])
+
+
+LABOUR_ABSENCE_ROWS = 3
+PROBATIONS = {'0': 'keine', '1': '1 Monat', '2': '2 Monate', '3': '3 Monate'}
+NOTICE_MONTHS = dict({'': 'gesetzlich (Art. 335c OR)', '1': '1 Monat'}, **{str(n): f'{n} Monate' for n in range(2, 7)})
 
 
 @app.route('/labourlaw')
 @requires_auth
 def labourlaw():
-    return render_template('application.html',
-                           appinfo={'app_name': 'APP',
-                                    'app_logo': 'LOGO',
-                                    'title1': 'Labour',
-                                    'title2': 'Law',
-                                    'more_title': '',
-                                    'more_content': ''},
-                           pageinfo={'log_name': 'LogOut',
-                                     'log_link': '/logout',
-                                     'pic_display': 'block'},
-                           userinfo=session[constants.PROFILE_KEY])
+
+    args = request.args
+    start = args.get('start', '')
+    notice = args.get('notice', '')
+    by = args.get('by', 'employer')
+    probation = args.get('probation', '1')
+    notice_months = args.get('notice_months', '')
+    end_of_month = 'end_of_month' in args or not args
+
+    result = None
+    dt_start, dt_notice = cnvt_date(start), cnvt_date(notice)
+    if dt_start and dt_notice and by in PARTIES and probation in PROBATIONS and notice_months in NOTICE_MONTHS:
+        absences = []
+        for i in range(LABOUR_ABSENCE_ROWS):
+            first, last = cnvt_date(args.get(f'absence_start_{i}', '')), cnvt_date(args.get(f'absence_end_{i}', ''))
+            if first and last and args.get(f'absence_kind_{i}') in ABSENCES:
+                absences.append(Absence(args[f'absence_kind_{i}'], first.date(), last.date()))
+        try:
+            with METRICS.timer('labourlaw'):
+                result = termination(dt_start.date(), dt_notice.date(), by=by, absences=absences,
+                                     probation_months=int(probation),
+                                     notice_months=int(notice_months) if notice_months else None,
+                                     end_of_month=end_of_month)
+        except ValueError as ex:
+            raise BadRequest(str(ex))
+
+    content = html.div(cls='form-block w-form')
+    if result:
+
+        with content:
+            with html.div(cls='answer w-form'):
+                if result.void:
+                    html.div('Die Kündigung ist nichtig', cls='h2 white')
+                else:
+                    html.div(f'Ende des Arbeitsverhältnisses: {WEEKDAYS[result.end.weekday()]}, '
+                             f'{result.end:%d.%m.%Y}', cls='h2 white')
+                html.div(f'Kündigungsfrist: {result.notice_period}', cls='white')
+                for note in result.notes:
+                    html.div(note, cls='white')
+                for first, last in result.blocking:
+                    html.div(f'Sperrfrist {first:%d.%m.%Y} bis {last:%d.%m.%Y}', cls='white')
+                html.div()
+                html.div(html.a('Neu berechnen', href='/labourlaw', cls='white w--current button'),
+                         cls='')
+
+    else:
+
+        form = content.add(html.form(action='/labourlaw', method='GET'))
+        with form.add(html.div()):
+            html.label('Stellenantritt', fr='start', cls='formfield-title')
+            html.input_(name='start', type='date', value=start, cls='formfield-default w-input',
+                       placeholder='2018-01-01')
+            html.label('Kündigung empfangen am', fr='notice', cls='formfield-title')
+            html.input_(name='notice', type='date', value=notice, cls='formfield-default w-input',
+                       placeholder='2020-03-15')
+
+        with form.add(html.div()):
+            html.label('Kündigung durch', fr='by', cls='formfield-title')
+            with html.select(name='by', cls='formfield-default w-select'):
+                select_options(PARTIES, by)
+            html.label('Probezeit', fr='probation', cls='formfield-title')
+            with html.select(name='probation', cls='formfield-default w-select'):
+                select_options(PROBATIONS, probation)
+
+        with form.add(html.div()):
+            html.label('Vertragliche Kündigungsfrist', fr='notice_months', cls='formfield-title')
+            with html.select(name='notice_months', cls='formfield-default w-select'):
+                select_options(NOTICE_MONTHS, notice_months)
+            html.label('Kündigung nur auf Monatsende', fr='end_of_month', cls='formfield-title')
+            if end_of_month:
+                html.input_(name='end_of_month', type='checkbox', checked='checked')
+            else:
+                html.input_(name='end_of_month', type='checkbox')
+
+        for i in range(LABOUR_ABSENCE_ROWS):
+            with form.add(html.div()):
+                html.label(f'Abwesenheit {i + 1} (von / bis)', fr=f'absence_kind_{i}', cls='formfield-title')
+                with html.select(name=f'absence_kind_{i}', cls='formfield-default w-select'):
+                    select_options(dict({'': '-'}, **ABSENCES), args.get(f'absence_kind_{i}', ''))
+                html.input_(name=f'absence_start_{i}', type='date', value=args.get(f'absence_start_{i}', ''),
+                           cls='formfield-default w-input')
+                html.input_(name=f'absence_end_{i}', type='date', value=args.get(f'absence_end_{i}', ''),
+                           cls='formfield-default w-input')
+
+        with form.add(html.div()):
+            html.input_('Abschicken', type='submit', cls='button white w-button')
+
+    return render_tool(PAGES, 'labourlaw', *page_user(), content=content)
+
+
+@app.route('/labourlaw/batch', methods=['POST'])
+@requires_auth
+def labourlaw_batch():
+    # {"employees": [{"start": "2015-01-01", "notice": "2020-03-15", "by": "employer",
+    #                 "absences": [{"kind": "illness", "start": "2020-04-01", "end": "2020-04-20"}]}, ...]},
+    # optional per employee: probation_months (default 1), notice_months, end_of_month (default true);
+    # employees that cannot be computed get {"error": ...} in their place
+    data = request.get_json(force=True, silent=True) or {}
+    employees = data.get('employees') if isinstance(data, dict) else None
+    if not isinstance(employees, list):
+        raise BadRequest('employees must be a list')
+    with METRICS.timer('labourlaw_batch'):
+        results = list(batch_terminations(employees))
+    return jsonify(results=results)
+
+
+# Fedlex dumps (Akoma Ntoso XML) of the acts in statutes.ACTS, compiled into one index
+# that every worker maps into memory; compiled by `flask build-statutes` or the warm-up
+# in the master, never by a request
+STATUTES_DIR = os.path.join(os.path.dirname(__file__), 'data', 'fedlex')
+STATUTES_INDEX = env.get('STATUTES_INDEX', os.path.join(os.path.dirname(__file__), 'data', 'statutes.idx'))
+
+
+@lru_cache(maxsize=None)
+def statutes():
+    if not os.path.exists(STATUTES_INDEX):
+        raise ServiceUnavailable('Gesetzestexte sind noch nicht verfügbar')
+    return StatuteIndex(STATUTES_INDEX)
+
+
+def warm_statutes(build=True):
+    if build and statute_sources(STATUTES_DIR) and statutes_are_stale(STATUTES_DIR, STATUTES_INDEX):
+        compile_statutes(STATUTES_DIR, STATUTES_INDEX)
+    if os.path.exists(STATUTES_INDEX):
+        statutes()
+
+
+@app.cli.command('build-statutes')
+@click.option('--check', is_flag=True, help='Only check, exit with 1 if the index is out of date.')
+@click.option('--force', is_flag=True, help='Rebuild even if the index is up to date.')
+def build_statutes(check, force):
+    """Compiles the Fedlex dumps in data/fedlex into data/statutes.idx."""
+    stale = statutes_are_stale(STATUTES_DIR, STATUTES_INDEX)
+    if check:
+        click.echo('out of date' if stale else 'up to date')
+        raise SystemExit(1 if stale else 0)
+    if stale or force:
+        click.echo(f'{compile_statutes(STATUTES_DIR, STATUTES_INDEX)} articles written to {STATUTES_INDEX}')
+    else:
+        click.echo('up to date')
+
+
+@app.route('/visiblearticle/article')
+@requires_auth
+def visiblearticle_article():
+    # ?act=OR&article=336c&paragraph=1 (paragraph optional)
+    act = request.args.get('act', '')
+    article = request.args.get('article', '')
+    paragraph = request.args.get('paragraph') or None
+    with METRICS.timer('visiblearticle_article'):
+        text = statutes().lookup(act, article, paragraph)
+    if text is None:
+        raise NotFound(f'{act} {article} nicht gefunden')
+    return jsonify(act=act, article=article, paragraph=paragraph, text=text)
+
+
+@app.route('/visiblearticle/citations', methods=['POST'])
+@requires_auth
+def visiblearticle_citations():
+    # the document as text/plain or {"text": "..."}; answers every citation of a known act
+    # in order with its position, parts and the text it refers to (null if not in the index)
+    if request.is_json:
+        data = request.get_json(silent=True)
+        text = data.get('text') if isinstance(data, dict) else None
+    else:
+        text = request.get_data(as_text=True)
+    if not isinstance(text, str):
+        raise BadRequest('text must be a string')
+    with METRICS.timer('visiblearticle_citations'):
+        citations = statutes().resolve(text)
+    return jsonify(citations=citations)
+
+
+# SHAB dumps (XML) are dropped into SHAB_DIR and indexed with `flask ingest-shab`, e.g. from cron
+SHAB_DIR = env.get('SHAB_DIR', os.path.join(os.path.dirname(__file__), 'data', 'shab'))
+SHAB_INDEX = env.get('SHAB_INDEX', os.path.join(SHAB_DIR, 'index.sqlite'))
+
+
+@lru_cache(maxsize=None)
+def shab_index():
+    os.makedirs(os.path.dirname(SHAB_INDEX), exist_ok=True)
+    return ShabIndex(SHAB_INDEX)
+
+
+@app.cli.command('ingest-shab')
+@click.option('--directory', default=None, help='Directory with the XML dumps, default SHAB_DIR.')
+def ingest_shab(directory):
+    """Adds new and changed SHAB dumps to the search index."""
+    for path, count in shab_index().ingest_directory(directory or SHAB_DIR).items():
+        click.echo(f'{path}: {count} publications added')
+    click.echo('{} publications from {} files in the index'.format(*shab_index().stats()))
+
+
+def shab_search(args):
+    try:
+        limit = max(1, min(int(args.get('limit', 20)), MAX_LIMIT))
+    except ValueError:
+        raise BadRequest('Ungültige Anzahl Resultate')
+    try:
+        return shab_index().search(name=args.get('name', ''), uid=args.get('uid', ''),
+                                   canton=args.get('canton', ''), type=args.get('type', ''),
+                                   date_from=args.get('from', ''), date_to=args.get('to', ''),
+                                   limit=limit, cursor=args.get('cursor') or None)
+    except ValueError as ex:
+        raise BadRequest(str(ex))
 
 
 @app.route('/shabscanner')
 @requires_auth
 def shabscanner():
-    return render_template('application.html',
-                           appinfo={'app_name': 'APP',
-                                    'app_logo': 'LOGO',
-                                    'title1': 'SHAB',
-                                    'title2': 'Scanner',
-                                    'more_title': '',
-                                    'more_content': ''},
-                           pageinfo={'log_name': 'LogOut',
-                                     'log_link': '/logout',
-                                     'pic_display': 'block'},
-                           userinfo=session[constants.PROFILE_KEY])
+    args = request.args
+    name = args.get('name', '')
+    uid = args.get('uid', '')
+    canton = args.get('canton', '')
+
+    content = html.div(cls='form-block w-form')
+    form = content.add(html.form(action='/shabscanner', method='GET'))
+    with form.add(html.div()):
+        html.label('Firma', fr='name', cls='formfield-title')
+        html.input_(name='name', type='text', value=name, cls='formfield-default w-input', placeholder='Muster AG')
+        html.label('UID', fr='uid', cls='formfield-title')
+        html.input_(name='uid', type='text', value=uid, cls='formfield-default w-input', placeholder='CHE-123.456.789')
+
+    with form.add(html.div()):
+        html.label('Kanton', fr='canton', cls='formfield-title')
+        with html.select(name='canton', cls='formfield-default w-select'):
+            select_options(dict({'': 'Alle'}, **CANTONS), canton)
+        html.label('Publikationsart (z.B. HR02)', fr='type', cls='formfield-title')
+        html.input_(name='type', type='text', value=args.get('type', ''), cls='formfield-default w-input')
+
+    with form.add(html.div()):
+        html.label('Publiziert von / bis', fr='from', cls='formfield-title')
+        html.input_(name='from', type='date', value=args.get('from', ''), cls='formfield-default w-input')
+        html.input_(name='to', type='date', value=args.get('to', ''), cls='formfield-default w-input')
+
+    with form.add(html.div()):
+        html.input_('Suchen', type='submit', cls='button white w-button')
+
+    if any(args.get(field) for field in ('name', 'uid', 'canton', 'type', 'from', 'to')):
+        with METRICS.timer('shabscanner'):
+            result = shab_search(args)
+        with content:
+            with html.div(cls='answer w-form'):
+                if not result.publications:
+                    html.div('Keine Publikationen gefunden', cls='h2 white')
+                for publication in result.publications:
+                    with html.div(cls='white'):
+                        html.div(f'{publication["date"]} {publication["type"]} {publication["canton"]}: '
+                                 f'{publication["name"]}', cls='h4')
+                        html.div(publication['title'])
+                        if publication['uid']:
+                            html.div(f'UID {publication["uid"]}, Nr. {publication["number"]}')
+                if result.cursor:
+                    more = dict(args.items(), cursor=result.cursor)
+                    html.div(html.a('Weitere Treffer', href='/shabscanner?' + urlencode(more),
+                                    cls='white w--current button'))
+
+    return render_tool(PAGES, 'shabscanner', *page_user(), content=content)
+
+
+@app.route('/shabscanner/search')
+@requires_auth
+def shabscanner_search():
+    # same parameters as /shabscanner plus limit (max 100); pass the returned cursor for the next page
+    with METRICS.timer('shabscanner'):
+        result = shab_search(request.args)
+    return jsonify(publications=result.publications, cursor=result.cursor)
+
+
+# watchlists and their hits live next to the SHAB index; new publications are matched
+# by `flask watchdog-scan`, from cron or as one process with --every, never in the web
+# workers
+WATCHDOG_DB = env.get('WATCHDOG_DB', os.path.join(SHAB_DIR, 'watchdog.sqlite'))
+WATCH_KINDS = {'name': 'Firmen', 'uid': 'UIDs', 'person': 'Personen'}
 
 
-@app.route('/watchdog')
+@lru_cache(maxsize=None)
+def watchlists():
+    os.makedirs(os.path.dirname(WATCHDOG_DB), exist_ok=True)
+    return Watchlists(WATCHDOG_DB)
+
+
+@app.cli.command('watchdog-scan')
+@click.option('--every', type=float, default=0, help='Keep scanning every so many seconds, until interrupted.')
+def watchdog_scan(every):
+    """Matches the publications ingested since the last scan against all watchlists."""
+    if every > 0:
+        watchlists().watch(shab_index(), every)
+        return
+    with METRICS.timer('watchdog_scan'):
+        scanned, hits = watchlists().scan(shab_index())
+    click.echo(f'{scanned} publications scanned, {hits} hits')
+
+
+@app.route('/watchdog', methods=['GET', 'POST'])
 @requires_auth
 def watchdog():
-    return render_template('application.html',
-                           appinfo={'app_name': 'APP',
-                                    'app_logo': 'LOGO',
-                                    'title1': 'Watch',
-                                    'title2': 'Dog',
-                                    'more_title':'',
-                                    'more_content': ''},
-                           pageinfo={'log_name': 'LogOut',
-                                     'log_link': '/logout',
-                                     'pic_display': 'block'},
-                           userinfo=session[constants.PROFILE_KEY])
+    user = session[constants.PROFILE_KEY]['user_id']
+    if request.method == 'POST':
+        entries = [(kind, line) for kind in WATCH_KINDS for line in request.form.get(kind, '').splitlines()]
+        try:
+            watchlists().add(user, request.form.get('title', '').strip() or 'Watchlist', entries)
+        except ValueError as ex:
+            raise BadRequest(str(ex))
+        return redirect('/watchdog')
+
+    content = html.div(cls='form-block w-form')
+    form = content.add(html.form(action='/watchdog', method='POST'))
+    with form.add(html.div()):
+        html.label('Name der Watchlist', fr='title', cls='formfield-title')
+        html.input_(name='title', type='text', cls='formfield-default w-input', placeholder='Mandanten')
+    for kind, label in WATCH_KINDS.items():
+        with form.add(html.div()):
+            html.label(f'{label} (eine pro Zeile)', fr=kind, cls='formfield-title')
+            html.textarea(name=kind, cls='formfield-default w-input')
+    with form.add(html.div()):
+        html.input_('Watchlist anlegen', type='submit', cls='button white w-button')
+
+    with content:
+        with html.div(cls='answer w-form'):
+            for watchlist in watchlists().watchlists(user):
+                with html.div(cls='white'):
+                    html.div(watchlist['name'], cls='h4')
+                    html.div(', '.join(entry['value'] for entry in watchlist['entries']))
+                    with html.form(action=f'/watchdog/{watchlist["id"]}/delete', method='POST'):
+                        html.input_('Löschen', type='submit', cls='button white w-button')
+            hits = watchlists().hits(user)
+            html.div('Treffer' if hits else 'Noch keine Treffer, neue Publikationen werden laufend geprüft',
+                     cls='h2 white')
+            for hit in hits:
+                with html.div(cls='white'):
+                    html.div(f'{hit["date"]} {hit["type"]}: {hit["name"]}', cls='h4')
+                    html.div(hit['title'])
+                    html.div(f'{hit["watchlist"]}: {hit["entries"]}, Nr. {hit["number"]}')
+
+    return render_tool(PAGES, 'watchdog', *page_user(), content=content)
+
+
+@app.route('/watchdog/<int:watchlist>/delete', methods=['POST'])
+@requires_auth
+def watchdog_delete(watchlist):
+    if not watchlists().delete(session[constants.PROFILE_KEY]['user_id'], watchlist):
+        raise NotFound()
+    return redirect('/watchdog')
+
+
+# LEGALDROP_DIR set: Legal Drop runs on premise instead of embedding legaldrop.lawyer.tools.
+# Files are encrypted in the browser (public/js/legaldrop.js) and stored there as chunks;
+# expired drops are deleted every LEGALDROP_SWEEP_INTERVAL seconds (0: only by `flask sweep-drops`)
+LEGALDROP_DIR = env.get('LEGALDROP_DIR')
+LEGALDROP_SWEEP_INTERVAL = float(env.get('LEGALDROP_SWEEP_INTERVAL', 600))
+LEGALDROP_CHUNK_SIZE = 4 << 20
+LEGALDROP_DAYS = {'1': '1 Tag', '7': '7 Tage', '14': '14 Tage', '30': '30 Tage'}
+if LEGALDROP_DIR:
+    TOOLS['legaldrop'] = TOOLS['legaldrop']._replace(iframe=None)
+
+
+@lru_cache(maxsize=None)
+def drops():
+    if not LEGALDROP_DIR:
+        raise NotFound()
+    return DropStore(LEGALDROP_DIR)
+
+
+def drop_call(function, *args):
+    # unknown and expired drops look the same to the client
+    try:
+        return function(*args)
+    except KeyError:
+        raise NotFound('Link abgelaufen oder unbekannt')
+    except PermissionError:
+        raise Forbidden()
+    except ValueError as ex:
+        raise BadRequest(str(ex))
+
+
+@app.before_request
+def start_drop_sweeper():
+    if LEGALDROP_DIR and LEGALDROP_SWEEP_INTERVAL > 0:
+        drops().start(LEGALDROP_SWEEP_INTERVAL)
+
+
+@app.cli.command('sweep-drops')
+def sweep_drops():
+    """Deletes the expired Legal Drop uploads."""
+    click.echo(f'{drops().sweep()} expired drops deleted')
+
+
+def legaldrop_page(mode, drop=''):
+    content = html.div(cls='form-block w-form', id='legaldrop', data_mode=mode, data_drop=drop,
+                       data_chunk_size=str(LEGALDROP_CHUNK_SIZE))
+    with content:
+        if mode == 'upload':
+            with html.div():
+                html.label('Datei', fr='file', cls='formfield-title')
+                html.input_(name='file', id='file', type='file', cls='formfield-default w-input')
+                html.label('Link gültig für', fr='days', cls='formfield-title')
+                with html.select(name='days', id='days', cls='formfield-default w-select'):
+                    select_options(LEGALDROP_DAYS, '7')
+            html.div(html.input_(type='button', value='Verschlüsseln und hochladen', id='send',
+                                cls='button white w-button'))
+        else:
+            html.div(html.input_(type='button', value='Herunterladen und entschlüsseln', id='send',
+                                cls='button white w-button'))
+        with html.div(cls='answer w-form'):
+            html.div(id='status', cls='h2 white')
+            html.div(id='link', cls='white')
+        html.script(src=ASSETS.url('js/legaldrop.js'))
+    return content
+
+
+@app.route('/legaldrop')
+@requires_auth
+def legaldrop():
+    if not LEGALDROP_DIR:
+        return render_tool(PAGES, 'legaldrop', *page_user())
+    return render_tool(PAGES, 'legaldrop', *page_user(), content=legaldrop_page('upload'))
+
+
+@app.route('/legaldrop/d/<drop>')
+def legaldrop_download(drop):
+    # open to the recipients; the key is in the fragment of the link and never reaches the server
+    drop_call(drops().info, drop)
+    return render_tool(PAGES, 'legaldrop', *page_user(), content=legaldrop_page('download', drop))
+
+
+@app.route('/legaldrop/drops', methods=['POST'])
+@requires_auth
+def legaldrop_create():
+    # {"size": bytes, "chunk_size": bytes, "days": 1-30, "metadata": "encrypted file name"};
+    # the token is needed for the uploads and is only returned here
+    store = drops()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise BadRequest('expected a JSON object')
+    try:
+        args = (session[constants.PROFILE_KEY]['user_id'], int(data.get('size')),
+                int(data.get('chunk_size', LEGALDROP_CHUNK_SIZE)), int(data.get('days', 7)),
+                str(data.get('metadata', '')))
+    except (TypeError, ValueError):
+        raise BadRequest('size, chunk_size and days must be numbers')
+    drop, token, info = drop_call(store.create, *args)
+    response = jsonify(dict(info, id=drop, token=token, link=f'/legaldrop/d/{drop}'))
+    response.status_code = 201
+    return response
+
+
+@app.route('/legaldrop/drops/<drop>/chunks/<int:index>', methods=['PUT'])
+def legaldrop_upload(drop, index):
+    # the encrypted chunk as the raw body, streamed to disk; authorised by the X-Drop-Token header
+    with METRICS.timer('legaldrop_upload'):
+        drop_call(drops().write_chunk, drop, request.headers.get('X-Drop-Token', ''), index, request.stream,
+                  request.content_length)
+    return '', 204
+
+
+@app.route('/legaldrop/drops/<drop>/complete', methods=['POST'])
+def legaldrop_complete(drop):
+    return jsonify(drop_call(drops().complete, drop, request.headers.get('X-Drop-Token', '')))
+
+
+@app.route('/legaldrop/drops/<drop>', methods=['GET', 'DELETE'])
+def legaldrop_drop(drop):
+    if request.method == 'DELETE':
+        drop_call(drops().delete, drop, request.headers.get('X-Drop-Token', ''))
+        return '', 204
+    return jsonify(drop_call(drops().info, drop))
+
+
+@app.route('/legaldrop/drops/<drop>/chunks/<int:index>')
+def legaldrop_chunk(drop, index):
+    # sent from the file (sendfile where the server supports it), never read into memory here
+    response = send_file(drop_call(drops().chunk_file, drop, index), mimetype='application/octet-stream',
+                         conditional=True)
+    response.headers['Cache-Control'] = 'private, no-transform'
+    return response
+
+
+# .docx templates with {{ field }} placeholders, compiled once per worker and whenever a file
+# changes; each subdirectory is a package rendered with one set of values (founderbot/: the
+# incorporation documents of an AG). Batches of DOCUMENT_POOL_MIN rows or more are fanned out
+# over DOCUMENT_PROCESSES processes
+DOCUMENTS_DIR = env.get('DOCUMENTS_DIR', os.path.join(os.path.dirname(__file__), 'data', 'documents'))
+DOCUMENT_PROCESSES = int(env.get('DOCUMENT_PROCESSES', os.cpu_count() or 1))
+DOCUMENT_POOL_MIN = 50
+MAX_DOCUMENT_ROWS = 5000
+FOUNDER_FIELDS = {
+    'firma': 'Firma',
+    'sitz': 'Sitz',
+    'zweck': 'Zweck',
+    'kapital': 'Aktienkapital (CHF)',
+    'aktien': 'Anzahl Namenaktien',
+    'nennwert': 'Nennwert je Aktie (CHF)',
+    'verwaltungsrat': 'Verwaltungsrat',
+    'gruender': 'Gründer (einer pro Zeile)',
+    'ort': 'Ort',
+    'datum': 'Datum',
+}
+FOUNDER_TEXTAREAS = ('zweck', 'gruender')
+
+
+@lru_cache(maxsize=None)
+def documents():
+    return TemplateCache(DOCUMENTS_DIR)
+
+
+@lru_cache(maxsize=None)
+def document_pool():
+    # started on the first large batch, in the worker that gets it
+    return ProcessPoolExecutor(DOCUMENT_PROCESSES, initializer=init_document_worker, initargs=(DOCUMENTS_DIR,))
+
+
+def document_fields(package):
+    try:
+        return documents().fields(package)
+    except KeyError:
+        raise NotFound(f'keine Vorlagen für {package}')
+
+
+def send_documents(folders, name):
+    # the documents are zipped already, the archive only stores them
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        for folder, rendered in folders:
+            for filename, data in rendered.items():
+                archive.writestr(f'{folder}/{filename}' if folder else filename, data)
+    buffer.seek(0)
+    return send_file(buffer, mimetype='application/zip', as_attachment=True, download_name=name)
+
+
+def render_documents(package, rows):
+    # file name -> document per row, BadRequest naming the rows that cannot be rendered
+    document_fields(package)
+    pooled = len(rows) >= DOCUMENT_POOL_MIN and DOCUMENT_PROCESSES > 1
+    with METRICS.timer('documents_batch' if pooled else 'documents'):
+        results = list(render_batch(documents(), package, rows, document_pool() if pooled else None,
+                                    DOCUMENT_PROCESSES))
+    errors = [f'Zeile {i + 1}: {result}' for i, result in enumerate(results) if isinstance(result, str)]
+    if errors:
+        raise BadRequest('; '.join(errors[:10]))
+    return results
+
+
+@app.route('/founderbot', methods=['GET', 'POST'])
+@requires_auth
+def founderbot():
+    fields = document_fields('founderbot')
+    if request.method == 'POST':
+        values = {field: request.form.get(field, '').strip() for field in fields}
+        rendered = render_documents('founderbot', [values])[0]
+        return send_documents([('', rendered)], f'Gruendungsunterlagen {secure_filename(values["firma"])}.zip'
+                              if values.get('firma') else 'Gruendungsunterlagen.zip')
+
+    content = html.div(cls='form-block w-form')
+    form = content.add(html.form(action='/founderbot', method='POST'))
+    # in the order of FOUNDER_FIELDS, fields only the templates know at the end
+    for field in [f for f in FOUNDER_FIELDS if f in fields] + [f for f in fields if f not in FOUNDER_FIELDS]:
+        with form.add(html.div()):
+            html.label(FOUNDER_FIELDS.get(field, field), fr=field, cls='formfield-title')
+            if field in FOUNDER_TEXTAREAS:
+                html.textarea(name=field, cls='formfield-default w-input')
+            else:
+                html.input_(name=field, type='text', cls='formfield-default w-input')
+    with form.add(html.div()):
+        html.input_(type='submit', value='Dokumente erstellen', cls='button white w-button')
+    return render_tool(PAGES, 'founderbot', *page_user(), content=content)
+
+
+@app.route('/documents/<package>')
+@requires_auth
+def documents_fields(package):
+    return jsonify(package=package, fields=list(document_fields(package)))
+
+
+@app.route('/documents/<package>', methods=['POST'])
+@requires_auth
+def documents_render(package):
+    # {"rows": [{"firma": "Muster AG", ...}, ...]}: a zip with a folder of documents per row,
+    # or {"values": {...}} for the documents of one row
+    data = request.get_json(force=True, silent=True)
+    if isinstance(data, dict) and isinstance(data.get('values'), dict):
+        return send_documents([('', render_documents(package, [data['values']])[0])], f'{package}.zip')
+    rows = data.get('rows') if isinstance(data, dict) else None
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise BadRequest('rows must be a list of objects')
+    if len(rows) > MAX_DOCUMENT_ROWS:
+        raise BadRequest(f'at most {MAX_DOCUMENT_ROWS} rows')
+    results = render_documents(package, rows)
+    # one folder per row, numbered and named after its first field if there is one
+    fields = document_fields(package)
+    first = fields[0] if fields else None
+    folders = [(f'{i + 1:04d} {secure_filename(str(row.get(first, ""))) if first else ""}'.strip(), rendered)
+               for i, (row, rendered) in enumerate(zip(rows, results))]
+    return send_documents(folders, f'{package}.zip')
+
+
+def tool_view(name):
+    def view():
+        return render_tool(PAGES, name, *page_user())
+    view.__name__ = name
+    return requires_auth(view)
+
+
+# tools without a view of their own just show their page from the registry
+for tool_name in TOOLS:
+    if tool_name not in app.view_functions:
+        app.add_url_rule('/' + tool_name, tool_name, tool_view(tool_name))
 
 #      ALL APPS LINKED HERE      #
 ##################################
@@ -552,6 +1559,58 @@ def logout():
     return response
 
 
+def warm_tool_pages():
+    with app.test_request_context('/'):
+        for name in TOOLS:
+            render_tool(PAGES, name, *page_user())
+        # the static pages, through their views
+        for view in (disclaimer, agb, contact):
+            view()
+
+
+def warm_up(build=True):
+    """
+    Does the work of the first requests ahead of them: compiles every template (into the
+    bytecode cache as well), loads the lookup tables and renders the page shells. With
+    `build` it also compiles a stale statute index, which workers warming up by themselves
+    leave to the master or `flask build-statutes`.
+
+    gunicorn runs it in the master before forking the workers (see gunicorn.conf.py), so
+    they start warm and share this memory copy-on-write. Nothing here opens a connection
+    or starts a thread, those must not cross the fork. Returns the seconds per step.
+    """
+    year = date.today().year
+    steps = {
+        'templates': lambda: [app.jinja_env.get_template(name) for name in app.jinja_env.list_templates(['html'])],
+        'speedlimits': speed_limit_datasets,
+        'calendars': lambda: preload_calendars(year - 5, year + 2),
+        'airports': airports,
+        'statutes': lambda: warm_statutes(build),
+        'documents': lambda: [documents().package(package) for package in sorted(os.listdir(DOCUMENTS_DIR))
+                              if os.path.isdir(os.path.join(DOCUMENTS_DIR, package))],
+        'pages': warm_tool_pages,
+    }
+    timings = {}
+    for name, step in steps.items():
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as ex:
+            # the request that needs it will fail (or succeed) as it would have without the warm-up
+            app.logger.warning('warm-up of %s failed: %s', name, ex)
+        timings[name] = time.perf_counter() - start
+    # the renders of the warm-up are no requests
+    METRICS.reset()
+    return timings
+
+
+@app.cli.command('warm-up')
+def warm_up_command():
+    """Runs the warm-up, e.g. to fill the template bytecode cache at deploy time."""
+    for name, seconds in warm_up().items():
+        click.echo(f'{name:<12} {seconds * 1000:8.1f} ms')
+
+
 if __name__ == "__main__":
     # app.run(host='0.0.0.0', port=env.get('PORT', 3000))
     app.run(host='0.0.0.0', port='3000')
@@ -0,0 +1,200 @@
+# coding=utf-8
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+from typing import Dict, Iterator, Optional
+
+from flask import request, send_file
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # no .br variants then, clients get gzip
+    brotli = None
+
+MANIFEST = 'manifest.json'
+# text formats worth compressing, the images are compressed already
+COMPRESSIBLE = {'.css', '.js', '.svg', '.ico', '.html', '.json', '.txt'}
+# precompressed variants in order of preference: (suffix, Content-Encoding)
+ENCODINGS = (('.br', 'br'), ('.gz', 'gzip'))
+ONE_YEAR = 365 * 24 * 3600
+
+_CSS_URL_RE = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def _files(root: str, skip: Optional[str] = None) -> Iterator[str]:
+    """Paths relative to `root` (with /) of the files below it, without compressed variants."""
+    for directory, dirs, names in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if os.path.join(directory, d) != skip)
+        for name in sorted(names):
+            if not name.endswith(('.gz', '.br', '.tmp')):
+                yield os.path.relpath(os.path.join(directory, name), root).replace(os.sep, '/')
+
+
+def _write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _compress(path: str, data: bytes) -> None:
+    """Writes path.gz (and path.br) if compressing `data` saves anything."""
+    variants = {'.gz': gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(data):
+            _write(path + suffix, compressed)
+        elif os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def _rewrite_css(path: str, data: bytes, manifest: Dict[str, str]) -> bytes:
+    """Points relative url() references of the stylesheet at `path` to their fingerprinted names."""
+    directory = posixpath.dirname(path)
+
+    def replace(match):
+        url = match.group(2)
+        if ':' in url or url.startswith(('/', '#')) or '?' in url or '#' in url:
+            return match.group(0)
+        hashed = manifest.get(posixpath.normpath(posixpath.join(directory, url)))
+        if hashed is None:
+            return match.group(0)
+        return f'url({match.group(1)}{posixpath.relpath(hashed, directory or ".")}{match.group(1)})'
+
+    return _CSS_URL_RE.sub(replace, data.decode('utf-8')).encode('utf-8')
+
+
+def build(root: str, out: str) -> Dict[str, str]:
+    """
+    Copies every file below `root` to `out` under a content-hashed name
+    (css/webflow.css -> css/webflow.3f9c2a1b7d4e.css), with .gz/.br variants of the
+    compressible ones, and writes the manifest mapping the one to the other.
+    Stylesheets come last, so their url() references can be rewritten first.
+    """
+    manifest = {}
+    for path in sorted(_files(root, skip=out), key=lambda path: path.endswith('.css')):
+        with open(os.path.join(root, path), 'rb') as f:
+            data = f.read()
+        if path.endswith('.css'):
+            data = _rewrite_css(path, data, manifest)
+        stem, ext = posixpath.splitext(path)
+        manifest[path] = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+        target = os.path.join(out, manifest[path])
+        _write(target, data)
+        if ext.lower() in COMPRESSIBLE:
+            _compress(target, data)
+
+    # drop what earlier builds left behind
+    current = set(manifest.values())
+    for path in list(_files(out)):
+        if path != MANIFEST and path not in current:
+            for suffix in ('', '.gz', '.br'):
+                if os.path.exists(os.path.join(out, path + suffix)):
+                    os.remove(os.path.join(out, path + suffix))
+    _write(os.path.join(out, MANIFEST), json.dumps(manifest, indent=1, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+def _uncompressed(root: str) -> Iterator[str]:
+    """The compressible files below `root` whose .gz variant is missing or older than the file."""
+    for path in _files(root):
+        if posixpath.splitext(path)[1].lower() in COMPRESSIBLE:
+            path = os.path.join(root, path)
+            if not os.path.exists(path + '.gz') or os.stat(path + '.gz').st_mtime < os.stat(path).st_mtime:
+                yield path
+
+
+def precompress(root: str) -> int:
+    """
+    Writes .gz/.br variants next to the compressible files below `root` that changed,
+    for sites served by a web server that picks them up by itself (nginx gzip_static).
+    Returns the number of files compressed.
+    """
+    count = 0
+    for path in list(_uncompressed(root)):
+        with open(path, 'rb') as f:
+            _compress(path, f.read())
+        count += 1
+    return count
+
+
+def precompressed_is_stale(root: str) -> bool:
+    return next(_uncompressed(root), None) is not None
+
+
+def is_stale(root: str, out: str) -> bool:
+    """True if there is no build in `out` or a file below `root` changed since."""
+    try:
+        built = os.stat(os.path.join(out, MANIFEST)).st_mtime
+    except OSError:
+        return True
+    return any(os.stat(os.path.join(root, path)).st_mtime > built for path in _files(root, skip=out))
+
+
+class Assets(object):
+    """
+    The fingerprinted build of the static folder: `url` maps a path below it to its
+    fingerprinted URL (or the plain static URL while there is no build), `response`
+    sends a fingerprinted file, precompressed if the client accepts that, cacheable
+    for a year without revalidation.
+    """
+
+    def __init__(self, root: str, url_path: str = '/assets', static_url_path: str = '/public',
+                 out: Optional[str] = None):
+        self.root = root
+        self.out = out or os.path.join(root, '_assets')
+        self.manifest_path = os.path.join(self.out, MANIFEST)
+        self.url_path = url_path
+        self.static_url_path = static_url_path
+        self._manifest = {}  # type: Dict[str, str]
+        self._mtime = None
+
+    def build_if_stale(self) -> bool:
+        if not is_stale(self.root, self.out):
+            return False
+        build(self.root, self.out)
+        return True
+
+    @property
+    def manifest(self) -> Dict[str, str]:
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime
+        except OSError:
+            return {}
+        if mtime != self._mtime:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self._manifest = json.load(f)
+            self._mtime = mtime
+        return self._manifest
+
+    def url(self, path: str) -> str:
+        hashed = self.manifest.get(path)
+        if hashed is None:
+            return f'{self.static_url_path}/{path}'
+        return f'{self.url_path}/{hashed}'
+
+    def response(self, filename: str):
+        path = safe_join(self.out, filename)
+        if path is None or filename == MANIFEST or not os.path.isfile(path):
+            raise NotFound()
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        # send_file hands the file to wsgi.file_wrapper, i.e. sendfile(2) under gunicorn
+        for suffix, encoding in ENCODINGS:
+            if request.accept_encodings[encoding] and os.path.isfile(path + suffix):
+                response = send_file(path + suffix, mimetype=mimetype, max_age=ONE_YEAR)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_file(path, mimetype=mimetype, max_age=ONE_YEAR)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        response.vary.add('Accept-Encoding')
+        return response
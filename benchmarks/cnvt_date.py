@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Micro-benchmark of utils.cnvt_date against the former strptime implementation.
+
+    python benchmarks/cnvt_date.py [--number 200000]
+
+'repeated' parses the same few dates over and over (form submissions, bulk rows
+sharing dates), 'distinct' parses a new date every time, 'invalid' is garbage.
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import _parse_date, cnvt_date  # noqa: E402
+
+
+def cnvt_date_strptime(date_str, fmt='%Y-%m-%d'):
+    try:
+        date_str = datetime.strptime(date_str, fmt)
+    except ValueError:
+        date_str = None
+    return date_str
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=200000)
+    args = parser.parse_args()
+
+    start = date(1990, 1, 1)
+    distinct = [(start + timedelta(days=i)).isoformat() for i in range(args.number)]
+    inputs = {
+        'repeated': ['2018-01-01', '2018-09-18', '2019-12-31', '2020-02-29'] * (args.number // 4),
+        'distinct': distinct,
+        'invalid': ['2018-02-30', 'morgen', '', '2018-13-01'] * (args.number // 4),
+    }
+
+    print(f'{"input":<10}{"strptime (us)":>15}{"cnvt_date (us)":>16}{"speed-up":>10}')
+    for name, values in inputs.items():
+        _parse_date.cache_clear()
+        old = timeit.timeit(lambda: [cnvt_date_strptime(v) for v in values], number=1)
+        new = timeit.timeit(lambda: [cnvt_date(v) for v in values], number=1)
+        n = len(values)
+        print(f'{name:<10}{old / n * 1e6:>15.2f}{new / n * 1e6:>16.2f}{old / new:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
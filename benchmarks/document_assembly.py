@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Document assembly from .docx templates: compiling a template, rendering one document
+with the compiled template against the naive way (unzip, replace in every XML part,
+zip everything again), and incorporation packages per minute for a batch rendered in
+one process and fanned out over a process pool.
+
+    python benchmarks/document_assembly.py [--rows 1000] [--processes 4] [--paragraphs 400]
+
+--paragraphs sets the length of the synthetic contract rendered next to the founderbot
+package in data/documents.
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from documents import PLACEHOLDER_RE, TemplateCache, compile_template, init_worker, render_batch  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DOCUMENTS = os.path.join(ROOT, 'data', 'documents')
+VALUES = {'firma': 'Muster & Partner AG', 'sitz': 'Zürich', 'zweck': 'Beratung im Bereich Software.\nHandel.',
+          'kapital': "100'000", 'aktien': 100, 'nennwert': 1000, 'verwaltungsrat': 'Anna Muster',
+          'gruender': 'Anna Muster\nBeat Beispiel', 'ort': 'Zürich', 'datum': '1. März 2026'}
+
+
+def contract(source, path, paragraphs):
+    # a long contract with a placeholder in every paragraph, half of them split over two runs
+    # the way Word stores text typed in several goes
+    with zipfile.ZipFile(source) as docx:
+        document = docx.read('word/document.xml').decode('utf-8')
+        head, tail = document.split('<w:body>', 1)
+        body = []
+        for i in range(paragraphs):
+            field = list(VALUES)[i % len(VALUES)]
+            placeholder = f'{{{{ {field} }}}}'
+            if i % 2:
+                placeholder = f'{placeholder[:5]}</w:t></w:r><w:r><w:rPr><w:b/></w:rPr><w:t>{placeholder[5:]}'
+            body.append(f'<w:p><w:r><w:t xml:space="preserve">Ziffer {i + 1}. Die Parteien vereinbaren mit Bezug '
+                        f'auf {placeholder} die folgenden Bestimmungen.</w:t></w:r></w:p>')
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as out:
+            for info in docx.infolist():
+                data = docx.read(info)
+                if info.filename == 'word/document.xml':
+                    data = (head + '<w:body>' + ''.join(body) + tail).encode('utf-8')
+                out.writestr(zipfile.ZipInfo(info.filename, info.date_time), data, compress_type=zipfile.ZIP_DEFLATED)
+
+
+def naive(path, values):
+    # what rendering costs without compiling: every part read, searched and compressed again
+    # (and placeholders split over runs are not even found)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(path) as source, zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as out:
+        for info in source.infolist():
+            data = source.read(info)
+            if info.filename.endswith('.xml'):
+                data = PLACEHOLDER_RE.sub(lambda m: str(values.get(m.group(1), m.group(0))), data.decode('utf-8'))
+            out.writestr(info.filename, data)
+    return buffer.getvalue()
+
+
+def per_second(function, seconds=1.0):
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        function()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--paragraphs', type=int, default=400)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copytree(os.path.join(DOCUMENTS, 'founderbot'), os.path.join(tmp, 'founderbot'))
+        os.mkdir(os.path.join(tmp, 'vertrag'))
+        path = os.path.join(tmp, 'vertrag', 'vertrag.docx')
+        contract(os.path.join(tmp, 'founderbot', 'statuten.docx'), path, args.paragraphs)
+
+        for name in ('founderbot/statuten.docx', 'vertrag/vertrag.docx'):
+            template_path = os.path.join(tmp, name)
+            start = time.perf_counter()
+            template = compile_template(template_path)
+            compiled = (time.perf_counter() - start) * 1000
+            print(f'{name}: {os.path.getsize(template_path) / 1024:.0f} KiB, {len(template.fields)} fields, '
+                  f'compiled in {compiled:.1f} ms')
+            print(f'  compiled: {per_second(lambda: template.render(VALUES)):,.0f} documents/s, '
+                  f'naive: {per_second(lambda: naive(template_path, VALUES)):,.0f} documents/s')
+
+        cache = TemplateCache(tmp)
+        rows = [dict(VALUES, firma=f'Muster {i} AG') for i in range(args.rows)]
+        for package in ('founderbot', 'vertrag'):
+            start = time.perf_counter()
+            results = list(render_batch(cache, package, rows))
+            single = time.perf_counter() - start
+            assert not any(isinstance(result, str) for result in results)
+            with ProcessPoolExecutor(args.processes, initializer=init_worker, initargs=(tmp,)) as pool:
+                # the processes compile the templates on their first rows, included in the time
+                start = time.perf_counter()
+                results = list(render_batch(cache, package, rows, pool, args.processes))
+                pooled = time.perf_counter() - start
+            assert not any(isinstance(result, str) for result in results)
+            print(f'{package}, {args.rows} packages: one process {args.rows / single * 60:,.0f}/min, '
+                  f'{args.processes} processes {args.rows / pooled * 60:,.0f}/min')
+
+
+if __name__ == '__main__':
+    main()
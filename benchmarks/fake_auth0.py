@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Local fake of the Auth0 endpoints the app talks to (/authorize, /oauth/token,
+/userinfo, /.well-known/jwks.json, /v2/logout), issuing RS256 signed ID tokens.
+Every call can be slowed down by `latency` seconds to play a slow provider.
+
+    python benchmarks/fake_auth0.py [--port 8090] [--latency 0.05]
+
+Point the app at it with AUTH0_BASE_URL=http://127.0.0.1:8090 (and no AUTH0_DOMAIN)
+and AUTHLIB_INSECURE_TRANSPORT=1.
+"""
+import argparse
+import secrets
+import socket
+import threading
+import time
+from urllib.parse import urlencode
+
+from authlib.jose import jwk, jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from flask import Flask, jsonify, redirect, request
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+CLIENT_ID = 'fake-client-id'
+CLIENT_SECRET = 'fake-client-secret'
+
+USER = {
+    'sub': 'auth0|fake-user',
+    'name': 'Erika Mustermann',
+    'nickname': 'erika',
+    'picture': 'https://example.com/erika.png',
+    'updated_at': '2018-09-18T12:00:00.000Z',
+}
+
+
+class QuietHandler(WSGIRequestHandler):
+    # keep-alive, so clients pooling their connections can be told from those that don't; werkzeug
+    # closes every connection because it cannot drain unread request bodies, the fake reads them all
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # headers and body are written separately, don't let Nagle hold the body back on a kept connection
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.fake.connected()
+
+    def send_header(self, keyword, value):
+        if keyword.lower() != 'connection':
+            super().send_header(keyword, value)
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class FakeAuth0(object):
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, client_id: str = CLIENT_ID):
+        self.latency = latency
+        self.client_id = client_id
+        self.calls = {}
+        self.connections = 0
+        self._codes = {}
+        self._lock = threading.Lock()
+        self.rotate_keys()
+
+        self.app = Flask('fake_auth0')
+        self.app.add_url_rule('/authorize', 'authorize', self.authorize)
+        self.app.add_url_rule('/oauth/token', 'token', self.token, methods=['POST'])
+        self.app.add_url_rule('/userinfo', 'userinfo', self.userinfo)
+        self.app.add_url_rule('/.well-known/jwks.json', 'jwks', self.jwks)
+        self.app.add_url_rule('/v2/logout', 'logout', self.logout)
+        self.server = make_server(host, port, self.app, threaded=True, request_handler=QuietHandler)
+        self.server.fake = self
+        self.base_url = f'http://{host}:{self.server.server_port}'
+
+    def start(self) -> 'FakeAuth0':
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+    def rotate_keys(self):
+        """Switches to a new signing key, as Auth0 does on key rotation."""
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.kid = secrets.token_hex(8)
+        self._private_pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                              serialization.NoEncryption())
+        self._public_jwk = dict(jwk.dumps(key.public_key(), kty='RSA'), kid=self.kid, use='sig', alg='RS256')
+        self._issued = {}
+
+    def id_token(self, user: dict = None, expires_in: int = 36000, **claims) -> str:
+        now = int(time.time())
+        payload = dict(user or USER, iss=self.base_url + '/', aud=self.client_id, iat=now, exp=now + expires_in)
+        payload.update(claims)
+        return jwt.encode({'alg': 'RS256', 'kid': self.kid}, payload, self._private_pem).decode('ascii')
+
+    def connected(self):
+        with self._lock:
+            self.connections += 1
+
+    def _call(self, name):
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def authorize(self):
+        self._call('authorize')
+        code = secrets.token_urlsafe(16)
+        self._codes[code] = dict(USER, sub=request.args.get('login_hint') or USER['sub'])
+        query = urlencode({'code': code, 'state': request.args.get('state', '')})
+        return redirect(request.args['redirect_uri'] + '?' + query)
+
+    def token(self):
+        self._call('token')
+        user = self._codes.pop(request.form.get('code'), None)
+        if user is None:
+            return jsonify(error='invalid_grant'), 403
+        # signing takes tens of milliseconds of the benchmark's own CPU, the provider's would be elsewhere;
+        # one token per user and key is enough for the app
+        if user['sub'] not in self._issued:
+            self._issued[user['sub']] = self.id_token(user)
+        return jsonify(access_token=secrets.token_urlsafe(24),
+                       id_token=self._issued[user['sub']],
+                       token_type='Bearer',
+                       expires_in=86400)
+
+    def userinfo(self):
+        self._call('userinfo')
+        return jsonify(USER)
+
+    def jwks(self):
+        self._call('jwks')
+        return jsonify(keys=[self._public_jwk])
+
+    def logout(self):
+        self._call('logout')
+        return 'logged out'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency', type=float, default=0.0)
+    args = parser.parse_args()
+    fake = FakeAuth0(port=args.port, latency=args.latency)
+    print(f'fake Auth0 on {fake.base_url}, client id {fake.client_id}')
+    fake.server.serve_forever()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Local stand-in for Redis, speaking just enough RESP (PING, AUTH, SELECT, GET, SET
+with EX, DEL) for the server-side session store.
+
+    python benchmarks/fake_redis.py [--port 6390]
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+_data = {}
+_lock = threading.Lock()
+
+
+class Handler(socketserver.StreamRequestHandler):
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            command = args[0].upper()
+            if command in (b'PING', b'AUTH', b'SELECT'):
+                self.wfile.write(b'+OK\r\n' if command != b'PING' else b'+PONG\r\n')
+            elif command == b'GET':
+                with _lock:
+                    item = _data.get(args[1])
+                    if item is not None and item[0] < time.monotonic():
+                        del _data[args[1]]
+                        item = None
+                if item is None:
+                    self.wfile.write(b'$-1\r\n')
+                else:
+                    self.wfile.write(b'$%d\r\n%s\r\n' % (len(item[1]), item[1]))
+            elif command == b'SET':
+                ttl = int(args[4]) if len(args) > 4 and args[3].upper() == b'EX' else 10 ** 9
+                with _lock:
+                    _data[args[1]] = (time.monotonic() + ttl, args[2])
+                self.wfile.write(b'+OK\r\n')
+            elif command == b'DEL':
+                with _lock:
+                    removed = sum(_data.pop(key, None) is not None for key in args[1:])
+                self.wfile.write(b':%d\r\n' % removed)
+            else:
+                self.wfile.write(b'-ERR unknown command\r\n')
+            self.wfile.flush()
+
+
+class Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve(port: int = 0) -> Server:
+    """Starts the stand-in on a background thread, returns the server (port in server_address)."""
+    server = Server(('127.0.0.1', port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=6390)
+    Server(('127.0.0.1', parser.parse_args().port), Handler).serve_forever()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+EU261 assessment speed: airport lookup and single-flight latency, a month of
+delayed flights through assess_many and through POST /flightdelay/batch, and a
+check that the scalar and the vectorised rules agree.
+
+    python benchmarks/flight_delay.py [--flights 50000]
+
+The endpoint run needs the same environment as the app itself (constants.py,
+AUTH0_* variables); pass --no-endpoint to skip it.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from eu261 import KINDS, AirportIndex, assess, assess_many  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AIRPORTS = os.path.join(ROOT, 'data', 'airports.csv')
+FIELDS = ('origin', 'destination', 'kind', 'delay_minutes', 'notice_days', 'reroute_departure_early_minutes',
+          'reroute_arrival_delay_minutes', 'eu_carrier', 'extraordinary')
+
+
+def flights(index, n):
+    rnd = random.Random(n)
+    codes = [code for code in ('ZRH', 'GVA', 'BSL', 'FRA', 'CDG', 'LHR', 'JFK', 'DXB', 'BKK', 'LIS', 'RUN', 'ARN')
+             if code in index] + ['XXX']
+    for _ in range(n):
+        yield {'origin': rnd.choice(codes), 'destination': rnd.choice(codes), 'kind': rnd.choice(KINDS),
+               'delay_minutes': rnd.choice((0, 90, 179, 180, 240, 600)),
+               'notice_days': rnd.choice((0, 3, 7, 10, 14, 30)),
+               'reroute_departure_early_minutes': rnd.choice((None, 30, 60, 90, 120, 180)),
+               'reroute_arrival_delay_minutes': rnd.choice((None, 60, 119, 150, 180, 239, 300)),
+               'eu_carrier': rnd.random() < 0.7, 'extraordinary': rnd.random() < 0.1}
+
+
+def per_call(function, n, *args, **kwargs):
+    start = time.perf_counter()
+    for _ in range(n):
+        function(*args, **kwargs)
+    return (time.perf_counter() - start) / n
+
+
+def endpoint(batch):
+    import constants
+    from app import app
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session[constants.PROFILE_KEY] = {'name': 'bench', 'picture': ''}
+    client.post('/flightdelay/batch', json={'flights': batch[:10]})
+    start = time.perf_counter()
+    response = client.post('/flightdelay/batch', json={'flights': batch})
+    elapsed = time.perf_counter() - start
+    assert response.status_code == 200, response.data
+    print(f'POST /flightdelay/batch, {len(batch)} flights: {elapsed * 1000:.0f} ms '
+          f'({len(batch) / elapsed:,.0f} flights/s, JSON in and out included)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--flights', type=int, default=50000)
+    parser.add_argument('--no-endpoint', action='store_true')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = AirportIndex.from_csv(AIRPORTS)
+    print(f'{index.count} airports loaded in {(time.perf_counter() - start) * 1000:.0f} ms')
+    print(f'airport lookup: {per_call(index.get, 200000, "ZRH") * 1e6:.2f} µs')
+    print(f'single flight:  {per_call(assess, 50000, index, "ZRH", "JFK", "delay", 200) * 1e6:.2f} µs')
+
+    batch = list(flights(index, args.flights))
+    columns = [[flight[field] for flight in batch] for field in FIELDS]
+    start = time.perf_counter()
+    results = assess_many(index, *columns)
+    elapsed = time.perf_counter() - start
+    print(f'assess_many, {len(batch)} flights: {elapsed * 1000:.0f} ms ({len(batch) / elapsed:,.0f} flights/s)')
+    start = time.perf_counter()
+    one_by_one = [assess(index, **flight) for flight in batch]
+    elapsed = time.perf_counter() - start
+    print(f'assess one by one, {len(batch)} flights: {elapsed * 1000:.0f} ms ({len(batch) / elapsed:,.0f} flights/s)')
+    mismatches = sum(a != b for a, b in zip(results, one_by_one))
+    print(f'scalar and vectorised rules disagree on {mismatches} flights')
+
+    if not args.no_endpoint:
+        endpoint(batch)
+
+
+if __name__ == '__main__':
+    main()
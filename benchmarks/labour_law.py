@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Termination dates for whole employee rosters with absence histories: employees per
+second through labourlaw.batch_terminations and through POST /labourlaw/batch, and
+merging long absence histories into blocking periods. Known cases are checked first.
+
+    python benchmarks/labour_law.py [--employees 1000 5000 20000]
+
+The endpoint run needs the same environment as the app itself (constants.py,
+AUTH0_* variables); pass --no-endpoint to skip it.
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from labourlaw import ABSENCES, IntervalSet, batch_terminations  # noqa: E402
+
+
+# (employee, expected end, suspended days)
+CASES = (
+    # incapacity before the notice period counted back from its end does not suspend it
+    ({'start': '2019-06-01', 'notice': '2020-03-01',
+      'absences': [{'kind': 'illness', 'start': '2020-03-02', 'end': '2020-03-31'}]}, '2020-04-30', 0),
+    ({'start': '2019-06-01', 'notice': '2020-03-01',
+      'absences': [{'kind': 'illness', 'start': '2020-04-10', 'end': '2020-04-19'}]}, '2020-05-31', 10),
+)
+
+
+def check():
+    for (employee, end, suspended), result in zip(CASES, batch_terminations(case[0] for case in CASES)):
+        assert (result['end'], result['suspended_days']) == (end, suspended), (employee, result)
+
+
+def roster(n):
+    rnd = random.Random(n)
+    today = datetime.date(2024, 6, 30)
+    for _ in range(n):
+        start = today - datetime.timedelta(days=rnd.randint(10, 25 * 365))
+        notice = start + datetime.timedelta(days=rnd.randint(0, (today - start).days))
+        absences = []
+        for _ in range(rnd.choice((0, 0, 1, 2, 3, 5, 8))):
+            first = notice + datetime.timedelta(days=rnd.randint(-200, 120))
+            absences.append({'kind': rnd.choice(list(ABSENCES)), 'start': first.isoformat(),
+                             'end': (first + datetime.timedelta(days=rnd.randint(0, 60))).isoformat()})
+        yield {'start': start.isoformat(), 'notice': notice.isoformat(),
+               'by': 'employer' if rnd.random() < 0.8 else 'employee', 'absences': absences,
+               'probation_months': rnd.choice((1, 1, 2, 3)), 'end_of_month': rnd.random() < 0.95}
+
+
+def endpoint(employees):
+    import constants
+    from app import app
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session[constants.PROFILE_KEY] = {'name': 'bench', 'picture': ''}
+    client.post('/labourlaw/batch', json={'employees': employees[:10]})
+    start = time.perf_counter()
+    response = client.post('/labourlaw/batch', json={'employees': employees})
+    elapsed = time.perf_counter() - start
+    assert response.status_code == 200, response.data
+    print(f'POST /labourlaw/batch, {len(employees)} employees: {elapsed * 1000:.0f} ms '
+          f'(JSON in and out included)')
+
+
+def merge_sorted_each_time(intervals):
+    # the naive way: append and re-merge the whole sorted list for every absence
+    merged = []
+    for interval in intervals:
+        merged = sorted(merged + [interval])
+        result = []
+        for start, end in merged:
+            if result and start <= result[-1][1] + 1:
+                result[-1] = (result[-1][0], max(result[-1][1], end))
+            else:
+                result.append((start, end))
+        merged = result
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--employees', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--no-endpoint', action='store_true')
+    args = parser.parse_args()
+
+    check()
+    for n in args.employees:
+        employees = list(roster(n))
+        start = time.perf_counter()
+        results = list(batch_terminations(employees))
+        elapsed = time.perf_counter() - start
+        errors = sum('error' in result for result in results)
+        void = sum(result.get('void', False) for result in results)
+        print(f'{n:>6} employees: {elapsed * 1000:6.0f} ms ({n / elapsed:,.0f} employees/s), '
+              f'{void} void, {errors} errors')
+        if not args.no_endpoint:
+            endpoint(employees)
+
+    rnd = random.Random(1)
+    for n in (100, 1000, 10000):
+        intervals = [(a, a + rnd.randint(0, 30)) for a in (rnd.randint(0, 20 * 365) for _ in range(n))]
+        timings = []
+        for merge in (lambda: IntervalSet.from_intervals(intervals), lambda: [s.add(*i) for s in [IntervalSet()]
+                                                                              for i in intervals],
+                      lambda: merge_sorted_each_time(intervals) if n <= 1000 else None):
+            start = time.perf_counter()
+            merge()
+            timings.append((time.perf_counter() - start) * 1000)
+        naive = f', re-sorting per absence {timings[2]:.1f} ms' if n <= 1000 else ''
+        print(f'{n:>6} absences merged: sort once {timings[0]:.2f} ms, one by one {timings[1]:.2f} ms{naive}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Legal Drop on premise with large files: upload and download throughput through the
+DropStore and through the PUT/GET chunk endpoints, against copying the same bytes with
+shutil.copyfileobj, and the peak Python heap (tracemalloc) of each, which has to stay
+flat however large the file.
+
+    python benchmarks/legal_drop.py [--size-mb 1024 4096] [--chunk-mb 4]
+
+The endpoint run needs the same environment as the app itself (constants.py,
+AUTH0_* variables); pass --no-endpoint to skip it. The files are written to a temporary
+directory (--directory to put it on another disk).
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from legaldrop import CHUNK_OVERHEAD, DropStore  # noqa: E402
+
+PATTERN = os.urandom(1 << 20)
+
+
+class Source(io.RawIOBase):
+    # `length` bytes of ciphertext stand-in, produced block by block like a request body
+    def __init__(self, length):
+        super().__init__()
+        self.length = length
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self.length - self.position, len(PATTERN))
+        buffer[:size] = PATTERN[:size]
+        self.position += size
+        return size
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self.position = offset if whence == io.SEEK_SET else self.length + offset
+        return self.position
+
+
+def measure(label, size, function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f'  {label:<28} {elapsed:6.2f} s {size / elapsed / 2 ** 20:8.0f} MiB/s, peak heap {peak / 2 ** 20:6.1f} MiB')
+
+
+def baseline(directory, size):
+    path = os.path.join(directory, 'baseline')
+    with open(path, 'wb') as f:
+        shutil.copyfileobj(Source(size), f, len(PATTERN))
+    with open(path, 'rb') as f:
+        while f.read(len(PATTERN)):
+            pass
+    os.remove(path)
+
+
+def chunk_lengths(info):
+    for index in range(info['chunks']):
+        yield index, DropStore.chunk_length(dict(info), index)
+
+
+def store_upload(store, size, chunk_size):
+    drop, token, info = store.create('bench', size, chunk_size, 1)
+    for index, length in chunk_lengths(info):
+        store.write_chunk(drop, token, index, Source(length), length)
+    store.complete(drop, token)
+    return drop, token, info
+
+
+def store_download(store, drop, info):
+    for index, _ in chunk_lengths(info):
+        with open(store.chunk_file(drop, index), 'rb') as f:
+            while f.read(len(PATTERN)):
+                pass
+
+
+def endpoint(directory, size, chunk_size):
+    os.environ['LEGALDROP_DIR'] = os.path.join(directory, 'endpoint')
+    os.environ.setdefault('LEGALDROP_SWEEP_INTERVAL', '0')
+    import constants
+    from app import app
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session[constants.PROFILE_KEY] = {'user_id': 'bench', 'name': 'bench', 'picture': ''}
+    created = client.post('/legaldrop/drops', json={'size': size, 'chunk_size': chunk_size, 'days': 1}).json
+    headers = {'X-Drop-Token': created['token']}
+
+    def upload():
+        for index, length in chunk_lengths(created):
+            response = client.put(f'/legaldrop/drops/{created["id"]}/chunks/{index}', input_stream=Source(length),
+                                  content_length=length, headers=headers)
+            assert response.status_code == 204, response.data
+        assert client.post(f'/legaldrop/drops/{created["id"]}/complete', headers=headers).status_code == 200
+
+    def download():
+        for index, _ in chunk_lengths(created):
+            response = client.get(f'/legaldrop/drops/{created["id"]}/chunks/{index}', buffered=False)
+            for _ in response.response:
+                pass
+            response.close()
+
+    total = size + created['chunks'] * CHUNK_OVERHEAD
+    measure('PUT chunks', total, upload)
+    measure('GET chunks', total, download)
+    client.delete(f'/legaldrop/drops/{created["id"]}', headers=headers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size-mb', type=int, nargs='+', default=[1024])
+    parser.add_argument('--chunk-mb', type=int, default=4)
+    parser.add_argument('--directory', default=None)
+    parser.add_argument('--no-endpoint', action='store_true')
+    args = parser.parse_args()
+
+    chunk_size = args.chunk_mb << 20
+    with tempfile.TemporaryDirectory(dir=args.directory) as tmp:
+        store = DropStore(os.path.join(tmp, 'store'), max_chunk_size=chunk_size, max_size=max(args.size_mb) << 20)
+        for size_mb in args.size_mb:
+            size = size_mb << 20
+            print(f'{size_mb:,} MiB in {-(-size // chunk_size):,} chunks of {args.chunk_mb} MiB')
+            measure('copyfileobj write + read', 2 * size, lambda: baseline(tmp, size))
+            result = []
+            measure('DropStore write_chunk', size, lambda: result.append(store_upload(store, size, chunk_size)))
+            drop, token, info = result[0]
+            measure('DropStore read', size, lambda: store_download(store, drop, info))
+            store.delete(drop, token)
+            if not args.no_endpoint:
+                endpoint(tmp, size, chunk_size)
+
+
+if __name__ == '__main__':
+    main()
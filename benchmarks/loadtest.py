@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Load test of the app against the local fake Auth0: boots the app (under gunicorn with
+gunicorn.conf.py, or in this process), signs in one browser session per virtual user
+through the real login flow, then drives each scenario with --concurrency users for
+--duration seconds and reports throughput and p50/p99 latency per scenario.
+
+    python benchmarks/loadtest.py [--concurrency 8] [--duration 10] [--scenarios dashboard datedelta ...]
+                                  [--server gunicorn|inprocess] [--worker-class gevent] [--workers 2]
+                                  [--save-baseline benchmarks/loadtest_baseline.json]
+                                  [--baseline benchmarks/loadtest_baseline.json] [--tolerance 0.3]
+
+With --baseline the run fails (exit status 1) when a scenario has errors, or its
+throughput drops or its p50/p99 latency grows by more than --tolerance against the
+stored baseline; compare only runs of the same configuration on the same machine.
+
+Needs constants.py like the app itself, and gunicorn for --server gunicorn.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_auth0 import FakeAuth0  # noqa: E402
+from login_callback import configure  # noqa: E402
+from login_storm import free_port, percentile, start_app  # noqa: E402
+
+CANTONS = ('ZH', 'BE', 'GE', 'VD', 'TI', 'BS')
+ZONES = ('Innerorts', 'Ausserorts / Autostrasse', 'Autobahn', '30er')
+STATIC_PAGES = ('/disclaimer', '/agb', '/contact')
+
+
+def signed_in(base_url):
+    """A browser session through /login -> fake /authorize -> /callback."""
+    browser = requests.Session()
+    authorize = browser.get(base_url + '/login', allow_redirects=False).headers['Location']
+    callback = browser.get(authorize, allow_redirects=False).headers['Location']
+    response = browser.get(callback, allow_redirects=False)
+    if response.status_code != 302 or not response.headers['Location'].endswith('/dashboard'):
+        raise requests.RequestException(f'login failed: {response.status_code}')
+    return browser
+
+
+def dashboard(browser, base_url, rnd, assets):
+    return browser.get(base_url + '/dashboard').status_code == 200
+
+
+def datedelta(browser, base_url, rnd, assets):
+    start = date(2018, 1, 1) + timedelta(days=rnd.randint(0, 2000))
+    params = {'start': start.isoformat(), 'end': (start + timedelta(days=rnd.randint(1, 400))).isoformat(),
+              'mode': rnd.choice(('calendar', 'business', 'court')), 'canton': rnd.choice(CANTONS)}
+    return browser.get(base_url + '/datedelta', params=params).status_code == 200
+
+
+def speedlimits(browser, base_url, rnd, assets):
+    if rnd.random() < 0.8:
+        params = {'zone': rnd.choice(ZONES), 'speed': rnd.randint(1, 60)}
+        return browser.get(base_url + '/speedlimits', params=params).status_code == 200
+    data = {'zone': rnd.choice(ZONES), 'speeds': [rnd.randint(1, 60) for _ in range(100)]}
+    return browser.post(base_url + '/speedlimits/batch', json=data).status_code == 200
+
+
+def static(browser, base_url, rnd, assets):
+    path = rnd.choice(STATIC_PAGES + tuple(assets))
+    return browser.get(base_url + path).status_code == 200
+
+
+def login(browser, base_url, rnd, assets):
+    # a new browser every time, the session of the virtual user is left alone
+    signed_in(base_url)
+    return True
+
+
+SCENARIOS = {
+    'dashboard': dashboard,
+    'datedelta': datedelta,
+    'speedlimits': speedlimits,
+    'static': static,
+    'login': login,
+}
+
+
+def run(scenario, browsers, base_url, duration, assets):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop = time.perf_counter() + duration
+
+    def user(i, browser):
+        rnd = random.Random(i)
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            try:
+                ok = SCENARIOS[scenario](browser, base_url, rnd, assets)
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=user, args=(i, browser)) for i, browser in enumerate(browsers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {'requests': len(latencies), 'errors': errors[0], 'rps': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.5) * 1000, 2) if latencies else None,
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None}
+
+
+def regressions(results, baseline, tolerance):
+    for name, result in results.items():
+        base = baseline['scenarios'].get(name)
+        if result['errors']:
+            yield f'{name}: {result["errors"]} errors'
+        if base is None or not result['requests']:
+            continue
+        if result['rps'] < base['rps'] * (1 - tolerance):
+            yield f'{name}: {result["rps"]} requests/s, baseline {base["rps"]}'
+        for key in ('p50_ms', 'p99_ms'):
+            if result[key] > base[key] * (1 + tolerance):
+                yield f'{name}: {key} {result[key]}, baseline {base[key]}'
+
+
+def start_inprocess(port):
+    from werkzeug.serving import make_server
+    from app import app
+
+    # no access log on the terminal
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--server', choices=('gunicorn', 'inprocess'), default='gunicorn')
+    parser.add_argument('--worker-class', default='gevent')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.05, help='of the fake Auth0, in seconds')
+    parser.add_argument('--baseline', help='JSON of an earlier run (--save-baseline) to compare with')
+    parser.add_argument('--save-baseline', help='where to store this run as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.3)
+    args = parser.parse_args()
+
+    fake = FakeAuth0(latency=args.latency).start()
+    configure(fake)
+    port = free_port()
+    if args.server == 'gunicorn':
+        os.environ['GUNICORN_WORKER_CONNECTIONS'] = str(max(100, args.concurrency * 4))
+        process = start_app(args.worker_class, args.workers, port)
+        stop = process.terminate
+    else:
+        os.environ['AUTH0_CALLBACK_URL'] = f'http://127.0.0.1:{port}/callback'
+        stop = start_inprocess(port).shutdown
+    base_url = f'http://127.0.0.1:{port}'
+    config = {'server': args.server, 'worker_class': args.worker_class if args.server == 'gunicorn' else None,
+              'workers': args.workers if args.server == 'gunicorn' else None, 'concurrency': args.concurrency,
+              'duration': args.duration, 'latency': args.latency}
+
+    try:
+        browsers = [signed_in(base_url) for _ in range(args.concurrency)]
+        assets = sorted(set(re.findall(r'(/assets/[^"\'\s)]+)', browsers[0].get(base_url + '/dashboard').text)))
+        results = {}
+        print(f'{args.concurrency} users, {args.duration:.0f} s per scenario, {args.server}'
+              + (f' ({args.workers} {args.worker_class} workers)' if args.server == 'gunicorn' else ''))
+        for scenario in args.scenarios:
+            # a short warm-up, so caches are filled and every worker has seen the route
+            run(scenario, browsers, base_url, min(1.0, args.duration / 5), assets)
+            results[scenario] = result = run(scenario, browsers, base_url, args.duration, assets)
+            print(f'  {scenario:<12} {result["rps"]:8.1f} req/s  p50 {result["p50_ms"] or 0:8.1f} ms  '
+                  f'p99 {result["p99_ms"] or 0:8.1f} ms  {result["requests"]:6d} requests  {result["errors"]} errors')
+    finally:
+        stop()
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({'config': config, 'scenarios': results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'baseline written to {args.save_baseline}')
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != config:
+            print(f'warning: baseline was taken with {baseline.get("config")}')
+        failed = list(regressions(results, baseline, args.tolerance))
+        for failure in failed:
+            print(f'REGRESSION {failure}')
+        if failed:
+            raise SystemExit(1)
+        print(f'no regression beyond {args.tolerance:.0%} of the baseline')
+
+
+if __name__ == '__main__':
+    main()
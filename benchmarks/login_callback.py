@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Runs the login flow against the local fake Auth0 with injected latency and
+reports how long /callback takes and which provider endpoints it hit, then checks
+that the ltjwt cookie alone (no session) is accepted without calling the provider,
+and that a rotated signing key is picked up.
+
+    python benchmarks/login_callback.py [--latency 0.05] [--logins 20]
+
+Needs constants.py like the app itself; the AUTH0_* settings are pointed at the fake.
+"""
+import argparse
+import os
+import sys
+import time
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import constants  # noqa: E402
+from fake_auth0 import FakeAuth0  # noqa: E402
+
+
+def configure(fake):
+    os.environ.pop(constants.AUTH0_DOMAIN, None)
+    os.environ[constants.AUTH0_BASE_URL] = fake.base_url
+    os.environ[constants.AUTH0_CLIENT_ID] = fake.client_id
+    os.environ[constants.AUTH0_CLIENT_SECRET] = 'fake-client-secret'
+    os.environ[constants.AUTH0_CALLBACK_URL] = 'http://localhost/callback'
+    os.environ['AUTHLIB_INSECURE_TRANSPORT'] = '1'
+
+
+def login(client):
+    """/login -> fake /authorize -> /callback, returns the seconds spent in /callback."""
+    authorize_url = client.get('/login').headers['Location']
+    callback_url = requests.get(authorize_url, allow_redirects=False).headers['Location']
+    query = parse_qs(urlparse(callback_url).query)
+    start = time.perf_counter()
+    response = client.get('/callback', query_string={'code': query['code'][0], 'state': query['state'][0]})
+    elapsed = time.perf_counter() - start
+    assert response.status_code == 302 and response.headers['Location'].endswith('/dashboard'), response.data
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--logins', type=int, default=20)
+    args = parser.parse_args()
+
+    fake = FakeAuth0(latency=args.latency).start()
+    configure(fake)
+    from app import app
+
+    client = app.test_client()
+    login(client)
+    fake.calls.clear()
+    times = sorted(login(app.test_client()) for _ in range(args.logins))
+    print(f'/callback with {args.latency * 1000:.0f} ms provider latency: '
+          f'median {times[len(times) // 2] * 1000:.1f} ms over {args.logins} logins')
+    print(f'provider calls: {fake.calls}')
+
+    fake.calls.clear()
+    cookie_only = app.test_client()
+    cookie_only.set_cookie('localhost', 'ltjwt', fake.id_token())
+    assert cookie_only.get('/dashboard').status_code == 200
+    print(f'ltjwt cookie without session: accepted, provider calls: {fake.calls}')
+
+    forged = app.test_client()
+    forged.set_cookie('localhost', 'ltjwt', fake.id_token()[:-4] + 'AAAA')
+    assert forged.get('/dashboard').status_code == 302
+    print('tampered ltjwt cookie: rejected')
+
+    fake.calls.clear()
+    fake.rotate_keys()
+    # the cache refetches for an unknown key id at most once a minute, don't wait for that here
+    from app import TOKENS
+    TOKENS.jwks.min_refresh = 0
+    rotated = app.test_client()
+    rotated.set_cookie('localhost', 'ltjwt', fake.id_token())
+    assert rotated.get('/dashboard').status_code == 200
+    print(f'after key rotation: accepted, provider calls: {fake.calls}')
+
+
+if __name__ == '__main__':
+    main()
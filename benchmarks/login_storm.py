@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+A burst of logins against a slow identity provider while the tools are in use: starts
+the app under gunicorn (gunicorn.conf.py) with sync and with gevent workers, runs
+--logins concurrent login flows against the local fake Auth0 with --latency injected,
+and meanwhile measures a tool page (/datedelta, authenticated by the ltjwt cookie alone,
+so it never calls the provider). Also counts the connections the app opened to the
+provider for its token exchanges.
+
+    python benchmarks/login_storm.py [--latency 0.5] [--logins 50] [--workers 2]
+
+Needs gunicorn and gevent, and constants.py like the app itself.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_auth0 import FakeAuth0  # noqa: E402
+from login_callback import configure  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_app(worker_class, workers, port):
+    env = dict(os.environ, PORT=str(port), GUNICORN_WORKER_CLASS=worker_class, GUNICORN_WORKERS=str(workers),
+               AUTH0_CALLBACK_URL=f'http://127.0.0.1:{port}/callback')
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind',
+                                f'127.0.0.1:{port}', 'app:app'], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f'http://127.0.0.1:{port}/', timeout=10)
+            return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit(f'gunicorn with {worker_class} workers did not start')
+
+
+def login(base_url):
+    """/login -> fake /authorize -> /callback with a fresh browser session, returns the seconds it took."""
+    browser = requests.Session()
+    start = time.perf_counter()
+    authorize = browser.get(base_url + '/login', allow_redirects=False).headers['Location']
+    # its own connection each time, so the app's connections can be counted apart
+    callback = requests.get(authorize, allow_redirects=False).headers['Location']
+    response = browser.get(callback, allow_redirects=False)
+    assert response.status_code == 302 and response.headers['Location'].endswith('/dashboard'), response.text
+    return time.perf_counter() - start
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def storm(fake, base_url, logins):
+    cookie = {'ltjwt': fake.id_token()}
+    done = threading.Event()
+    probes = []
+
+    def probe():
+        with requests.Session() as tool:
+            while not done.is_set():
+                start = time.perf_counter()
+                assert tool.get(base_url + '/datedelta', cookies=cookie).status_code == 200
+                probes.append(time.perf_counter() - start)
+                time.sleep(0.01)
+
+    prober = threading.Thread(target=probe)
+    fake.calls.clear()
+    fake.connections = 0
+    start = time.perf_counter()
+    prober.start()
+    with ThreadPoolExecutor(logins) as pool:
+        times = list(pool.map(lambda _: login(base_url), range(logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    prober.join()
+    app_connections = fake.connections - fake.calls.get('authorize', 0)
+    return times, probes, elapsed, app_connections, fake.calls.get('token', 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--logins', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    fake = FakeAuth0(latency=args.latency).start()
+    configure(fake)
+    print(f'{args.logins} concurrent logins, {args.latency * 1000:.0f} ms provider latency, '
+          f'{args.workers} gunicorn workers')
+    for worker_class in ('sync', 'gevent'):
+        port = free_port()
+        process = start_app(worker_class, args.workers, port)
+        try:
+            base_url = f'http://127.0.0.1:{port}'
+            # every worker fetches the signing keys once
+            for _ in range(args.workers * 2):
+                login(base_url)
+            times, probes, elapsed, connections, tokens = storm(fake, base_url, args.logins)
+        finally:
+            process.terminate()
+            process.wait()
+        print(f'{worker_class:>6}: all logins in {elapsed:.1f} s (median {percentile(times, 0.5):.2f} s, '
+              f'max {max(times):.2f} s); /datedelta meanwhile p50 {percentile(probes, 0.5) * 1000:.0f} ms, '
+              f'p99 {percentile(probes, 0.99) * 1000:.0f} ms over {len(probes)} requests; '
+              f'{connections} new provider connections for {tokens} token exchanges')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Compares Flask's signed cookie sessions with the server-side session store
+(in-process and against the local Redis stand-in): size of the session cookie and
+the whole Cookie request header, and requests per second on /dashboard for a
+logged-in user.
+
+    python benchmarks/session_stores.py [--requests 3000]
+
+Needs the same environment as the app itself (constants.py, AUTH0_* variables).
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import constants  # noqa: E402
+import fake_redis  # noqa: E402
+from app import app  # noqa: E402
+from flask.sessions import SecureCookieSessionInterface  # noqa: E402
+from sessions import MemoryStore, RedisStore, ServerSideSessionInterface  # noqa: E402
+
+# roughly what Auth0 returns from /userinfo, plus an id_token sized ltjwt cookie
+USERINFO = {
+    'sub': 'auth0|5b9a2f852d798e55dec6f592',
+    'name': 'Erika Mustermann',
+    'nickname': 'erika.mustermann',
+    'given_name': 'Erika',
+    'family_name': 'Mustermann',
+    'picture': 'https://s.gravatar.com/avatar/' + 'a' * 32 + '?s=480&r=pg&d=https%3A%2F%2Fcdn.auth0.com%2Favatars%2Fem.png',
+    'locale': 'de',
+    'updated_at': '2018-09-18T12:00:00.000Z',
+    'email': 'erika.mustermann@example.com',
+    'email_verified': True,
+    'https://lawyer.tools/app_metadata': {'plan': 'kanzlei', 'tools': ['legaldrop', 'datedelta', 'duedate'] * 8},
+}
+ID_TOKEN = 'eyJ' + 'x' * 1100
+
+
+def cookie_sizes(client):
+    cookies = {cookie.name: f'{cookie.name}={cookie.value}' for cookie in client.cookie_jar}
+    return len(cookies.get(app.session_cookie_name, '')), len('; '.join(cookies.values()))
+
+
+def measure(interface, n):
+    app.session_interface = interface
+    client = app.test_client()
+    client.set_cookie('localhost', 'ltjwt', ID_TOKEN)
+    with client.session_transaction() as s:
+        s[constants.JWT_PAYLOAD] = USERINFO
+        s[constants.PROFILE_KEY] = {'user_id': USERINFO['sub'], 'name': USERINFO['name'],
+                                    'picture': USERINFO['picture']}
+    client.get('/dashboard')
+    start = time.perf_counter()
+    for _ in range(n):
+        client.get('/dashboard')
+    return cookie_sizes(client), n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=3000)
+    args = parser.parse_args()
+
+    server = fake_redis.serve()
+    interfaces = {
+        'cookie': SecureCookieSessionInterface(),
+        'memory': ServerSideSessionInterface(MemoryStore()),
+        'redis': ServerSideSessionInterface(RedisStore(f'redis://127.0.0.1:{server.server_address[1]}/0')),
+    }
+
+    print(f'{"session":<10}{"session cookie (bytes)":>24}{"Cookie header (bytes)":>23}{"req/s":>10}')
+    for name, interface in interfaces.items():
+        (session_size, header_size), rate = measure(interface, args.requests)
+        print(f'{name:<10}{session_size:>24}{header_size:>23}{rate:>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
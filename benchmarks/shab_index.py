@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Ingest throughput and query latency of the SHAB index on synthetic publication dumps
+(one XML file per month), plus the memory the streaming parser needs per file.
+
+    python benchmarks/shab_index.py [--years 5] [--per-day 400]
+
+SHAB publishes a few hundred commercial register entries per working day, so the
+defaults come to roughly half a million publications.
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shab import ShabIndex, iter_publications  # noqa: E402
+
+CANTONS = ('ZH', 'BE', 'LU', 'UR', 'SZ', 'OW', 'NW', 'GL', 'ZG', 'FR', 'SO', 'BS', 'BL', 'SH', 'AR', 'AI', 'SG',
+           'GR', 'AG', 'TG', 'TI', 'VD', 'VS', 'NE', 'GE', 'JU')
+TYPES = ('HR01', 'HR02', 'HR03', 'KK01', 'KK02', 'SB01')
+FORMS = ('AG', 'GmbH', 'SA', 'Sàrl', 'Genossenschaft', 'Stiftung', 'Einzelunternehmen')
+WORDS = ('Müller', 'Meier', 'Schmid', 'Keller', 'Weber', 'Huber', 'Schneider', 'Brunner', 'Zürcher', 'Alpen',
+         'Berg', 'Holz', 'Bau', 'Immobilien', 'Treuhand', 'Consulting', 'Digital', 'Garage', 'Bäckerei',
+         'Architektur', 'Transport', 'Gastro', 'Swiss', 'Helvetia', 'Invest', 'Partner', 'Technik', 'Elektro',
+         'Sanitär', 'Malerei', 'Informatik', 'Logistik', 'Medical', 'Pharma', 'Solar', 'Energie', 'Reisen')
+
+
+def company(rnd):
+    # a pool of 200k companies, so names and UIDs repeat over the years like in the register
+    n = rnd.randrange(200000)
+    name = f'{WORDS[n % len(WORDS)]} {WORDS[(n // len(WORDS)) % len(WORDS)]} {n % 997} {FORMS[n % len(FORMS)]}'
+    return name, f'CHE-{100 + n // 1000000:03d}.{(n // 1000) % 1000:03d}.{n % 1000:03d}', CANTONS[n % len(CANTONS)]
+
+
+def write_month(path, year, month, per_day, rnd, counter):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<publications>\n')
+        day = datetime.date(year, month, 1)
+        while day.month == month:
+            if day.weekday() < 5:
+                for _ in range(per_day):
+                    counter[0] += 1
+                    name, uid, canton = company(rnd)
+                    kind = rnd.choice(TYPES)
+                    f.write(f'<publication><meta><publicationNumber>{kind}-{counter[0]:010d}</publicationNumber>'
+                            f'<publicationDate>{day.isoformat()}</publicationDate><rubric>{kind[:2]}</rubric>'
+                            f'<subRubric>{kind}</subRubric><cantons>{canton}</cantons>'
+                            f'<title><de>{escape(name)}, Mutation</de></title></meta>'
+                            f'<content><company><name>{escape(name)}</name><uid>{uid}</uid>'
+                            f'<seat>Zürich</seat></company>'
+                            f'<message>{escape(name)} hat den Sitz verlegt. ' + 'Lorem ipsum dolor. ' * 20 +
+                            '</message></content></publication>\n')
+            day += datetime.timedelta(days=1)
+        f.write('</publications>\n')
+
+
+def timed(function, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--per-day', type=int, default=400)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        dumps = os.path.join(tmp, 'dumps')
+        os.mkdir(dumps)
+        counter = [0]
+        for year in range(2019, 2019 + args.years):
+            for month in range(1, 13):
+                write_month(os.path.join(dumps, f'shab_{year}_{month:02d}.xml'), year, month, args.per_day, rnd, counter)
+        size = sum(os.path.getsize(os.path.join(dumps, name)) for name in os.listdir(dumps))
+        print(f'{counter[0]:,} publications in {len(os.listdir(dumps))} dumps, {size / 2 ** 20:.0f} MiB')
+
+        first = os.path.join(dumps, sorted(os.listdir(dumps))[0])
+        tracemalloc.start()
+        sum(1 for _ in iter_publications(first))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f'streaming parse of a {os.path.getsize(first) / 2 ** 20:.0f} MiB dump: peak {peak / 2 ** 10:.0f} KiB')
+
+        index = ShabIndex(os.path.join(tmp, 'shab.sqlite'))
+        start = time.perf_counter()
+        added = index.ingest_directory(dumps)
+        elapsed = time.perf_counter() - start
+        total = sum(added.values())
+        print(f'ingest: {total / elapsed:,.0f} publications/s ({elapsed:.1f} s), '
+              f'index {os.path.getsize(index.path) / 2 ** 20:.0f} MiB')
+        start = time.perf_counter()
+        index.ingest_directory(dumps)
+        print(f're-run with nothing new: {(time.perf_counter() - start) * 1000:.1f} ms')
+
+        name, uid, canton = company(random.Random(7))
+        queries = {
+            'name (2 words)': dict(name=' '.join(name.split()[:2])),
+            'name (full)': dict(name=name),
+            'uid': dict(uid=uid),
+            'canton + type': dict(canton='ZH', type='HR01'),
+            'canton, one month': dict(canton='ZH', date_from=f'{2019 + args.years - 1}-03-01',
+                                      date_to=f'{2019 + args.years - 1}-03-31'),
+            'common word + canton': dict(name='AG', canton='BE'),
+            'no match': dict(name='Nirgendwo'),
+        }
+        for label, query in queries.items():
+            ms, result = timed(lambda: index.search(**query), 20)
+            cursor, pages = result.cursor, 1
+            while cursor and pages < 50:
+                last_ms, result = timed(lambda: index.search(cursor=cursor, **query), 1)
+                cursor, pages = result.cursor, pages + 1
+            deep = f', page {pages}: {last_ms:.2f} ms' if pages > 1 else ''
+            print(f'{label:22} first page {ms:.2f} ms{deep}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Rows per second and peak memory of scoring a fleet file of recorded violations:
+chunked and vectorised (speedtickets.score) against looking up row by row, for
+growing files, plus the /speedlimits/upload endpoint end to end.
+
+    python benchmarks/speed_tickets.py [--rows 20000 200000]
+
+The endpoint run needs the same environment as the app itself (constants.py,
+AUTH0_* variables); pass --no-endpoint to skip it.
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from speedlimits import SpeedLimitTable  # noqa: E402
+from speedtickets import TOLERANCES, ZONES_BY_LIMIT, read_rows, score  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARTIFACT = os.path.join(ROOT, 'data', 'speedlimits', 'ZH_2013-01-01.json')
+LIMITS = (30, 50, 50, 50, 60, 80, 80, 100, 120, 120)
+
+
+def write_file(path, rows):
+    rnd = random.Random(rows)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['Datum', 'Kennzeichen', 'Gemessen', 'Limit', 'Messart'])
+        for i in range(rows):
+            limit = rnd.choice(LIMITS)
+            writer.writerow([f'2018-{1 + i % 12:02d}-{1 + i % 28:02d}', f'ZH {100000 + i % 5000}',
+                             limit + rnd.randint(-5, 45), limit, rnd.choice(('radar', 'laser', ''))])
+
+
+def per_row(table, path):
+    # the naive way: parse, deduct, look up and write every row on its own, same output columns
+    out = io.StringIO()
+    writer = csv.writer(out, delimiter=';')
+    with open(path, 'rb') as f:
+        header, rows = read_rows(f, path)
+        for row in rows:
+            measured, limit = float(row[2]), float(row[3])
+            tol = TOLERANCES[row[4] or 'radar'][0 if measured <= 100 else 1 if measured <= 150 else 2]
+            zone = ZONES_BY_LIMIT[0 if limit <= 30 else 1 if limit <= 50 else 2 if limit <= 100 else 3]
+            penalty = table.lookup(zone, measured - tol - limit)
+            if penalty is None:
+                writer.writerow(row + [f'{tol:g}', f'{measured - tol - limit:g}', zone, 'Keine Übertretung',
+                                       'nein', '', ''])
+            else:
+                writer.writerow(row + [f'{tol:g}', f'{measured - tol - limit:g}', zone, penalty.consequence,
+                                       'ja' if penalty.criminal_record else 'nein', penalty.source, ''])
+            out.seek(0)
+            out.truncate()
+
+
+def chunked(table, path):
+    with open(path, 'rb') as f:
+        header, rows = read_rows(f, path)
+        for _ in score(table, header, rows):
+            pass
+
+
+def measure(function, *args):
+    """(seconds, peak traced bytes), timed without tracing as that slows everything down."""
+    start = time.perf_counter()
+    function(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def endpoint(path, rows):
+    import constants
+    from app import app
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session[constants.PROFILE_KEY] = {'name': 'bench', 'picture': ''}
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        response = client.post('/speedlimits/upload', data={'file': (f, 'fleet.csv')},
+                               content_type='multipart/form-data', buffered=False)
+        received = sum(len(chunk) for chunk in response.response)
+    elapsed = time.perf_counter() - start
+    print(f'POST /speedlimits/upload {rows} rows: {rows / elapsed:,.0f} rows/s, {received / 2 ** 20:.1f} MiB streamed')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[20000, 200000])
+    parser.add_argument('--no-endpoint', action='store_true')
+    args = parser.parse_args()
+
+    table = SpeedLimitTable.from_artifact(ARTIFACT)
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f'fleet_{rows}.csv')
+            write_file(path, rows)
+            for name, function in (('per row', per_row), ('chunked', chunked)):
+                elapsed, peak = measure(function, table, path)
+                print(f'{name:8} {rows:>8} rows: {rows / elapsed:>9,.0f} rows/s, '
+                      f'peak {peak / 2 ** 20:5.1f} MiB')
+        if not args.no_endpoint:
+            endpoint(path, rows)
+
+
+if __name__ == '__main__':
+    main()
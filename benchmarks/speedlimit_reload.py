@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Lookups in the penalty registry while its datasets are replaced: --readers threads
+query a canton as fast as they can while the main thread rewrites that canton's
+artifact (alternating two versions with different consequences) and rescans, once
+without reloads for comparison. Every answer has to come from one of the two versions
+as a whole; a lookup that mixes them or fails counts as torn.
+
+    python benchmarks/speedlimit_reload.py [--readers 4] [--seconds 3] [--reloads 20]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from speedlimits import PenaltyRegistry  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARTIFACT = os.path.join(ROOT, 'data', 'speedlimits', 'ZH_2013-01-01.json')
+ZONES = ('Innerorts', 'Autobahn', '30er')
+
+
+def write_version(directory, version):
+    # the same table with the version in every consequence, written like compile_artifact does
+    with open(ARTIFACT, encoding='utf-8') as f:
+        data = json.load(f)
+    data['rows'] = [row[:2] + [f'{row[2]} [v{version}]'] + row[3:] for row in data['rows']]
+    path = os.path.join(directory, 'BE_2020-01-01.json')
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+
+def hammer(registry, readers, seconds, reloads, directory):
+    stop = time.perf_counter() + seconds
+    counts, torn = [], [0]
+
+    def reader():
+        count = 0
+        while time.perf_counter() < stop:
+            try:
+                table = registry.table('BE')
+                versions = {penalty.consequence.rsplit(' ', 1)[-1]
+                            for zone in ZONES for penalty in table.lookup_many(zone, [3, 17, 27, 45]) if penalty}
+                if len(versions) != 1:
+                    torn[0] += 1
+            except KeyError:
+                torn[0] += 1
+            count += 1
+        counts.append(count)
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    swaps = []
+    for i in range(reloads):
+        time.sleep(seconds / (reloads + 1))
+        write_version(directory, i % 2)
+        start = time.perf_counter()
+        registry.scan()
+        swaps.append(time.perf_counter() - start)
+    for thread in threads:
+        thread.join()
+    return sum(counts) / seconds, torn[0], swaps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--reloads', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copy(ARTIFACT, tmp)
+        write_version(tmp, 1)
+        registry = PenaltyRegistry(tmp)
+        registry.scan()
+        for label, reloads in (('no reloads', 0), (f'{args.reloads} reloads', args.reloads)):
+            rate, torn, swaps = hammer(registry, args.readers, args.seconds, reloads, tmp)
+            swap = f', rescan + swap {max(swaps) * 1000:.1f} ms max' if swaps else ''
+            print(f'{label:<12} {rate:10,.0f} queries/s with {args.readers} readers, {torn} torn{swap}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Compares worker start-up cost of loading the speed-limit table straight from the
+spreadsheet through pandas with loading the precompiled artifact.
+
+    python benchmarks/startup_speedlimits.py [--runs 5]
+
+Every run happens in a fresh interpreter, so import time and RSS are what a new
+gunicorn worker would pay.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+XLSX = os.path.join(ROOT, 'data', 'speedlimits', 'ZH_2013-01-01.xlsx')
+ARTIFACT = os.path.join(ROOT, 'data', 'speedlimits', 'ZH_2013-01-01.json')
+
+CHILD = '''
+import json, resource, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {root!r})
+from speedlimits import SpeedLimitTable
+if {mode!r} == 'xlsx':
+    import pandas as pd
+    table = SpeedLimitTable.from_frame(pd.read_excel({xlsx!r}))
+else:
+    table = SpeedLimitTable.from_artifact({artifact!r})
+table.lookup('Innerorts', 17)
+elapsed = time.perf_counter() - t0
+print(json.dumps({{'seconds': elapsed, 'maxrss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}))
+'''
+
+
+def run(mode, runs):
+    samples = []
+    for _ in range(runs):
+        code = CHILD.format(root=ROOT, mode=mode, xlsx=XLSX, artifact=ARTIFACT)
+        out = subprocess.run([sys.executable, '-W', 'ignore', '-c', code],
+                             check=True, stdout=subprocess.PIPE).stdout
+        samples.append(json.loads(out))
+    return (statistics.median(s['seconds'] for s in samples),
+            statistics.median(s['maxrss_kb'] for s in samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f'{"path":<10}{"load (ms)":>12}{"max RSS (MB)":>15}')
+    for mode in ('xlsx', 'artifact'):
+        seconds, rss = run(mode, args.runs)
+        print(f'{mode:<10}{seconds * 1000:>12.1f}{rss / 1024:>15.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Start-up of fresh gunicorn workers (gunicorn.conf.py) with and without the warm-up:
+the app loaded in every worker and warmed by its first requests (as before), loaded
+and warmed up once in the master before the fork (the default), and loaded in every
+worker with each warming up by itself. Each configuration starts with an empty
+template bytecode cache.
+
+Reports the time from starting gunicorn until it answers, the time until requests are
+fast (the first round of requests to all routes with none over 3x its route's median),
+the slowest of the first requests per route against the route's steady-state median,
+and the unique (USS) and proportional (PSS) memory of every worker.
+
+    python benchmarks/startup_warmup.py [--workers 2] [--rounds 30]
+
+Needs gunicorn and gevent, Linux (/proc), and constants.py like the app itself.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+from flask import Flask
+from flask.sessions import SecureCookieSessionInterface
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_auth0 import FakeAuth0  # noqa: E402
+from login_callback import configure  # noqa: E402
+from login_storm import free_port  # noqa: E402
+
+import constants  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROUTES = (
+    '/dashboard',
+    '/datedelta?start=2024-03-01&end=2024-11-15&mode=business&canton=BE',
+    '/duedate?start=2024-07-01&amount=30&unit=days&rule=zpo&canton=GE',
+    '/speedlimits?speed=27&zone=Innerorts',
+    '/flightdelay?origin=ZRH&destination=LIS&kind=delay&delay=240',
+    '/founderbot',
+    '/disclaimer',
+    '/contact',
+)
+CONFIGURATIONS = (
+    ('cold workers', {'GUNICORN_PRELOAD': '0', 'WARM_UP': '0'}),
+    ('preload + warm-up', {'GUNICORN_PRELOAD': '1', 'WARM_UP': '1'}),
+    ('warm-up per worker', {'GUNICORN_PRELOAD': '0', 'WARM_UP': '1'}),
+)
+
+
+def spawn(settings, workers, port, cache_dir):
+    env = dict(os.environ, PORT=str(port), GUNICORN_WORKERS=str(workers), GUNICORN_WORKER_CLASS='gevent',
+               AUTH0_CALLBACK_URL=f'http://127.0.0.1:{port}/callback',
+               JINJA_CACHE_DIR=cache_dir, **settings)
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind',
+                                f'127.0.0.1:{port}', 'app:app'], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    while time.perf_counter() - start < 60:
+        try:
+            requests.get(f'http://127.0.0.1:{port}/', timeout=10)
+            return process, start, time.perf_counter() - start
+        except requests.RequestException:
+            time.sleep(0.005)
+    process.kill()
+    raise SystemExit('gunicorn did not start')
+
+
+def session_cookie():
+    # a signed-in session, so that no request verifies a token (and fetches the signing keys)
+    app = Flask(__name__)
+    app.secret_key = constants.SECRET_KEY
+    profile = {constants.PROFILE_KEY: {'user_id': 'bench', 'name': 'bench', 'picture': ''}}
+    serializer = SecureCookieSessionInterface().get_signing_serializer(app)
+    return {app.config['SESSION_COOKIE_NAME']: serializer.dumps(profile)}
+
+
+def worker_pids(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def memory(pid):
+    """(USS, PSS) of a process in bytes."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    return values['Private_Clean'] + values['Private_Dirty'], values['Pss']
+
+
+def run(settings, workers, rounds, cookie, port):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        process, start, ready = spawn(settings, workers, port, cache_dir)
+        try:
+            # a new connection per request, so they are spread over the workers
+            timeline = []
+            for _ in range(rounds):
+                for route in ROUTES:
+                    sent = time.perf_counter()
+                    response = requests.get(f'http://127.0.0.1:{port}{route}', cookies=cookie, allow_redirects=False)
+                    assert response.status_code == 200, (route, response.status_code)
+                    timeline.append((route, time.perf_counter() - sent, time.perf_counter() - start))
+            memories = [memory(pid) for pid in worker_pids(process.pid)]
+        finally:
+            process.terminate()
+            process.wait()
+
+    medians = {route: statistics.median([latency for r, latency, _ in timeline[len(timeline) // 2:] if r == route])
+               for route in ROUTES}
+    # the first requests of a route can go to any of the workers
+    first = {route: max([latency for r, latency, _ in timeline if r == route][:workers * 2]) for route in ROUTES}
+    # the end of the first round of requests to all routes without one over 3x its median
+    fast_after = None
+    for i in range(0, len(timeline), len(ROUTES)):
+        batch = timeline[i:i + len(ROUTES)]
+        if all(latency <= 3 * medians[route] for route, latency, _ in batch):
+            fast_after = batch[-1][2]
+            break
+    return ready, first, medians, fast_after, memories
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--rounds', type=int, default=30)
+    args = parser.parse_args()
+
+    # only for the app's settings, none of the requests calls it
+    configure(FakeAuth0().start())
+    cookie = session_cookie()
+    for label, settings in CONFIGURATIONS:
+        ready, first, medians, fast_after, memories = run(settings, args.workers, args.rounds, cookie, free_port())
+        fast = f'{fast_after * 1000:.0f} ms ({(fast_after - ready) * 1000:.0f} ms later)' if fast_after else 'never'
+        print(f'{label}: answers after {ready * 1000:.0f} ms, fast after {fast}')
+        for route in ROUTES:
+            print(f'  {route.split("?")[0]:<14} first {first[route] * 1000:7.1f} ms  '
+                  f'steady {medians[route] * 1000:6.1f} ms')
+        for i, (uss, pss) in enumerate(memories):
+            print(f'  worker {i + 1}: USS {uss / 2 ** 20:6.1f} MiB  PSS {pss / 2 ** 20:6.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
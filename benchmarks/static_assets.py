@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Bytes on the wire and worker CPU per load of /contact with its stylesheet, script
+and images: served as before from /public (uncompressed, revalidated on every
+visit) and fingerprinted from /assets (precompressed, immutable, so a repeat visit
+only fetches the page itself).
+
+    python benchmarks/static_assets.py [--loads 200]
+
+Needs the same environment as the app itself (constants.py, AUTH0_* variables).
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import ASSETS, app  # noqa: E402
+
+BROWSER = {'Accept-Encoding': 'gzip, deflate, br'}
+
+
+def page_load(client, urls, cache):
+    """Loads /contact and `urls` like a browser with the HTTP cache `cache`, returns the bytes received."""
+    received = len(client.get('/contact', headers=BROWSER).data)
+    for url in urls:
+        cached = cache.get(url)
+        if cached is not None and 'immutable' in cached.headers.get('Cache-Control', ''):
+            continue
+        headers = dict(BROWSER)
+        if cached is not None and cached.headers.get('ETag'):
+            headers['If-None-Match'] = cached.headers['ETag']
+        response = client.get(url, headers=headers)
+        received += len(response.data) + sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+        if response.status_code == 200:
+            cache[url] = response
+        response.close()
+    return received
+
+
+def measure(client, urls, loads):
+    """(bytes, worker CPU seconds) of a first visit and of a repeat visit."""
+    start = time.process_time()
+    first = sum(page_load(client, urls, {}) for _ in range(loads)) / loads
+    first_cpu = (time.process_time() - start) / loads
+    cache = {}
+    page_load(client, urls, cache)
+    start = time.process_time()
+    repeat = sum(page_load(client, urls, cache) for _ in range(loads)) / loads
+    return first, first_cpu, repeat, (time.process_time() - start) / loads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--loads', type=int, default=200)
+    args = parser.parse_args()
+
+    ASSETS.build_if_stale()
+    client = app.test_client()
+    page = client.get('/contact').data.decode('utf-8')
+    fingerprinted = re.findall(r'(?:src|href)="(/assets/[^"]+)"', page)
+    plain = [ASSETS.static_url_path + '/' + path
+             for path, hashed in ASSETS.manifest.items() if ASSETS.url_path + '/' + hashed in fingerprinted]
+
+    for name, urls in (('/public', plain), ('/assets', fingerprinted)):
+        first, first_cpu, repeat, repeat_cpu = measure(client, urls, args.loads)
+        print(f'{name:8} {len(urls)} assets, first visit {first / 1024:6.1f} KiB {first_cpu * 1000:5.2f} ms CPU, '
+              f'repeat visit {repeat / 1024:5.1f} KiB {repeat_cpu * 1000:5.2f} ms CPU')
+
+
+if __name__ == '__main__':
+    main()
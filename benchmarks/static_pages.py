@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Load test of the static content pages (/disclaimer, /agb, /contact): requests per
+second when every hit builds the dominate tree and renders generic.html (as before
+the page cache), through the page cache, and for revalidations answered with 304.
+
+    python benchmarks/static_pages.py [--requests 2000]
+
+Needs the same environment as the app itself (constants.py, AUTH0_* variables).
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import constants  # noqa: E402
+from app import app, agb_content, contact_content, disclaimer_content  # noqa: E402
+from flask import render_template, session  # noqa: E402
+
+PAGES = {'disclaimer': disclaimer_content, 'agb': agb_content, 'contact': contact_content}
+
+
+@app.route('/bench/uncached/<name>')
+def uncached(name):
+    return render_template('generic.html',
+                           pageinfo={'log_name': 'LogOut',
+                                     'log_link': '/logout',
+                                     'pic_display': 'block',
+                                     'content': PAGES[name]()},
+                           userinfo=session[constants.PROFILE_KEY])
+
+
+def rate(client, url, n, headers=None):
+    client.get(url, headers=headers)
+    start = time.perf_counter()
+    for _ in range(n):
+        client.get(url, headers=headers)
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s[constants.PROFILE_KEY] = {'user_id': 'bench', 'name': 'Bench', 'picture': 'https://example.com/p.png'}
+
+    print(f'{"page":<12}{"uncached (req/s)":>18}{"cached (req/s)":>16}{"304 (req/s)":>14}')
+    for name in PAGES:
+        before = rate(client, f'/bench/uncached/{name}', args.requests)
+        after = rate(client, f'/{name}', args.requests)
+        etag = client.get(f'/{name}').headers['ETag']
+        revalidated = rate(client, f'/{name}', args.requests, headers={'If-None-Match': etag})
+        print(f'{"/" + name:<12}{before:>18.0f}{after:>16.0f}{revalidated:>14.0f}')
+
+
+if __name__ == '__main__':
+    main()
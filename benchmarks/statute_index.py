@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Statute index on synthetic Fedlex (Akoma Ntoso) dumps of all acts: compile time and
+size, opening the index, article lookups per second against parsing the dump on
+demand, and citation extraction throughput on a long brief.
+
+    python benchmarks/statute_index.py [--articles 1000] [--brief-kb 500]
+
+--articles is the number of articles per act; the OR has about 1600, the ZGB 1000.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from statutes import ACTS, StatuteIndex, compile_index, extract, iter_articles  # noqa: E402
+
+AKN = 'http://docs.oasis-open.org/legaldocml/ns/akn/3.0'
+WORDS = ('Arbeitgeber', 'Arbeitnehmer', 'Kündigung', 'Frist', 'Vertrag', 'Schuldner', 'Gläubiger', 'Gericht',
+         'Partei', 'Anspruch', 'Schaden', 'Jahr', 'Monat', 'kann', 'muss', 'wird', 'nach', 'während', 'der', 'die',
+         'das', 'und', 'oder', 'nicht', 'sofern', 'schriftlich', 'vereinbart', 'innert')
+SUFFIXES = ('', '', '', '', 'a', 'b', 'c', 'bis')
+
+
+def sentence(rnd, words=18):
+    return ' '.join(rnd.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def article_numbers(n):
+    rnd = random.Random(n)
+    numbers, i = [], 1
+    while len(numbers) < n:
+        numbers.append(f'{i}{rnd.choice(SUFFIXES)}')
+        if numbers[-1] == str(i) or rnd.random() < 0.5:
+            i += 1
+    return list(dict.fromkeys(numbers))
+
+
+def write_act(path, act, numbers, rnd):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<akomaNtoso xmlns="{AKN}"><act name="{act}"><body>\n')
+        for number in numbers:
+            eid = 'art_' + '_'.join(filter(None, (number.rstrip('abcdefghijklmnopqrstuvwxyz'),
+                                                  number.lstrip('0123456789'))))
+            f.write(f'<article eId="{eid}"><num><b>Art. {number.rstrip("abcdefghijklmnopqrstuvwxyz")}</b>'
+                    f'<i>{number.lstrip("0123456789")}</i></num><heading>{escape(sentence(rnd, 3))}</heading>')
+            for paragraph in range(1, rnd.randint(1, 4) + 1):
+                f.write(f'<paragraph eId="{eid}/para_{paragraph}"><num>{paragraph}</num><content><p>'
+                        f'{escape(sentence(rnd))}<authorialNote><p>AS 2020 1 (Fussnote)</p></authorialNote></p>')
+                if rnd.random() < 0.2:
+                    f.write('<blockList>' + ''.join(f'<item><num>{letter}.</num><p>{escape(sentence(rnd, 8))}</p>'
+                                                    f'</item>' for letter in 'abc') + '</blockList>')
+                f.write('</content></paragraph>')
+            f.write('</article>\n')
+        f.write('</body></act></akomaNtoso>\n')
+
+
+def brief(size, numbers, rnd):
+    parts, length = [], 0
+    while length < size:
+        act = rnd.choice(list(ACTS))
+        citation = rnd.choice((f'Art. {rnd.choice(numbers[act])} {act}',
+                               f'Art. {rnd.choice(numbers[act])} Abs. {rnd.randint(1, 3)} {act}',
+                               f'Art. {rnd.choice(numbers[act])} Abs. 1 lit. b {act}',
+                               f'Art. {rnd.choice(numbers[act])} ff. {act}'))
+        part = f'{sentence(rnd, rnd.randint(10, 40))} Gemäss {citation} gilt Folgendes. '
+        parts.append(part)
+        length += len(part)
+    return ''.join(parts)
+
+
+def per_second(function, items):
+    start = time.perf_counter()
+    for item in items:
+        function(*item)
+    return len(items) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--articles', type=int, default=1000)
+    parser.add_argument('--brief-kb', type=int, default=500)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        dumps = os.path.join(tmp, 'fedlex')
+        os.mkdir(dumps)
+        numbers = {}
+        for act in ACTS:
+            numbers[act] = article_numbers(args.articles)
+            write_act(os.path.join(dumps, f'{act}.xml'), act, numbers[act], rnd)
+        size = sum(os.path.getsize(os.path.join(dumps, name)) for name in os.listdir(dumps))
+        print(f'{len(ACTS)} acts, {sum(map(len, numbers.values())):,} articles, {size / 2 ** 20:.0f} MiB of XML')
+
+        path = os.path.join(tmp, 'statutes.idx')
+        start = time.perf_counter()
+        compile_index(dumps, path)
+        print(f'compile: {time.perf_counter() - start:.1f} s, index {os.path.getsize(path) / 2 ** 20:.1f} MiB')
+
+        start = time.perf_counter()
+        index = StatuteIndex(path)
+        print(f'open: {(time.perf_counter() - start) * 1e6:.0f} µs for {index.count:,} records')
+
+        lookups = [(act, rnd.choice(numbers[act]), rnd.choice((None, '1', '2'))) for act in
+                   (rnd.choice(list(ACTS)) for _ in range(100000))]
+        print(f'lookup: {per_second(index.lookup, lookups):,.0f} per second')
+
+        def parse_on_demand(act, number, paragraph):
+            # what a request would cost without the index
+            for article in iter_articles(os.path.join(dumps, f'{act}.xml')):
+                if article.number == number:
+                    return article
+
+        print(f'parsing the dump instead: {per_second(parse_on_demand, lookups[:20]):,.1f} per second')
+
+        text = brief(args.brief_kb * 1024, numbers, rnd)
+        start = time.perf_counter()
+        citations = list(extract(text))
+        elapsed = time.perf_counter() - start
+        print(f'extract: {len(citations):,} citations in {len(text) / 1024:.0f} KiB, '
+              f'{len(text) / elapsed / 2 ** 20:.1f} MiB/s')
+        start = time.perf_counter()
+        resolved = index.resolve(text)
+        elapsed = time.perf_counter() - start
+        found = sum(citation['text'] is not None for citation in resolved)
+        print(f'extract and resolve: {elapsed * 1000:.0f} ms ({len(text) / elapsed / 2 ** 20:.1f} MiB/s), '
+              f'{found:,} of {len(resolved):,} found')
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
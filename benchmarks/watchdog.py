@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Watchlist matching cost per publication for a growing number of watchlists: all
+watchlists compiled into one automaton (watchlists.Matcher) against checking every
+watchlist on its own, plus the time and memory to build the automaton.
+
+    python benchmarks/watchdog.py [--watchlists 1000 10000 100000] [--publications 5000]
+
+The one-by-one check is skipped above --naive-limit watchlists, it only gets slower.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shab import Publication  # noqa: E402
+from watchlists import Matcher, normalise, pattern  # noqa: E402
+
+FIRST_NAMES = ('Hans', 'Peter', 'Anna', 'Maria', 'Daniel', 'Thomas', 'Sandra', 'Ursula', 'Reto', 'Beat', 'Jürg',
+               'Sébastien', 'Chantal', 'Luca', 'Giulia', 'Andrea', 'Martin', 'Monika', 'Stefan', 'Nicole')
+LAST_NAMES = ('Müller', 'Meier', 'Schmid', 'Keller', 'Weber', 'Huber', 'Schneider', 'Meyer', 'Steiner', 'Fischer',
+              'Gerber', 'Brunner', 'Baumann', 'Frei', 'Zimmermann', 'Moser', 'Widmer', 'Wyss', 'Graf', 'Roth',
+              'Favre', 'Rochat', 'Bernasconi', 'Rossi', 'Bühler', 'Zürcher', 'Hofer', 'Lüthi', 'Käser', 'Egli')
+WORDS = ('Alpen', 'Berg', 'Holz', 'Bau', 'Immobilien', 'Treuhand', 'Consulting', 'Digital', 'Garage', 'Bäckerei',
+         'Architektur', 'Transport', 'Gastro', 'Swiss', 'Helvetia', 'Invest', 'Partner', 'Technik', 'Elektro',
+         'Sanitär', 'Malerei', 'Informatik', 'Logistik', 'Medical', 'Pharma', 'Solar', 'Energie', 'Reisen')
+FORMS = ('AG', 'GmbH', 'SA', 'Sàrl', 'Genossenschaft', 'Stiftung', 'AG in Liquidation')
+
+
+def company(rnd):
+    n = rnd.randrange(500000)
+    return (f'{LAST_NAMES[n % len(LAST_NAMES)]} {WORDS[(n // 30) % len(WORDS)]} {n % 997}',
+            f'CHE-{100 + n // 1000000:03d}.{(n // 1000) % 1000:03d}.{n % 1000:03d}')
+
+
+def person(rnd):
+    return f'{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}'
+
+
+def publications(n):
+    rnd = random.Random(n)
+    for i in range(n):
+        name, uid = company(rnd)
+        name = f'{name} {rnd.choice(FORMS)}'
+        members = ', '.join(f'{p.split()[1]}, {p.split()[0]}, von Zürich, in Bern' for p in
+                            (person(rnd) for _ in range(rnd.randint(1, 4))))
+        yield Publication(number=f'HR02-{i:010d}', date='2024-01-01', type='HR02', canton='BE',
+                          uid=uid.replace('-', '').replace('.', ''), name=name, title=f'{name}, Mutation',
+                          message=f'{name}, in Bern, {uid}. Statutenänderung. Eingetragene Personen neu oder '
+                                  f'mutierend: {members}, Mitglied mit Kollektivunterschrift zu zweien. ' +
+                                  'Weitere Angaben zum Zweck der Gesellschaft. ' * 5)
+
+
+def watchlist_entries(n):
+    """(entry, watchlist, pattern) for n watchlists of 1 to 5 companies, UIDs and persons each."""
+    rnd = random.Random(-n)
+    entry = 0
+    for watchlist in range(n):
+        for _ in range(rnd.randint(1, 5)):
+            entry += 1
+            kind = rnd.choice(('name', 'name', 'uid', 'person'))
+            name, uid = company(rnd)
+            value = {'name': f'{name} {rnd.choice(FORMS)}', 'uid': uid, 'person': person(rnd)}[kind]
+            yield entry, watchlist, pattern(kind, value)
+
+
+def one_by_one(entries, batch):
+    # every watchlist entry checked on its own against the words of every publication
+    hits = 0
+    for publication in batch:
+        text = ' ' + ' '.join(normalise(f'{publication.name} {publication.title} {publication.message}')) + ' '
+        uids = {'uid:' + uid for uid in publication.uid.split(';')}
+        for _, _, pattern_ in entries:
+            for alternative in pattern_.split('|'):
+                if alternative in uids or f' {alternative} ' in text:
+                    hits += 1
+                    break
+    return hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--watchlists', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--publications', type=int, default=5000)
+    parser.add_argument('--naive-limit', type=int, default=10000)
+    args = parser.parse_args()
+
+    batch = list(publications(args.publications))
+    for n in args.watchlists:
+        entries = list(watchlist_entries(n))
+        start = time.perf_counter()
+        matcher = Matcher(entries)
+        built = time.perf_counter() - start
+        tracemalloc.start()
+        Matcher(entries)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        texts = [(normalise(p.name), normalise(p.title), normalise(p.message), ['uid:' + p.uid]) for p in batch]
+        start = time.perf_counter()
+        for text in texts:
+            matcher.automaton.find(*text)
+        scanned = time.perf_counter() - start
+        start = time.perf_counter()
+        hits = sum(len(matcher.match(publication)) for publication in batch)
+        elapsed = time.perf_counter() - start
+        line = (f'{n:>7} watchlists ({len(entries):>6} entries, {matcher.automaton.states:>6} states): '
+                f'built in {built * 1000:5.0f} ms, {peak / 2 ** 20:5.1f} MiB; automaton pass '
+                f'{scanned / len(batch) * 1e6:5.1f} µs, with normalising and hits {elapsed / len(batch) * 1e6:5.1f} '
+                f'µs/publication ({hits / len(batch):.0f} hits each)')
+        if n <= args.naive_limit:
+            start = time.perf_counter()
+            naive_hits = one_by_one(entries, batch[:500])
+            naive = (time.perf_counter() - start) / min(len(batch), 500)
+            line += f'; one by one {naive * 1e6:.0f} µs ({naive_hits / min(len(batch), 500):.0f} hits each)'
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
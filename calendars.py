@@ -0,0 +1,254 @@
+# coding=utf-8
+import threading
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+from workalendar.europe import Switzerland
+from workalendar.registry import registry
+
+CANTONS = {
+    'AG': 'Aargau',
+    'AI': 'Appenzell Innerrhoden',
+    'AR': 'Appenzell Ausserrhoden',
+    'BE': 'Bern',
+    'BL': 'Basel-Landschaft',
+    'BS': 'Basel-Stadt',
+    'FR': 'Freiburg',
+    'GE': 'Genf',
+    'GL': 'Glarus',
+    'GR': 'Graubünden',
+    'JU': 'Jura',
+    'LU': 'Luzern',
+    'NE': 'Neuenburg',
+    'NW': 'Nidwalden',
+    'OW': 'Obwalden',
+    'SG': 'St. Gallen',
+    'SH': 'Schaffhausen',
+    'SO': 'Solothurn',
+    'SZ': 'Schwyz',
+    'TG': 'Thurgau',
+    'TI': 'Tessin',
+    'UR': 'Uri',
+    'VD': 'Waadt',
+    'VS': 'Wallis',
+    'ZG': 'Zug',
+    'ZH': 'Zürich',
+}
+
+
+_SWITZERLAND = Switzerland()
+
+# the years the day tables are built for, ValueError for dates outside them
+FIRST_YEAR = 1900
+LAST_YEAR = 2199
+YEARS = range(FIRST_YEAR, LAST_YEAR + 1)
+
+
+def _year_days(year: int) -> np.ndarray:
+    return np.arange(np.datetime64(f'{year}-01-01'), np.datetime64(f'{year + 1}-01-01'))
+
+
+def _mark(days: np.ndarray, year: int, first: date, last: date) -> None:
+    """Flags the days of `year` from `first` up to and including `last`."""
+    year_start = date(year, 1, 1)
+    lo = max((first - year_start).days, 0)
+    hi = min((last - year_start).days, len(days) - 1)
+    if lo <= hi:
+        days[lo:hi + 1] = True
+
+
+class _Span(NamedTuple):
+    first_year: int
+    last_year: int
+    epoch: date
+    flags: np.ndarray
+    # cumulative[i] is the number of flagged days before day i
+    cumulative: np.ndarray
+
+
+class DayTable(object):
+    """
+    Flags every day of a contiguous range of whole years (a bitmap built one year at a
+    time by `build_year`) together with the cumulative count of flagged days, so that
+    counting flagged days between two dates is O(1) and finding the n-th flagged day
+    after a date is a binary search. The range grows on demand.
+    """
+
+    def __init__(self, build_year: Callable[[int], np.ndarray]):
+        self._build_year = build_year
+        self._lock = threading.Lock()
+        # replaced as a whole when the range grows, so readers never see a half-built table
+        self._span = None  # type: Optional[_Span]
+
+    def span(self, first_year: int, last_year: int) -> _Span:
+        """Returns the table covering at least the years `first_year` to `last_year`."""
+        if first_year < FIRST_YEAR or last_year > LAST_YEAR:
+            raise ValueError(f'Datum ausserhalb der Jahre {FIRST_YEAR} bis {LAST_YEAR}')
+        span = self._span
+        if span is not None and span.first_year <= first_year and last_year <= span.last_year:
+            return span
+
+        with self._lock:
+            span = self._span
+            if span is None:
+                flags = np.concatenate([self._build_year(y) for y in range(first_year, last_year + 1)])
+            else:
+                before = [self._build_year(y) for y in range(first_year, span.first_year)]
+                after = [self._build_year(y) for y in range(span.last_year + 1, last_year + 1)]
+                flags = np.concatenate(before + [span.flags] + after)
+                first_year = min(first_year, span.first_year)
+                last_year = max(last_year, span.last_year)
+
+            cumulative = np.zeros(len(flags) + 1, dtype=np.int32)
+            np.cumsum(flags, out=cumulative[1:])
+            self._span = _Span(first_year, last_year, date(first_year, 1, 1), flags, cumulative)
+            return self._span
+
+    def __contains__(self, day: date) -> bool:
+        span = self.span(day.year, day.year)
+        return bool(span.flags[(day - span.epoch).days])
+
+    def count(self, start: date, end: date) -> int:
+        """Number of flagged days after `start` up to and including `end`."""
+        if end < start:
+            return -self.count(end, start)
+        span = self.span(start.year, end.year)
+        return int(span.cumulative[(end - span.epoch).days + 1] - span.cumulative[(start - span.epoch).days + 1])
+
+    def nth_after(self, start: date, n: int) -> date:
+        """The `n`-th flagged day after `start` (`start` itself for n = 0)."""
+        if n <= 0:
+            return start
+        last_year = start.year + 1 + n // 200
+        while True:
+            span = self.span(start.year, last_year)
+            target = span.cumulative[(start - span.epoch).days + 1] + n
+            i = int(np.searchsorted(span.cumulative, target, side='left'))
+            if i < len(span.cumulative):
+                return span.epoch + timedelta(days=i - 1)
+            last_year += 1 + n // 200
+
+    def next_flagged(self, day: date) -> date:
+        """`day` itself if it is flagged, otherwise the next flagged day."""
+        return self.nth_after(day - timedelta(days=1), 1)
+
+    def count_many(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Vectorised `count` over datetime64[D] arrays."""
+        if not len(starts):
+            return np.zeros(0, dtype=np.int64)
+        lo = min(starts.min(), ends.min()).astype(object)
+        hi = max(starts.max(), ends.max()).astype(object)
+        span = self.span(lo.year, hi.year)
+        epoch = np.datetime64(span.epoch, 'D')
+        i = (starts - epoch).astype(np.int64) + 1
+        j = (ends - epoch).astype(np.int64) + 1
+        return span.cumulative[j].astype(np.int64) - span.cumulative[i]
+
+
+def court_holidays(year: int) -> np.ndarray:
+    """Gerichtsferien per Art. 145 Abs. 1 ZPO, flagged for every day of `year`."""
+    days = np.zeros(len(_year_days(year)), dtype=bool)
+    easter = _SWITZERLAND.get_easter_sunday(year)
+    _mark(days, year, easter - timedelta(days=7), easter + timedelta(days=7))
+    _mark(days, year, date(year, 7, 15), date(year, 8, 15))
+    _mark(days, year, date(year - 1, 12, 18), date(year, 1, 2))
+    _mark(days, year, date(year, 12, 18), date(year + 1, 1, 2))
+    return days
+
+
+def debt_collection_holidays(year: int) -> np.ndarray:
+    """Betreibungsferien per Art. 56 Ziff. 2 SchKG, flagged for every day of `year`."""
+    days = np.zeros(len(_year_days(year)), dtype=bool)
+    easter = _SWITZERLAND.get_easter_sunday(year)
+    _mark(days, year, easter - timedelta(days=7), easter + timedelta(days=7))
+    _mark(days, year, date(year, 7, 15), date(year, 7, 31))
+    _mark(days, year, date(year - 1, 12, 18), date(year, 1, 1))
+    _mark(days, year, date(year, 12, 18), date(year + 1, 1, 1))
+    return days
+
+
+# days on which a period under the ZPO keeps running, and the SchKG's Betreibungsferien
+COURT_DAYS = DayTable(lambda year: ~court_holidays(year))
+DEBT_COLLECTION_HOLIDAYS = DayTable(debt_collection_holidays)
+DEBT_COLLECTION_DAYS = DayTable(lambda year: ~debt_collection_holidays(year))
+
+
+class BusinessCalendar(object):
+    """
+    Working days of a canton (national calendar if no canton is given): Monday to Friday
+    without the public holidays known to workalendar, precomputed per year.
+    """
+
+    def __init__(self, canton: Optional[str] = None):
+        if canton:
+            calendar_class = registry.get('CH-' + canton)
+            if calendar_class is None:
+                raise KeyError(f'unknown canton {canton}')
+            self.calendar = calendar_class()
+        else:
+            self.calendar = _SWITZERLAND
+        self.canton = canton
+        self.working_days = DayTable(self._working_days)
+        self.working_court_days = DayTable(lambda year: self._working_days(year) & ~court_holidays(year))
+
+    def holidays(self, year: int) -> np.ndarray:
+        """Public holidays of `year` as datetime64[D]."""
+        return np.array(sorted(day for day, _ in self.calendar.holidays(year)), dtype='datetime64[D]')
+
+    def _working_days(self, year: int) -> np.ndarray:
+        days = _year_days(year)
+        return np.is_busday(days, holidays=self.holidays(year))
+
+    def is_working_day(self, day: date) -> bool:
+        return day in self.working_days
+
+    def count_working_days(self, start: date, end: date) -> int:
+        """Working days after `start` up to and including `end`."""
+        return self.working_days.count(start, end)
+
+    def add_working_days(self, start: date, n: int) -> date:
+        return self.working_days.nth_after(start, n)
+
+    def next_working_day(self, day: date) -> date:
+        """Rolls `day` forward to the next working day, if it isn't one already."""
+        return self.working_days.next_flagged(day)
+
+
+@lru_cache(maxsize=None)
+def business_calendar(canton: Optional[str] = None) -> BusinessCalendar:
+    return BusinessCalendar(canton or None)
+
+
+def preload(first_year: int, last_year: int) -> None:
+    """Builds the day tables of the national calendar and of every canton for the given years."""
+    for table in (COURT_DAYS, DEBT_COLLECTION_HOLIDAYS, DEBT_COLLECTION_DAYS):
+        table.span(first_year, last_year)
+    for canton in (None,) + tuple(CANTONS):
+        calendar = business_calendar(canton)
+        calendar.working_days.span(first_year, last_year)
+        calendar.working_court_days.span(first_year, last_year)
+
+
+MODES = {
+    'calendar': 'Kalendertage',
+    'business': 'Werktage',
+    'court': 'Tage ohne Gerichtsferien',
+}
+
+
+def count_days(starts: np.ndarray, ends: np.ndarray, mode: str = 'calendar',
+               canton: Optional[str] = None) -> np.ndarray:
+    """
+    Days after each start up to and including its end (negative if the end comes first)
+    for datetime64[D] arrays: all calendar days, working days of `canton` or days outside
+    the Gerichtsferien.
+    """
+    if mode == 'calendar':
+        return (ends - starts).astype(np.int64)
+    if mode == 'business':
+        return business_calendar(canton).working_days.count_many(starts, ends)
+    if mode == 'court':
+        return COURT_DAYS.count_many(starts, ends)
+    raise ValueError(f'unknown mode {mode}')
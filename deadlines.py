@@ -0,0 +1,96 @@
+# coding=utf-8
+from calendar import monthrange
+from datetime import date, timedelta
+from typing import NamedTuple, Optional, Tuple
+
+from calendars import COURT_DAYS, DEBT_COLLECTION_DAYS, DEBT_COLLECTION_HOLIDAYS, business_calendar
+
+UNITS = {
+    'days': 'Tage',
+    'weeks': 'Wochen',
+    'months': 'Monate',
+}
+
+# longest period accepted per unit, ten years
+MAX_AMOUNTS = {
+    'days': 3660,
+    'weeks': 522,
+    'months': 120,
+}
+
+RULES = {
+    'zpo': 'ZPO',
+    'zpo_summary': 'ZPO, summarisches Verfahren / Schlichtung',
+    'schkg': 'SchKG',
+}
+
+
+class Deadline(NamedTuple):
+    trigger: date
+    nominal_end: date
+    end: date
+    notes: Tuple[str, ...]
+
+
+def add_months(day: date, months: int) -> date:
+    """Same day number `months` later, the last day of the month if that month is shorter."""
+    month = day.month - 1 + months
+    year = day.year + month // 12
+    month = month % 12 + 1
+    return date(year, month, min(day.day, monthrange(year, month)[1]))
+
+
+def nominal_end(trigger: date, amount: int, unit: str) -> date:
+    """End of a period without holidays (Art. 142 Abs. 1 und 2 ZPO, Art. 31 SchKG)."""
+    if unit == 'days':
+        return trigger + timedelta(days=amount)
+    if unit == 'weeks':
+        return trigger + timedelta(weeks=amount)
+    if unit == 'months':
+        return add_months(trigger, amount)
+    raise ValueError(f'unknown unit {unit}')
+
+
+def due_date(trigger: date, amount: int, unit: str = 'days', rule: str = 'zpo',
+             canton: Optional[str] = None) -> Deadline:
+    """
+    Last day of a period of `amount` days, weeks or months triggered on `trigger`, for
+    a court in `canton` (national holidays only if None).
+    """
+    if rule not in RULES:
+        raise ValueError(f'unknown rule {rule}')
+    if not 0 <= amount <= MAX_AMOUNTS.get(unit, 0):
+        raise ValueError(f'amount must be between 0 and {MAX_AMOUNTS.get(unit, 0)} {unit}')
+
+    calendar = business_calendar(canton)
+    nominal = nominal_end(trigger, amount, unit)
+    notes = []
+
+    if rule == 'zpo':
+        # Art. 145 Abs. 1 ZPO: the period stands still during the Gerichtsferien, so each of
+        # its calendar days has to be counted on a day outside of them
+        end = COURT_DAYS.nth_after(trigger, (nominal - trigger).days)
+        if end != nominal:
+            notes.append(f'Fristenstillstand während der Gerichtsferien (Art. 145 ZPO): '
+                         f'+{(end - nominal).days} Tage')
+        rolled = calendar.working_court_days.next_flagged(end)
+        if rolled != end:
+            notes.append('Fristende auf nächsten Werktag verschoben (Art. 142 Abs. 3 ZPO)')
+        end = rolled
+
+    elif rule == 'zpo_summary':
+        end = calendar.next_working_day(nominal)
+        if end != nominal:
+            notes.append('Fristende auf nächsten Werktag verschoben (Art. 142 Abs. 3 ZPO)')
+
+    else:
+        end = calendar.next_working_day(nominal)
+        if end != nominal:
+            notes.append('Fristende auf nächsten Werktag verschoben (Art. 31 SchKG)')
+        if end in DEBT_COLLECTION_HOLIDAYS:
+            # Art. 63 SchKG: runs until the third day after the end of the Betreibungsferien
+            end = calendar.next_working_day(DEBT_COLLECTION_DAYS.next_flagged(end) + timedelta(days=2))
+            notes.append('Fristende in den Betreibungsferien, verlängert bis zum dritten Tag '
+                         'nach deren Ende (Art. 63 SchKG)')
+
+    return Deadline(trigger=trigger, nominal_end=nominal, end=end, notes=tuple(notes))
@@ -0,0 +1,215 @@
+# coding=utf-8
+import io
+import os
+import re
+import threading
+import zipfile
+from bisect import bisect_right
+from concurrent.futures import Executor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from xml.sax.saxutils import escape
+
+# {{ firma }}, {{ verwaltungsrat.name }}
+PLACEHOLDER_RE = re.compile(r'\{\{\s*([A-Za-z_][\w.]*)\s*\}\}')
+# the parts of a .docx with text a placeholder can be in
+TEXT_PARTS_RE = re.compile(r'word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$')
+_TEXT_RE = re.compile(r'(<w:t(?:\s[^>]*)?>)([^<]*)(</w:t>)')
+_PRESERVE = ' xml:space="preserve"'
+# not allowed in XML, so it cannot occur in a part: marks the fields while compiling
+_MARK = '\0'
+# control characters XML 1.0 does not allow in values
+_INVALID_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_BREAKS = {'\n': f'</w:t><w:br/><w:t{_PRESERVE}>', '\t': f'</w:t><w:tab/><w:t{_PRESERVE}>'}
+
+
+def _compile_part(xml: str) -> Optional[Tuple[List[bytes], List[str]]]:
+    """
+    (literals, fields) of a part with placeholders, None without: the part is the
+    literals with the value of fields[i] between literals[i] and literals[i + 1].
+    Word splits text into runs as it pleases ('{{ fir' 'ma }}'), so a placeholder is
+    found in the text of all <w:t> elements joined and moved into the first of them.
+    """
+    nodes = list(_TEXT_RE.finditer(xml))
+    texts = [node.group(2) for node in nodes]
+    starts, offset = [], 0
+    for text in texts:
+        starts.append(offset)
+        offset += len(text)
+    joined = ''.join(texts)
+    matches = list(PLACEHOLDER_RE.finditer(joined))
+    if not matches:
+        return None
+
+    fields = set()
+    # from the last to the first, so the offsets of the earlier ones stay valid
+    for match in reversed(matches):
+        first = bisect_right(starts, match.start()) - 1
+        last = bisect_right(starts, match.end() - 1) - 1
+        before = match.start() - starts[first]
+        after = match.end() - starts[last]
+        tail = texts[last][after:]
+        for i in range(first + 1, last + 1):
+            texts[i] = ''
+        texts[first] = texts[first][:before] + _MARK + match.group(1) + _MARK + (tail if first == last else '')
+        if first != last:
+            texts[last] = tail
+        fields.add(first)
+
+    parts, position = [], 0
+    for i, node in enumerate(nodes):
+        tag = node.group(1)
+        # values may start or end with spaces
+        if i in fields and 'xml:space' not in tag:
+            tag = tag[:-1] + _PRESERVE + '>'
+        parts.extend((xml[position:node.start()], tag, texts[i], node.group(3)))
+        position = node.end()
+    parts.append(xml[position:])
+    segments = ''.join(parts).split(_MARK)
+    return [segment.encode('utf-8') for segment in segments[::2]], segments[1::2]
+
+
+def _xml_value(value: str) -> bytes:
+    value = escape(_INVALID_RE.sub('', value))
+    for character, markup in _BREAKS.items():
+        value = value.replace(character, markup)
+    return value.encode('utf-8')
+
+
+class Template(object):
+    """
+    A .docx template compiled once: the parts without placeholders are compressed into
+    a zip of their own, the parts with placeholders are kept as literal XML and field
+    names. Rendering joins each of those with the values and appends it to a copy of
+    the zip, so only the few parts with fields are compressed per document.
+    """
+
+    def __init__(self, base: bytes, parts: List[Tuple[zipfile.ZipInfo, List[bytes], List[str]]]):
+        self._base = base
+        self._parts = parts
+        # in the order they first appear
+        self.fields = tuple(dict.fromkeys(field for _, _, fields in parts for field in fields))
+
+    def render(self, values: Dict[str, Union[str, int, float]]) -> bytes:
+        missing = [field for field in self.fields if field not in values]
+        if missing:
+            raise ValueError(f'missing fields: {", ".join(missing)}')
+        for field in self.fields:
+            if not isinstance(values[field], (str, int, float)) or isinstance(values[field], bool):
+                raise ValueError(f'{field} must be text or a number')
+        encoded = {field: _xml_value(str(values[field])) for field in self.fields}
+        buffer = io.BytesIO(self._base)
+        with zipfile.ZipFile(buffer, 'a', zipfile.ZIP_DEFLATED) as docx:
+            for info, literals, fields in self._parts:
+                data = [literals[0]]
+                for field, literal in zip(fields, literals[1:]):
+                    data.append(encoded[field])
+                    data.append(literal)
+                docx.writestr(zipfile.ZipInfo(info.filename, info.date_time), b''.join(data),
+                              compress_type=zipfile.ZIP_DEFLATED)
+        return buffer.getvalue()
+
+
+def compile_template(path: str) -> Template:
+    buffer = io.BytesIO()
+    parts = []
+    with zipfile.ZipFile(path) as source, zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as base:
+        for info in source.infolist():
+            data = source.read(info)
+            compiled = _compile_part(data.decode('utf-8')) if TEXT_PARTS_RE.match(info.filename) else None
+            if compiled is None:
+                base.writestr(zipfile.ZipInfo(info.filename, info.date_time), data, compress_type=zipfile.ZIP_DEFLATED)
+            else:
+                parts.append((info,) + compiled)
+    return Template(buffer.getvalue(), parts)
+
+
+class TemplateCache(object):
+    """
+    The compiled templates of a directory, compiled on first use and again when the
+    file changes (modification time or size). A package is a subdirectory whose
+    templates are rendered together with the same values, e.g. founderbot/.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._templates = {}  # type: Dict[str, Tuple[Tuple[int, int], Template]]
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        path = os.path.normpath(os.path.join(self.directory, name))
+        if not path.startswith(os.path.join(os.path.normpath(self.directory), '')) or not os.path.isfile(path):
+            raise KeyError(name)
+        return path
+
+    def get(self, name: str) -> Template:
+        """The template `name` (relative to the directory), KeyError if there is none."""
+        path = self._path(name)
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._templates.get(name)
+        if cached is None or cached[0] != key:
+            with self._lock:
+                cached = self._templates.get(name)
+                if cached is None or cached[0] != key:
+                    cached = self._templates[name] = (key, compile_template(path))
+        return cached[1]
+
+    def package(self, package: str) -> Dict[str, Template]:
+        """file name -> template of every .docx of the package, KeyError if it has none."""
+        directory = os.path.join(self.directory, package)
+        if not package or os.sep in package or package.startswith('.') or not os.path.isdir(directory):
+            raise KeyError(package)
+        # ~$ are the lock files Word leaves next to open documents
+        names = sorted(name for name in os.listdir(directory) if name.endswith('.docx') and not name.startswith('~$'))
+        if not names:
+            raise KeyError(package)
+        return {name: self.get(os.path.join(package, name)) for name in names}
+
+    def fields(self, package: str) -> Tuple[str, ...]:
+        return tuple(dict.fromkeys(field for template in self.package(package).values() for field in template.fields))
+
+    def render(self, package: str, values: Dict) -> Dict[str, bytes]:
+        """file name -> rendered document, for every template of the package."""
+        templates = self.package(package)
+        missing = [field for field in self.fields(package) if field not in values]
+        if missing:
+            raise ValueError(f'missing fields: {", ".join(missing)}')
+        return {name: template.render(values) for name, template in templates.items()}
+
+
+# per worker process of a pool, see init_worker
+_WORKER_CACHE = None  # type: Optional[TemplateCache]
+
+
+def init_worker(directory: str) -> None:
+    """Initializer of the process pool given to render_batch."""
+    global _WORKER_CACHE
+    _WORKER_CACHE = TemplateCache(directory)
+
+
+def _render(cache: TemplateCache, package: str, values: Dict) -> Union[Dict[str, bytes], str]:
+    try:
+        return cache.render(package, values)
+    except (KeyError, ValueError) as ex:
+        return str(ex)
+
+
+def _render_row(args: Tuple[str, Dict]) -> Union[Dict[str, bytes], str]:
+    return _render(_WORKER_CACHE, *args)
+
+
+def render_batch(cache: TemplateCache, package: str, rows: Iterable[Dict], executor: Optional[Executor] = None,
+                 workers: int = 1) -> Iterator[Union[Dict[str, bytes], str]]:
+    """
+    The package rendered for each row of values, in order: file name -> document, or
+    an error message for rows that cannot be rendered. With an `executor` (a process
+    pool initialised with init_worker for the same directory, `workers` processes) the
+    rows are fanned out over it, each process compiling the templates once.
+    """
+    rows = list(rows)
+    if executor is None:
+        for values in rows:
+            yield _render(cache, package, values)
+        return
+    chunksize = max(1, len(rows) // (workers * 4))
+    yield from executor.map(_render_row, ((package, values) for values in rows), chunksize=chunksize)
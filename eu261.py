@@ -0,0 +1,282 @@
+# coding=utf-8
+# Compensation under Regulation (EC) No 261/2004 (applied in Switzerland through the bilateral
+# air transport agreement) for delayed and cancelled flights and denied boarding.
+#
+# data/airports.csv holds every airport with an IATA code, taken from the airportsdata package
+# (MIT licence, https://github.com/mborsetti/airportsdata).
+import csv
+import math
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+# EU member states, the other EEA states and Switzerland, plus the outermost regions
+# that have ISO codes of their own (the Canaries, Azores and Madeira are ES/PT anyway)
+EU_COUNTRIES = frozenset((
+    'AT', 'BE', 'BG', 'HR', 'CY', 'CZ', 'DK', 'EE', 'FI', 'FR', 'DE', 'GR', 'HU', 'IE', 'IT', 'LV', 'LT', 'LU',
+    'MT', 'NL', 'PL', 'PT', 'RO', 'SK', 'SI', 'ES', 'SE',
+    'IS', 'LI', 'NO', 'CH',
+    'GP', 'GF', 'MQ', 'RE', 'YT', 'MF',
+))
+
+EARTH_RADIUS_KM = 6371.0
+
+KINDS = ('delay', 'cancellation', 'denied_boarding')
+# Art. 7(1): up to 1500 km, intra-EU above 1500 km and others up to 3500 km, others above
+AMOUNTS_EUR = np.array([250.0, 400.0, 600.0])
+# Art. 7(2): halved if the rerouted flight arrives at most this many minutes late, per band
+REROUTE_HALVED_MINUTES = np.array([120.0, 180.0, 240.0])
+# arrival delay giving a right to compensation (CJEU C-402/07 Sturgeon)
+DELAY_MINUTES = 180.0
+
+# why a flight gets nothing; where several apply, the last one is reported
+REASONS = {
+    'notice': 'Rechtzeitig über die Annullierung informiert (Art. 5 Abs. 1 lit. c)',
+    'delay_under_3h': 'Ankunftsverspätung unter 3 Stunden',
+    'extraordinary': 'Aussergewöhnliche Umstände (Art. 5 Abs. 3)',
+    'not_covered': 'Flug fällt nicht unter die Verordnung (EG) Nr. 261/2004',
+    'unknown_airport': 'Flughafen unbekannt',
+}
+_REASON_CODES = list(REASONS)
+
+_SLOTS = 26 ** 3
+
+
+class Airport(NamedTuple):
+    iata: str
+    country: str
+    lat: float
+    lon: float
+    name: str
+    city: str
+
+    @property
+    def eu(self) -> bool:
+        return self.country in EU_COUNTRIES
+
+
+class Assessment(NamedTuple):
+    distance_km: Optional[float]
+    band: Optional[int]
+    amount_eur: float
+    reason: Optional[str]
+
+    @property
+    def eligible(self) -> bool:
+        return self.amount_eur > 0
+
+
+def _slot(code: str) -> int:
+    """Position of a three letter IATA code in the direct-address arrays, -1 if it is none."""
+    if len(code) != 3:
+        return -1
+    a, b, c = ord(code[0]) - 65, ord(code[1]) - 65, ord(code[2]) - 65
+    if 0 <= a < 26 and 0 <= b < 26 and 0 <= c < 26:
+        return (a * 26 + b) * 26 + c
+    return -1
+
+
+class AirportIndex(object):
+    """
+    Airports addressed directly by their IATA code: AAA..ZZZ is mapped to 0..17575 and
+    latitude, longitude (radians) and EU membership live in arrays of that size, so a
+    lookup is an index operation, for one code or a whole array of them.
+    """
+
+    def __init__(self, airports: Sequence[Airport]):
+        self.lat = np.full(_SLOTS, np.nan)
+        self.lon = np.full(_SLOTS, np.nan)
+        self.eu = np.zeros(_SLOTS, dtype=bool)
+        self._airports = [None] * _SLOTS  # type: List[Optional[Airport]]
+        for airport in airports:
+            slot = _slot(airport.iata)
+            self.lat[slot] = math.radians(airport.lat)
+            self.lon[slot] = math.radians(airport.lon)
+            self.eu[slot] = airport.eu
+            self._airports[slot] = airport
+        self.count = len(airports)
+
+    @classmethod
+    def from_csv(cls, path: str) -> 'AirportIndex':
+        with open(path, encoding='utf-8', newline='') as f:
+            return cls([Airport(iata=row['iata'], country=row['country'], lat=float(row['lat']),
+                                lon=float(row['lon']), name=row['name'], city=row['city'])
+                        for row in csv.DictReader(f)])
+
+    def get(self, code: str) -> Optional[Airport]:
+        slot = _slot(code.strip().upper())
+        return self._airports[slot] if slot >= 0 else None
+
+    def __contains__(self, code: str) -> bool:
+        return self.get(code) is not None
+
+    def slots(self, codes: Sequence[str]) -> np.ndarray:
+        """Slots of many codes, -1 where a code is no valid IATA code."""
+        codes = [str(code).strip().upper() for code in codes]
+        if all(len(code) == 3 for code in codes):
+            try:
+                letters = np.frombuffer(''.join(codes).encode('ascii'), dtype=np.uint8).reshape(-1, 3)
+            except UnicodeEncodeError:
+                pass
+            else:
+                letters = letters.astype(np.intp) - 65
+                slots = (letters[:, 0] * 26 + letters[:, 1]) * 26 + letters[:, 2]
+                slots[((letters < 0) | (letters > 25)).any(axis=1)] = -1
+                return slots
+        return np.array([_slot(code) for code in codes], dtype=np.intp)
+
+    def distances(self, origins: np.ndarray, destinations: np.ndarray) -> np.ndarray:
+        """Great circle distances in km between the airports in two slot arrays (haversine), NaN if unknown."""
+        valid = (origins >= 0) & (destinations >= 0)
+        origins, destinations = np.where(valid, origins, 0), np.where(valid, destinations, 0)
+        lat1, lat2 = self.lat[origins], self.lat[destinations]
+        h = (np.sin((lat2 - lat1) / 2) ** 2
+             + np.cos(lat1) * np.cos(lat2) * np.sin((self.lon[destinations] - self.lon[origins]) / 2) ** 2)
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+        distances[~valid] = np.nan
+        return distances
+
+    def distance(self, origin: str, destination: str) -> Optional[float]:
+        a, b = self.get(origin), self.get(destination)
+        return _haversine(a, b) if a is not None and b is not None else None
+
+
+def _haversine(a: Airport, b: Airport) -> float:
+    lat1, lat2 = math.radians(a.lat), math.radians(b.lat)
+    h = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin(math.radians(b.lon - a.lon) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(h, 1.0)))
+
+
+def _floats(values, default=np.nan) -> np.ndarray:
+    return np.array([default if value is None or value == '' else value for value in values], dtype=np.float64)
+
+
+def _in_time(notice_days: float, early: Optional[float], late: Optional[float]) -> bool:
+    # Art. 5(1)(c): no compensation with two weeks' notice, nor with one week's (less) notice and
+    # a reroute leaving at most two (one) hours early and arriving less than four (two) hours late
+    if notice_days >= 14:
+        return True
+    if late is None:
+        return False
+    early = early or 0
+    if notice_days >= 7:
+        return early <= 120 and late < 240
+    return early <= 60 and late < 120
+
+
+def assess(index: AirportIndex, origin: str, destination: str, kind: str = 'delay', delay_minutes: float = 0,
+           notice_days: float = 0, reroute_departure_early_minutes: Optional[float] = None,
+           reroute_arrival_delay_minutes: Optional[float] = None, eu_carrier: bool = True,
+           extraordinary: bool = False) -> Assessment:
+    """
+    Assesses a flight. `kind` is one of KINDS, `delay_minutes` the delay at arrival (for
+    delays), `notice_days` how long before departure a cancellation was announced, the
+    reroute_* values describe the replacement flight offered on cancellation or denied
+    boarding (None: none offered), `eu_carrier` whether the operating airline is licensed
+    in the EU/CH and `extraordinary` whether it can invoke extraordinary circumstances.
+    """
+    if kind not in KINDS:
+        raise ValueError(f'unknown kind(s): {kind}')
+    a, b = index.get(origin), index.get(destination)
+    if a is None or b is None:
+        return Assessment(distance_km=None, band=None, amount_eur=0.0, reason='unknown_airport')
+    distance = _haversine(a, b)
+    band = 0 if distance <= 1500 else 1 if (a.eu and b.eu) or distance <= 3500 else 2
+
+    late = reroute_arrival_delay_minutes
+    reason = None
+    if kind == 'cancellation' and _in_time(notice_days or 0, reroute_departure_early_minutes, late):
+        reason = 'notice'
+    if kind == 'delay' and not (delay_minutes or 0) >= DELAY_MINUTES:
+        reason = 'delay_under_3h'
+    if extraordinary and kind != 'denied_boarding':
+        reason = 'extraordinary'
+    if not (a.eu or (b.eu and eu_carrier)):
+        reason = 'not_covered'
+
+    amount = 0.0
+    if reason is None:
+        amount = float(AMOUNTS_EUR[band])
+        if kind != 'delay' and late is not None and late <= REROUTE_HALVED_MINUTES[band]:
+            amount /= 2
+    return Assessment(distance_km=round(distance, 1), band=band, amount_eur=amount, reason=reason)
+
+
+def assess_many(index: AirportIndex, origins: Sequence[str], destinations: Sequence[str],
+                kinds: Sequence[str], delay_minutes: Sequence = None, notice_days: Sequence = None,
+                reroute_departure_early_minutes: Sequence = None, reroute_arrival_delay_minutes: Sequence = None,
+                eu_carrier: Sequence = None, extraordinary: Sequence = None) -> List[Assessment]:
+    """
+    `assess` for many flights at once, vectorised: every argument is a list with one
+    value per flight (or None for the defaults). Raises ValueError for unknown kinds or
+    lists of different length.
+    """
+    n = len(origins)
+
+    def column(values, default):
+        if values is None:
+            return [default] * n
+        if len(values) != n:
+            raise ValueError('all columns must have the same length')
+        return values
+
+    kinds = np.array(column(kinds, 'delay'), dtype=object)
+    unknown = set(kinds.tolist()) - set(KINDS)
+    if unknown:
+        raise ValueError(f'unknown kind(s): {", ".join(sorted(map(str, unknown)))}')
+    delay = _floats(column(delay_minutes, 0), 0.0)
+    notice = _floats(column(notice_days, 0), 0.0)
+    early = _floats(column(reroute_departure_early_minutes, None))
+    late = _floats(column(reroute_arrival_delay_minutes, None))
+    eu_carrier = np.array(column(eu_carrier, True), dtype=bool)
+    extraordinary = np.array(column(extraordinary, False), dtype=bool)
+
+    origin, destination = index.slots(column(origins, '')), index.slots(column(destinations, ''))
+    distance = index.distances(origin, destination)
+    known = ~np.isnan(distance)
+    origin_eu = index.eu[np.where(origin >= 0, origin, 0)] & (origin >= 0)
+    destination_eu = index.eu[np.where(destination >= 0, destination, 0)] & (destination >= 0)
+
+    # Art. 3(1): departing from the EU, or arriving there with an EU carrier
+    covered = origin_eu | (destination_eu & eu_carrier)
+    band = np.where(distance <= 1500, 0, np.where((origin_eu & destination_eu) | (distance <= 3500), 1, 2))
+
+    is_delay = kinds == 'delay'
+    is_cancellation = kinds == 'cancellation'
+    rerouted = ~np.isnan(late)
+    # see _in_time
+    early_ok, late_ok = np.nan_to_num(early, nan=0.0), np.nan_to_num(late, nan=np.inf)
+    in_time = ((notice >= 14)
+               | ((notice >= 7) & rerouted & (early_ok <= 120) & (late_ok < 240))
+               | ((notice < 7) & rerouted & (early_ok <= 60) & (late_ok < 120)))
+
+    reasons = np.full(n, -1, dtype=np.intp)
+    masks = {'notice': is_cancellation & in_time,
+             'delay_under_3h': is_delay & ~(delay >= DELAY_MINUTES),
+             # Art. 4 has no such exemption for denied boarding
+             'extraordinary': extraordinary & (is_delay | is_cancellation),
+             'not_covered': ~covered,
+             'unknown_airport': ~known}
+    for i, code in enumerate(_REASON_CODES):
+        reasons[masks[code]] = i
+
+    amount = AMOUNTS_EUR[band]
+    halved = ~is_delay & rerouted & (late_ok <= REROUTE_HALVED_MINUTES[band])
+    amount = np.where(halved, amount / 2, amount)
+    amount[reasons >= 0] = 0.0
+
+    return [Assessment(distance_km=None if d != d else round(d, 1),
+                       band=None if d != d else b,
+                       amount_eur=a,
+                       reason=None if r < 0 else _REASON_CODES[r])
+            for d, b, a, r in zip(distance.tolist(), band.tolist(), amount.tolist(), reasons.tolist())]
+
+
+def assessment_json(assessment: Assessment) -> Dict:
+    return {'distance_km': assessment.distance_km,
+            'band': assessment.band,
+            'amount_eur': assessment.amount_eur,
+            'eligible': assessment.eligible,
+            'reason': assessment.reason,
+            'reason_text': REASONS.get(assessment.reason)}
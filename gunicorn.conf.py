@@ -0,0 +1,54 @@
+# coding=utf-8
+# gunicorn settings, read by `gunicorn app:app` when started from this directory.
+#
+# Workers are cooperative (gevent) by default: a request waiting on Auth0 (token exchange,
+# userinfo, signing keys) yields to the other requests of its worker instead of blocking
+# it, so a slow provider or a burst of logins doesn't hold up the tools.
+# GUNICORN_WORKER_CLASS=sync switches back to one request per worker at a time.
+import gc
+import multiprocessing
+import os
+
+bind = '0.0.0.0:' + os.environ.get('PORT', '3000')
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+# gevent workers only need one per core, sync workers need some to spare for slow requests
+cores = multiprocessing.cpu_count()
+workers = int(os.environ.get('GUNICORN_WORKERS', cores + 1 if worker_class == 'gevent' else 2 * cores + 1))
+# concurrent requests per gevent worker
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 500))
+timeout = 60
+keepalive = 5
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')
+
+# the app is loaded and warmed up (see warm_up in app.py) once in the master before the workers
+# are forked: they start with compiled templates, loaded tables and rendered page shells, and
+# share that memory copy-on-write. GUNICORN_PRELOAD=0 loads the app in every worker instead,
+# each warming up before its first request; WARM_UP=0 skips the warm-up.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+warm = os.environ.get('WARM_UP', '1') != '0'
+
+if preload_app and worker_class == 'gevent':
+    # a gevent worker patches the standard library when it starts, too late for the sockets, locks
+    # and ssl the preloaded app has already imported and created, so the master patches it first
+    from gevent import monkey
+    monkey.patch_all()
+
+
+def when_ready(server):
+    # in the master, after loading the app and before forking the workers
+    if preload_app and warm:
+        from app import warm_up
+        timings = warm_up()
+        server.log.info('warmed up in %.0f ms', sum(timings.values()) * 1000)
+    if preload_app:
+        # the collector would touch (and so copy) every page of the objects it tracks in each worker;
+        # what exists now lives as long as the app, so it is left out of collections for good
+        gc.collect()
+        gc.freeze()
+
+
+def post_worker_init(worker):
+    if not preload_app and warm:
+        from app import warm_up
+        # the statute index is compiled by `flask build-statutes` then, not by every worker
+        warm_up(build=False)
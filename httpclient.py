@@ -0,0 +1,36 @@
+# coding=utf-8
+from typing import Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    A keep-alive connection pool shared by every requests session it is mounted on,
+    with a default timeout for calls that pass none.
+
+    authlib opens a new session for each call to the provider and closes it again,
+    which would mean a new TCP (and TLS) connection per token exchange. Mounted through
+    the client's `compliance_fix`, those sessions send through this pool instead, and
+    closing them leaves its connections open for the next call.
+    """
+
+    def __init__(self, pool_maxsize: int = 32, timeout: Union[float, Tuple[float, float]] = (3.05, 10), **kwargs):
+        super().__init__(pool_connections=4, pool_maxsize=pool_maxsize, **kwargs)
+        self.timeout = timeout
+
+    def send(self, request, timeout: Optional[Union[float, Tuple[float, float]]] = None, **kwargs):
+        return super().send(request, timeout=self.timeout if timeout is None else timeout, **kwargs)
+
+    def close(self) -> None:
+        # called by every session closing, the pool outlives them
+        pass
+
+    def mount(self, session: requests.Session) -> requests.Session:
+        session.mount('https://', self)
+        session.mount('http://', self)
+        return session
+
+    def session(self) -> requests.Session:
+        return self.mount(requests.Session())
@@ -0,0 +1,302 @@
+# coding=utf-8
+from bisect import bisect_left, bisect_right
+from calendar import monthrange
+from datetime import date, timedelta
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from deadlines import add_months
+
+PARTIES = {
+    'employer': 'Arbeitgeber',
+    'employee': 'Arbeitnehmer',
+}
+
+ABSENCES = {
+    'illness': 'Krankheit',
+    'accident': 'Unfall',
+    'military': 'Militär-, Schutz- oder Zivildienst',
+    'pregnancy': 'Schwangerschaft (bis zur Niederkunft)',
+    'aid': 'Dienst in einer Hilfsaktion im Ausland',
+}
+
+# absences that prolong the probation (Art. 335b Abs. 3 OR)
+PROBATION_ABSENCES = ('illness', 'accident', 'military', 'aid')
+
+PROBATION_NOTICE_DAYS = 7
+MAX_PROBATION_MONTHS = 3
+# Art. 336c Abs. 1 lit. b OR: (last service year, days of protection after incapacity begins)
+ILLNESS_BLOCKING_DAYS = ((1, 30), (5, 90), (None, 180))
+# Art. 336c Abs. 1 lit. a OR: four weeks before and after a service of more than eleven days
+MILITARY_MARGIN_DAYS = 28
+MILITARY_SHORT_DAYS = 11
+# Art. 336c Abs. 1 lit. c OR: 16 weeks after giving birth
+MATERNITY_DAYS = 16 * 7
+
+
+class Absence(NamedTuple):
+    kind: str
+    start: date
+    end: date
+
+
+class Termination(NamedTuple):
+    notice: date
+    service_year: int
+    # None without probation
+    probation_end: Optional[date]
+    in_probation: bool
+    notice_period: str
+    void: bool
+    # end of the notice period without suspension, None if the notice is void
+    nominal_end: Optional[date]
+    end: Optional[date]
+    suspended_days: int
+    blocking: Tuple[Tuple[date, date], ...]
+    notes: Tuple[str, ...]
+
+
+class IntervalSet(object):
+    """
+    Disjoint closed intervals of day numbers (date ordinals), kept sorted by start.
+    Adding an interval finds the ones it overlaps or touches by binary search and merges
+    them into one, so absences can be added in any order; `from_intervals` sorts once
+    and merges in a single sweep for the bulk case.
+    """
+
+    def __init__(self):
+        self.starts = []  # type: List[int]
+        self.ends = []  # type: List[int]
+
+    @classmethod
+    def from_intervals(cls, intervals: Iterable[Tuple[int, int]]) -> 'IntervalSet':
+        result = cls()
+        starts, ends = result.starts, result.ends
+        for start, end in sorted(intervals):
+            if end < start:
+                continue
+            if ends and start <= ends[-1] + 1:
+                if end > ends[-1]:
+                    ends[-1] = end
+            else:
+                starts.append(start)
+                ends.append(end)
+        return result
+
+    def add(self, start: int, end: int) -> None:
+        if end < start:
+            return
+        # the intervals ending at start - 1 or later and starting at end + 1 or earlier
+        i = bisect_left(self.ends, start - 1)
+        j = bisect_right(self.starts, end + 1)
+        if i < j:
+            start = min(start, self.starts[i])
+            end = max(end, self.ends[j - 1])
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return zip(self.starts, self.ends)
+
+    def __contains__(self, day: int) -> bool:
+        i = bisect_right(self.starts, day) - 1
+        return i >= 0 and self.ends[i] >= day
+
+    def covered(self, start: int, end: int) -> int:
+        """Number of days from `start` to `end` (inclusive) inside the set."""
+        days = 0
+        for i in range(bisect_left(self.ends, start), bisect_right(self.starts, end)):
+            days += min(end, self.ends[i]) - max(start, self.starts[i]) + 1
+        return days
+
+    def after(self, day: int) -> Iterator[Tuple[int, int]]:
+        """The intervals ending after `day`, in order."""
+        i = bisect_right(self.ends, day)
+        return zip(self.starts[i:], self.ends[i:])
+
+
+def service_years(start: date, day: date) -> int:
+    """Completed years of service on `day`."""
+    return day.year - start.year - ((day.month, day.day) < (start.month, start.day))
+
+
+def statutory_notice_months(service_year: int) -> int:
+    """Art. 335c Abs. 1 OR."""
+    return 1 if service_year == 1 else 2 if service_year <= 9 else 3
+
+
+def illness_blocking_days(service_year: int) -> int:
+    for last_year, days in ILLNESS_BLOCKING_DAYS:
+        if last_year is None or service_year <= last_year:
+            return days
+
+
+def probation_end(start: date, months: int, absences: IntervalSet) -> Optional[date]:
+    """
+    Last day of a probation of `months` months, prolonged by the days of absence within
+    it (Art. 335b Abs. 3 OR); the prolongation may itself cover further absences.
+    """
+    if not months:
+        return None
+    first = start.toordinal()
+    nominal = add_months(start, months).toordinal() - 1
+    end = nominal
+    while True:
+        prolonged = nominal + absences.covered(first, end)
+        if prolonged == end:
+            return date.fromordinal(end)
+        end = prolonged
+
+
+def blocking_periods(start: date, absences: Sequence[Absence], probation: Optional[date] = None) -> IntervalSet:
+    """Periods in which the employer may not give notice (Art. 336c Abs. 1 OR), only after the probation."""
+    after = probation.toordinal() if probation else 0
+    intervals = []
+    for absence in absences:
+        first, last = absence.start.toordinal(), absence.end.toordinal()
+        if absence.kind in ('illness', 'accident'):
+            last = min(last, first + illness_blocking_days(service_years(start, absence.start) + 1) - 1)
+        elif absence.kind == 'military':
+            if last - first + 1 > MILITARY_SHORT_DAYS:
+                first, last = first - MILITARY_MARGIN_DAYS, last + MILITARY_MARGIN_DAYS
+        elif absence.kind == 'pregnancy':
+            last += MATERNITY_DAYS
+        intervals.append((max(first, after + 1), last))
+    return IntervalSet.from_intervals(intervals)
+
+
+def _month_end(day: int) -> date:
+    day = date.fromordinal(day)
+    return day.replace(day=monthrange(day.year, day.month)[1])
+
+
+def termination(start: date, notice: date, by: str = 'employer', absences: Sequence[Absence] = (),
+                probation_months: int = 1, notice_months: Optional[int] = None,
+                end_of_month: bool = True) -> Termination:
+    """
+    End of an employment started on `start` when notice is received on `notice`, given
+    by `by` (see PARTIES). The notice period depends on the service year at the time the
+    notice is received unless `notice_months` is agreed; `end_of_month` False for
+    contracts allowing termination on any day.
+    """
+    if by not in PARTIES:
+        raise ValueError(f'unknown party {by}')
+    for absence in absences:
+        if absence.kind not in ABSENCES:
+            raise ValueError(f'unknown absence {absence.kind}')
+        if absence.end < absence.start:
+            raise ValueError('absence ends before it starts')
+    if notice < start:
+        raise ValueError('notice before the employment starts')
+    if not 0 <= probation_months <= MAX_PROBATION_MONTHS:
+        raise ValueError(f'probation must be 0 to {MAX_PROBATION_MONTHS} months (Art. 335b OR)')
+    if notice_months is not None and notice_months < 1:
+        raise ValueError('notice period must be at least one month (Art. 335c Abs. 2 OR)')
+
+    service_year = service_years(start, notice) + 1
+    day = notice.toordinal()
+    absent = IntervalSet.from_intervals((a.start.toordinal(), a.end.toordinal())
+                                        for a in absences if a.kind in PROBATION_ABSENCES)
+    probation = probation_end(start, probation_months, absent)
+    notes = []
+    if probation is not None and probation != add_months(start, probation_months) - timedelta(days=1):
+        notes.append(f'Probezeit wegen Abwesenheit bis {probation:%d.%m.%Y} verlängert (Art. 335b Abs. 3 OR)')
+
+    if probation is not None and notice <= probation:
+        end = date.fromordinal(day + PROBATION_NOTICE_DAYS)
+        notes.append('Kündigung während der Probezeit: 7 Tage auf jeden Tag (Art. 335b Abs. 1 OR)')
+        return Termination(notice, service_year, probation, True, f'{PROBATION_NOTICE_DAYS} Tage', False, end, end,
+                           0, (), tuple(notes))
+
+    months = notice_months or statutory_notice_months(service_year)
+    period = f'{months} Monat' if months == 1 else f'{months} Monate'
+    if notice_months is None:
+        notes.append(f'{period} im {service_year}. Dienstjahr (Art. 335c Abs. 1 OR)')
+    # the employee may give notice at any time
+    blocking = blocking_periods(start, absences, probation) if by == 'employer' else IntervalSet()
+    periods = tuple((date.fromordinal(a), date.fromordinal(b)) for a, b in blocking)
+
+    if day in blocking:
+        notes.append('Kündigung während einer Sperrfrist ist nichtig (Art. 336c Abs. 2 OR)')
+        return Termination(notice, service_year, probation, False, period, True, None, None, 0, periods, tuple(notes))
+
+    nominal = add_months(notice, months)
+    nominal_end = _month_end(nominal.toordinal()) if end_of_month else nominal
+    # the notice period is counted back from the end it runs to, so only blocking periods
+    # within it suspend it, not those between the notice and its start (BGE 134 III 354)
+    first_day = max(add_months(nominal_end + timedelta(days=1), -months).toordinal(), day + 1)
+    position, remaining, suspended = first_day - 1, nominal_end.toordinal() - first_day + 1, 0
+    for first, last in blocking.after(position):
+        first = max(first, position + 1)
+        if first > position + remaining:
+            break
+        # the days before the blocking period count, the rest runs after it
+        remaining -= first - 1 - position
+        suspended += last - first + 1
+        position = last
+    end = position + remaining
+    if suspended:
+        notes.append(f'Kündigungsfrist während {suspended} Tagen Sperrfrist unterbrochen (Art. 336c Abs. 2 OR)')
+    if end_of_month:
+        end = _month_end(end)
+        if suspended:
+            notes.append('Verlängert bis zum nächsten Monatsende (Art. 336c Abs. 3 OR)')
+    else:
+        end = date.fromordinal(end)
+    return Termination(notice, service_year, probation, False, period, False, nominal_end, end, suspended, periods,
+                       tuple(notes))
+
+
+def termination_json(result: Termination) -> dict:
+    return {
+        'notice': result.notice.isoformat(),
+        'service_year': result.service_year,
+        'probation_end': result.probation_end and result.probation_end.isoformat(),
+        'in_probation': result.in_probation,
+        'notice_period': result.notice_period,
+        'void': result.void,
+        'nominal_end': result.nominal_end and result.nominal_end.isoformat(),
+        'end': result.end and result.end.isoformat(),
+        'suspended_days': result.suspended_days,
+        'blocking': [[first.isoformat(), last.isoformat()] for first, last in result.blocking],
+        'notes': list(result.notes),
+    }
+
+
+def _date(value) -> date:
+    if not isinstance(value, str):
+        raise ValueError('dates must be strings (YYYY-MM-DD)')
+    return date.fromisoformat(value)
+
+
+def batch_terminations(employees: Iterable[dict]) -> Iterator[dict]:
+    """
+    `termination` for every employee of a roster like {'start': ..., 'notice': ..., 'by':
+    ..., 'absences': [{'kind': ..., 'start': ..., 'end': ...}, ...], 'probation_months': ...,
+    'notice_months': ..., 'end_of_month': ...}. Yields one result per employee, in order,
+    with an 'error' instead for employees that cannot be computed.
+    """
+    for employee in employees:
+        try:
+            if not isinstance(employee, dict):
+                raise ValueError('employee must be an object')
+            absences = employee.get('absences') or []
+            if not isinstance(absences, list) or not all(isinstance(a, dict) for a in absences):
+                raise ValueError('absences must be a list of objects')
+            end_of_month = employee.get('end_of_month', True)
+            if not isinstance(end_of_month, bool):
+                raise ValueError('end_of_month must be true or false')
+            result = termination(_date(employee.get('start')), _date(employee.get('notice')),
+                                 by=employee.get('by', 'employer'),
+                                 absences=[Absence(a.get('kind'), _date(a.get('start')), _date(a.get('end')))
+                                           for a in absences],
+                                 probation_months=int(employee.get('probation_months', 1)),
+                                 notice_months=None if employee.get('notice_months') is None
+                                 else int(employee['notice_months']),
+                                 end_of_month=end_of_month)
+        except (TypeError, ValueError) as ex:
+            yield {'error': str(ex)}
+        else:
+            yield termination_json(result)
@@ -0,0 +1,209 @@
+# coding=utf-8
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import secrets
+import shutil
+import threading
+import time
+from typing import BinaryIO, Dict, Optional, Tuple
+
+# uploads are copied to disk in blocks of this size, never held as a whole
+BLOCK_SIZE = 1 << 20
+# AES-GCM adds a 16 byte tag to every chunk the browser encrypts
+CHUNK_OVERHEAD = 16
+MAX_METADATA = 4096
+# completing a drop looks at every chunk, so tiny chunks of a large file are refused
+MAX_CHUNKS = 100_000
+# a drop directory without metadata (creation interrupted) is removed after this many seconds
+ORPHAN_SECONDS = 3600
+
+_ID_RE = re.compile(r'[A-Za-z0-9_-]{22}$')
+
+
+def _sha256(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class DropStore(object):
+    """
+    Legal Drop on premise: files are encrypted in the browser chunk by chunk and stored
+    here as one file per encrypted chunk, of exactly the length the chunk has to have,
+    so nothing ever needs more memory than one copy block. The key stays with the
+    browser (in the fragment of the link); the store only sees ciphertext.
+
+    Uploading needs the drop's token, returned once on creation; downloading needs the
+    unguessable drop id. Expired drops are gone for readers at once and deleted from
+    disk by `sweep`.
+    """
+
+    def __init__(self, root: str, max_chunk_size: int = 8 << 20, max_size: int = 20 << 30, max_days: int = 30):
+        self.root = root
+        self.max_chunk_size = max_chunk_size
+        self.max_size = max_size
+        self.max_days = max_days
+        self._lock = threading.Lock()
+        self._thread_pid = None  # type: Optional[int]
+        os.makedirs(root, exist_ok=True)
+
+    def _dir(self, drop: str) -> str:
+        if not _ID_RE.match(drop):
+            raise KeyError(drop)
+        return os.path.join(self.root, drop)
+
+    def _meta(self, drop: str) -> dict:
+        """The drop's metadata, KeyError if it does not exist or has expired."""
+        try:
+            with open(os.path.join(self._dir(drop), 'meta.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            raise KeyError(drop)
+        if meta['expires'] <= time.time():
+            raise KeyError(drop)
+        return meta
+
+    def _write_meta(self, drop: str, meta: dict) -> None:
+        path = os.path.join(self._dir(drop), 'meta.json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
+
+    def _authorised(self, drop: str, token: str) -> dict:
+        meta = self._meta(drop)
+        if not hmac.compare_digest(_sha256(token or ''), meta['token_sha256']):
+            raise PermissionError(drop)
+        return meta
+
+    def chunk_path(self, drop: str, index: int) -> str:
+        return os.path.join(self._dir(drop), f'{index:08d}.chunk')
+
+    @staticmethod
+    def chunk_length(meta: dict, index: int) -> int:
+        """Length of encrypted chunk `index`: the plaintext chunk plus the tag."""
+        if not 0 <= index < meta['chunks']:
+            raise ValueError(f'chunk must be 0 to {meta["chunks"] - 1}')
+        if index < meta['chunks'] - 1:
+            return meta['chunk_size'] + CHUNK_OVERHEAD
+        return meta['size'] - meta['chunk_size'] * (meta['chunks'] - 1) + CHUNK_OVERHEAD
+
+    def create(self, owner: str, size: int, chunk_size: int, days: int, metadata: str = '') -> Tuple[str, str, dict]:
+        """
+        A new drop for a file of `size` bytes (before encryption) sent in chunks of
+        `chunk_size` bytes, kept for `days` days; `metadata` is opaque to the store
+        (the browser puts the encrypted file name there). Returns (id, token, info).
+        """
+        if not 0 <= size <= self.max_size:
+            raise ValueError(f'size must be 0 to {self.max_size} bytes')
+        if not 0 < chunk_size <= self.max_chunk_size:
+            raise ValueError(f'chunk_size must be 1 to {self.max_chunk_size} bytes')
+        if -(-size // chunk_size) > MAX_CHUNKS:
+            raise ValueError(f'at most {MAX_CHUNKS} chunks, chunk_size must be at least {-(-size // MAX_CHUNKS)} bytes')
+        if not 1 <= days <= self.max_days:
+            raise ValueError(f'days must be 1 to {self.max_days}')
+        if len(metadata) > MAX_METADATA:
+            raise ValueError(f'metadata must not be longer than {MAX_METADATA} characters')
+        drop, token = secrets.token_urlsafe(16), secrets.token_urlsafe(24)
+        now = time.time()
+        meta = {'owner': owner,
+                'created': now,
+                'expires': now + days * 86400,
+                'size': size,
+                'chunk_size': chunk_size,
+                'chunks': max(1, -(-size // chunk_size)),
+                'metadata': metadata,
+                'token_sha256': _sha256(token),
+                'complete': False}
+        os.mkdir(self._dir(drop))
+        self._write_meta(drop, meta)
+        return drop, token, self.info(drop)
+
+    def write_chunk(self, drop: str, token: str, index: int, stream: BinaryIO, length: Optional[int]) -> None:
+        """Copies chunk `index` of `length` bytes from `stream` to disk, block by block."""
+        meta = self._authorised(drop, token)
+        if meta['complete']:
+            raise ValueError('the drop is complete')
+        expected = self.chunk_length(meta, index)
+        if length != expected:
+            raise ValueError(f'chunk {index} must be {expected} bytes')
+        path = self.chunk_path(drop, index)
+        # written under a name of its own, so a retried or concurrent upload of the chunk never mixes
+        part = f'{path}.{secrets.token_hex(4)}.part'
+        try:
+            with open(part, 'wb') as f:
+                remaining = length
+                while remaining:
+                    block = stream.read(min(BLOCK_SIZE, remaining))
+                    if not block:
+                        raise ValueError(f'chunk {index} ended after {length - remaining} bytes')
+                    f.write(block)
+                    remaining -= len(block)
+            os.replace(part, path)
+        finally:
+            if os.path.exists(part):
+                os.remove(part)
+
+    def complete(self, drop: str, token: str) -> dict:
+        """Marks the drop as complete once every chunk is there; only then it can be downloaded."""
+        with self._lock:
+            meta = self._authorised(drop, token)
+            missing = [index for index in range(meta['chunks']) if not os.path.isfile(self.chunk_path(drop, index))]
+            if missing:
+                raise ValueError(f'{len(missing)} chunks missing, first {missing[0]}')
+            meta['complete'] = True
+            self._write_meta(drop, meta)
+        return self.info(drop)
+
+    def info(self, drop: str) -> Dict:
+        """What a recipient needs to download and decrypt the drop."""
+        meta = self._meta(drop)
+        return {key: meta[key] for key in ('size', 'chunk_size', 'chunks', 'expires', 'metadata', 'complete')}
+
+    def chunk_file(self, drop: str, index: int) -> str:
+        """Path of an encrypted chunk of a complete drop, KeyError while it is incomplete."""
+        meta = self._meta(drop)
+        if not meta['complete']:
+            raise KeyError(drop)
+        self.chunk_length(meta, index)
+        return self.chunk_path(drop, index)
+
+    def delete(self, drop: str, token: str) -> None:
+        self._authorised(drop, token)
+        shutil.rmtree(self._dir(drop), ignore_errors=True)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Deletes the expired drops (and abandoned directories) from disk, returns how many."""
+        now = time.time() if now is None else now
+        deleted = 0
+        for drop in os.listdir(self.root):
+            path = os.path.join(self.root, drop)
+            if not _ID_RE.match(drop) or not os.path.isdir(path):
+                continue
+            try:
+                with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+                    expired = json.load(f)['expires'] <= now
+            except (OSError, ValueError, KeyError):
+                expired = os.path.getmtime(path) < now - ORPHAN_SECONDS
+            if expired:
+                shutil.rmtree(path, ignore_errors=True)
+                deleted += 1
+        return deleted
+
+    def start(self, interval: float) -> None:
+        """Sweeps every `interval` seconds in a daemon thread, one per process (also after a fork)."""
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid != os.getpid():
+                self._thread_pid = os.getpid()
+                threading.Thread(target=self._run, args=(interval,), name='legaldrop-sweeper', daemon=True).start()
+
+    def _run(self, interval: float) -> None:
+        while True:
+            try:
+                self.sweep()
+            except Exception:
+                logging.getLogger(__name__).exception('legal drop sweep failed')
+            time.sleep(interval)
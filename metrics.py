@@ -0,0 +1,237 @@
+# coding=utf-8
+import heapq
+import os
+import sys
+import threading
+import time
+import traceback
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+from flask import before_render_template, g, request, template_rendered
+
+try:
+    import greenlet
+    from gevent import monkey
+except ImportError:
+    greenlet = monkey = None
+
+# seconds, roughly what Prometheus client libraries use by default
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram(object):
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f'{name}_sum{{{labels}}} {self.sum:.6f}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+def _label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _patched(module: str) -> bool:
+    return monkey is not None and monkey.is_module_patched(module)
+
+
+def _original(module: str, name: str):
+    # the standard library function even where gevent has patched it: the sampler has
+    # to run in an OS thread of its own, a greenlet would only run when requests yield
+    if _patched(module):
+        return monkey.get_original(module, name)
+    return getattr(__import__(module), name)
+
+
+class _Profile(object):
+    """Stack samples of one request, taken by the sampler thread."""
+
+    def __init__(self, route: str):
+        self.route = route
+        self.samples = Counter()
+        self.duration = 0.0
+        # the OS thread the request runs in and, in a gevent worker, its greenlet
+        self.thread = _original('_thread', 'get_ident')()
+        self.greenlet = greenlet.getcurrent() if _patched('threading') else None
+
+    def frame(self, frames: dict):
+        # a greenlet that waits has its own frame, the running one is its thread's current frame
+        frame = self.greenlet.gr_frame if self.greenlet is not None else None
+        return frame if frame is not None else frames.get(self.thread)
+
+
+class Metrics(object):
+    """
+    Per-process request metrics: latency histograms per route, template render time
+    per template, time spent in tool computations (see `timer`) and errors per route
+    and status, exposed in the Prometheus text format by `render`.
+
+    With `profile_slowest` > 0 a sampling profiler takes the stack of every running
+    request each `profile_interval` seconds and keeps the samples of the slowest
+    requests, see `render_slowest`. It samples from an OS thread, started with the
+    first request of each process (after a fork), and in gevent workers follows every
+    request's greenlet: one waiting for I/O shows where it waits.
+    """
+
+    def __init__(self, app=None, profile_slowest: int = 0, profile_interval: float = 0.005):
+        self._lock = threading.Lock()
+        self.requests = {}  # type: Dict[Tuple[str, str], Histogram]
+        self.templates = {}  # type: Dict[str, Histogram]
+        self.computations = {}  # type: Dict[str, Histogram]
+        self.errors = Counter()
+        self.profile_slowest = profile_slowest
+        self.profile_interval = profile_interval
+        self._running = {}  # type: Dict[int, _Profile]
+        self._slowest = []  # heap of (duration, sequence, profile)
+        self._sequence = 0
+        self._sampler_pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def reset(self) -> None:
+        """Forgets everything observed so far, e.g. the renders of a warm-up."""
+        with self._lock:
+            self.requests.clear()
+            self.templates.clear()
+            self.computations.clear()
+            self.errors.clear()
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+
+    def _observe(self, histograms: dict, key, value: float) -> None:
+        with self._lock:
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Times the enclosed tool computation (speed-limit lookup, date math, ...) under `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._observe(self.computations, name, time.perf_counter() - start)
+
+    def _route(self) -> str:
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    def _before_request(self):
+        g.metrics_start = time.perf_counter()
+        if self.profile_slowest:
+            self._start_sampler()
+            # a greenlet's id in gevent workers
+            self._running[threading.get_ident()] = _Profile(self._route())
+
+    def _after_request(self, response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        duration = time.perf_counter() - start
+        route = self._route()
+        self._observe(self.requests, (request.method, route), duration)
+        if response.status_code >= 400:
+            with self._lock:
+                self.errors[route, response.status_code] += 1
+
+        profile = self._running.pop(threading.get_ident(), None)
+        if profile is not None and profile.samples:
+            profile.duration = duration
+            with self._lock:
+                self._sequence += 1
+                entry = (duration, self._sequence, profile)
+                if len(self._slowest) < self.profile_slowest:
+                    heapq.heappush(self._slowest, entry)
+                elif duration > self._slowest[0][0]:
+                    heapq.heapreplace(self._slowest, entry)
+        return response
+
+    def _before_render(self, sender, template, context, **extra):
+        g.setdefault('metrics_templates', []).append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        starts = g.get('metrics_templates')
+        if starts:
+            self._observe(self.templates, template.name, time.perf_counter() - starts.pop())
+
+    def _start_sampler(self) -> None:
+        # one sampler per process, a thread started before a fork does not run in the child
+        if self._sampler_pid == os.getpid():
+            return
+        with self._lock:
+            if self._sampler_pid != os.getpid():
+                self._sampler_pid = os.getpid()
+                _original('_thread', 'start_new_thread')(self._sample, ())
+
+    def _sample(self):
+        sleep = _original('time', 'sleep')
+        while True:
+            sleep(self.profile_interval)
+            frames = sys._current_frames()
+            for profile in list(self._running.values()):
+                frame = profile.frame(frames)
+                if frame is not None:
+                    stack = ';'.join(f'{f.name} ({f.filename}:{f.lineno})'
+                                     for f in traceback.extract_stack(frame))
+                    profile.samples[stack] += 1
+
+    def render(self) -> str:
+        """
+        All metrics of this process in the Prometheus text exposition format, every series
+        labelled with the pid: behind several workers a scrape reaches one of them, so the
+        series of each worker have to be told apart (and summed up in the queries).
+        """
+        pid = f'pid="{os.getpid()}"'
+        lines = []
+        with self._lock:
+            lines.append('# HELP lt_request_duration_seconds Request latency per route.')
+            lines.append('# TYPE lt_request_duration_seconds histogram')
+            for (method, route), histogram in sorted(self.requests.items()):
+                lines.extend(histogram.lines('lt_request_duration_seconds',
+                                             f'{pid},method="{method}",route="{_label(route)}"'))
+            lines.append('# HELP lt_template_render_seconds Template render time per template.')
+            lines.append('# TYPE lt_template_render_seconds histogram')
+            for name, histogram in sorted(self.templates.items()):
+                lines.extend(histogram.lines('lt_template_render_seconds', f'{pid},template="{_label(name)}"'))
+            lines.append('# HELP lt_computation_seconds Time spent in tool computations.')
+            lines.append('# TYPE lt_computation_seconds histogram')
+            for name, histogram in sorted(self.computations.items()):
+                lines.extend(histogram.lines('lt_computation_seconds', f'{pid},computation="{_label(name)}"'))
+            lines.append('# HELP lt_errors_total Responses with an error status per route.')
+            lines.append('# TYPE lt_errors_total counter')
+            for (route, status), count in sorted(self.errors.items()):
+                lines.append(f'lt_errors_total{{{pid},route="{_label(route)}",status="{status}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def render_slowest(self) -> str:
+        """Collapsed stack samples (flamegraph input format) of the slowest requests, slowest first."""
+        with self._lock:
+            slowest = sorted(self._slowest, reverse=True)
+        out = []
+        for duration, _, profile in slowest:
+            out.append(f'# {profile.route} {duration * 1000:.1f} ms')
+            out.extend(f'{stack} {count}' for stack, count in profile.samples.most_common())
+        return '\n'.join(out) + '\n'
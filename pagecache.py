@@ -0,0 +1,138 @@
+# coding=utf-8
+import hashlib
+import os
+import re
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, NamedTuple, Sequence, Tuple
+
+from flask import Response, render_template, request
+from markupsafe import escape
+
+# the parts of a page that differ per user, see home.html
+USER_FIELDS = ('log_name', 'log_link', 'pic_display', 'picture')
+# filled in per request without escaping, see application.html
+CONTENT_FIELDS = ('app_content',)
+
+_SENTINEL = '\x1e{}\x1e'
+_SENTINEL_RE = re.compile('\x1e(' + '|'.join(USER_FIELDS + CONTENT_FIELDS) + ')\x1e')
+
+
+def placeholder(field: str) -> str:
+    """Stands in for `field` when a page is pre-rendered, see `PageCache.render`."""
+    return _SENTINEL.format(field)
+
+
+class _Fragment(NamedTuple):
+    key: Tuple[float, ...]
+    parts: Tuple[str, ...]
+    fields: Tuple[str, ...]
+    etag: str
+    last_modified: datetime
+
+
+def user_block(pageinfo: dict, userinfo: dict) -> Dict[str, str]:
+    return {'log_name': pageinfo['log_name'],
+            'log_link': pageinfo['log_link'],
+            'pic_display': pageinfo['pic_display'],
+            'picture': userinfo.get('picture', '')}
+
+
+class PageCache(object):
+    """
+    Renders pages whose content never changes once, split around the user block
+    (name/picture, login link) and the dynamic `app_content`, and fills in only those
+    per request.
+
+    A page is re-rendered when one of its templates (or the module building its
+    content, or one of the `dependencies`) changes on disk. `response` adds an ETag
+    and Last-Modified, so repeat visitors get a 304.
+    """
+
+    def __init__(self, template_folder: str, dependencies: Sequence[str] = ()):
+        self.template_folder = template_folder
+        self.dependencies = tuple(dependencies)
+        self._fragments = {}  # type: Dict[str, _Fragment]
+        self._lock = threading.Lock()
+
+    def _key(self, templates: Sequence[str], build_context: Callable) -> Tuple[float, ...]:
+        paths = [os.path.join(self.template_folder, name) for name in templates]
+        paths.append(sys.modules[build_context.__module__].__file__)
+        key = [os.stat(path).st_mtime for path in paths]
+        # a dependency that does not exist (yet) counts as unchanged
+        key.extend(os.stat(path).st_mtime if os.path.exists(path) else 0.0 for path in self.dependencies)
+        return tuple(key)
+
+    def _render(self, template: str, build_context: Callable, key) -> _Fragment:
+        context = build_context()
+        pageinfo = dict(context.pop('pageinfo', {}),
+                        log_name=placeholder('log_name'),
+                        log_link=placeholder('log_link'),
+                        pic_display=placeholder('pic_display'))
+        page = render_template(template, pageinfo=pageinfo, userinfo={'picture': placeholder('picture')}, **context)
+        pieces = _SENTINEL_RE.split(page)
+        return _Fragment(key=key,
+                         parts=tuple(pieces[0::2]),
+                         fields=tuple(pieces[1::2]),
+                         etag=hashlib.sha1(page.encode('utf-8')).hexdigest(),
+                         last_modified=datetime.fromtimestamp(int(max(key)), timezone.utc))
+
+    def fragment(self, name: str, template: str, templates: Sequence[str], build_context: Callable) -> _Fragment:
+        key = self._key(templates, build_context)
+        fragment = self._fragments.get(name)
+        if fragment is None or fragment.key != key:
+            with self._lock:
+                fragment = self._fragments.get(name)
+                if fragment is None or fragment.key != key:
+                    fragment = self._render(template, build_context, key)
+                    self._fragments[name] = fragment
+        return fragment
+
+    @staticmethod
+    def _values(pageinfo: dict, userinfo: dict, content: dict) -> Dict[str, str]:
+        values = {field: str(escape(value)) for field, value in user_block(pageinfo, userinfo).items()}
+        values.update((field, str(value)) for field, value in content.items())
+        return values
+
+    @staticmethod
+    def _join(fragment: _Fragment, values: Dict[str, str]) -> str:
+        body = [fragment.parts[0]]
+        for field, part in zip(fragment.fields, fragment.parts[1:]):
+            body.append(values[field])
+            body.append(part)
+        return ''.join(body)
+
+    def render(self, name: str, template: str, build_context: Callable, pageinfo: dict, userinfo: dict,
+               templates: Sequence[str] = ('home.html',), **content) -> str:
+        """
+        Renders the page `name` from `template` for the user described by `pageinfo`/
+        `userinfo`. `build_context` returns the template context and is only called when
+        the page has to be (re-)rendered; it can use `placeholder` for the CONTENT_FIELDS,
+        whose markup is then passed per request in `content`. `templates` lists the
+        templates `template` depends on.
+        """
+        fragment = self.fragment(name, template, (template,) + tuple(templates), build_context)
+        return self._join(fragment, self._values(pageinfo, userinfo, content))
+
+    def response(self, name: str, build_content: Callable, pageinfo: dict, userinfo: dict,
+                 template: str = 'generic.html', templates: Sequence[str] = ('home.html',)) -> Response:
+        """
+        Answers with the page `name`, whose static content `build_content` returns, as a
+        conditional response.
+        """
+        def build_context():
+            return {'pageinfo': {'content': build_content()}}
+        build_context.__module__ = build_content.__module__
+
+        fragment = self.fragment(name, template, (template,) + tuple(templates), build_context)
+        values = self._values(pageinfo, userinfo, {})
+
+        response = Response(self._join(fragment, values), mimetype='text/html')
+        response.set_etag(hashlib.sha1(
+            '\x1e'.join([fragment.etag] + [values[field] for field in USER_FIELDS]).encode('utf-8')).hexdigest())
+        response.last_modified = fragment.last_modified
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        response.vary.add('Cookie')
+        return response.make_conditional(request)
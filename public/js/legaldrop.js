@@ -0,0 +1,220 @@
+// Legal Drop on premise: files are encrypted here, chunk by chunk (AES-GCM, a fresh key per
+// file), before they are uploaded; the key only travels in the fragment of the link, which
+// browsers never send to the server. See legaldrop.py for the server side.
+(function () {
+  'use strict';
+
+  var PARALLEL = 4;
+  var RETRIES = 3;
+  var CHUNK = 0;
+  var METADATA = 1;
+  var root = document.getElementById('legaldrop');
+  var status = document.getElementById('status');
+  var link = document.getElementById('link');
+
+  function show(text) {
+    status.textContent = text;
+  }
+
+  function base64url(bytes) {
+    var binary = '';
+    bytes = new Uint8Array(bytes);
+    for (var i = 0; i < bytes.length; i++) {
+      binary += String.fromCharCode(bytes[i]);
+    }
+    return btoa(binary).replace(/\+/g, '-').replace(/\//g, '_').replace(/=+$/, '');
+  }
+
+  function unbase64url(text) {
+    var binary = atob(text.replace(/-/g, '+').replace(/_/g, '/'));
+    var bytes = new Uint8Array(binary.length);
+    for (var i = 0; i < binary.length; i++) {
+      bytes[i] = binary.charCodeAt(i);
+    }
+    return bytes;
+  }
+
+  // every chunk has its own nonce: what it is and its index, never reused under the same key
+  function iv(kind, index) {
+    var bytes = new Uint8Array(12);
+    var view = new DataView(bytes.buffer);
+    view.setUint32(0, kind);
+    view.setUint32(8, index);
+    return bytes;
+  }
+
+  function encrypt(key, kind, index, data) {
+    return crypto.subtle.encrypt({name: 'AES-GCM', iv: iv(kind, index)}, key, data);
+  }
+
+  function decrypt(key, kind, index, data) {
+    return crypto.subtle.decrypt({name: 'AES-GCM', iv: iv(kind, index)}, key, data);
+  }
+
+  function check(response) {
+    if (!response.ok) {
+      return response.json().then(function (error) {
+        throw new Error(error.message || response.statusText);
+      }, function () {
+        throw new Error(response.statusText);
+      });
+    }
+    return response;
+  }
+
+  function retry(attempt) {
+    var tries = 0;
+    return (function next() {
+      return attempt().catch(function (error) {
+        if (++tries >= RETRIES) {
+          throw error;
+        }
+        return new Promise(function (resolve) { setTimeout(resolve, 1000 * tries); }).then(next);
+      });
+    })();
+  }
+
+  // runs task(0) .. task(count - 1), PARALLEL at a time
+  function pool(count, task) {
+    var next = 0;
+    function worker() {
+      if (next >= count) {
+        return Promise.resolve();
+      }
+      return task(next++).then(worker);
+    }
+    var workers = [];
+    for (var i = 0; i < Math.min(PARALLEL, count); i++) {
+      workers.push(worker());
+    }
+    return Promise.all(workers);
+  }
+
+  function upload() {
+    var file = document.getElementById('file').files[0];
+    if (!file) {
+      show('Bitte eine Datei wählen');
+      return;
+    }
+    var chunkSize = parseInt(root.dataset.chunkSize, 10);
+    var key, drop, done = 0;
+    link.textContent = '';
+    show('Verschlüsseln …');
+    crypto.subtle.generateKey({name: 'AES-GCM', length: 256}, true, ['encrypt', 'decrypt']).then(function (k) {
+      key = k;
+      var metadata = JSON.stringify({name: file.name.slice(0, 200), type: file.type});
+      return encrypt(key, METADATA, 0, new TextEncoder().encode(metadata));
+    }).then(function (metadata) {
+      return fetch('/legaldrop/drops', {
+        method: 'POST',
+        credentials: 'same-origin',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({size: file.size, chunk_size: chunkSize,
+                              days: parseInt(document.getElementById('days').value, 10),
+                              metadata: base64url(metadata)})
+      }).then(check).then(function (response) { return response.json(); });
+    }).then(function (created) {
+      drop = created;
+      return pool(drop.chunks, function (index) {
+        // only the chunks in flight are ever in memory
+        var blob = file.slice(index * chunkSize, (index + 1) * chunkSize);
+        return blob.arrayBuffer().then(function (data) {
+          return encrypt(key, CHUNK, index, data);
+        }).then(function (data) {
+          return retry(function () {
+            return fetch('/legaldrop/drops/' + drop.id + '/chunks/' + index, {
+              method: 'PUT',
+              headers: {'X-Drop-Token': drop.token, 'Content-Type': 'application/octet-stream'},
+              body: data
+            }).then(check);
+          });
+        }).then(function () {
+          show('Hochladen … ' + Math.round(100 * ++done / drop.chunks) + '%');
+        });
+      });
+    }).then(function () {
+      return fetch('/legaldrop/drops/' + drop.id + '/complete', {
+        method: 'POST',
+        headers: {'X-Drop-Token': drop.token}
+      }).then(check);
+    }).then(function () {
+      return crypto.subtle.exportKey('raw', key);
+    }).then(function (raw) {
+      var url = location.origin + drop.link + '#' + base64url(raw);
+      show('Link gültig bis ' + new Date(drop.expires * 1000).toLocaleString('de-CH'));
+      var a = document.createElement('a');
+      a.href = url;
+      a.textContent = url;
+      link.appendChild(a);
+    }).catch(function (error) {
+      show('Fehler: ' + error.message);
+    });
+  }
+
+  // streams to a file where the browser lets us (flat memory), else collects the chunks in a Blob
+  function sink(name, type) {
+    if (window.showSaveFilePicker) {
+      return window.showSaveFilePicker({suggestedName: name}).then(function (handle) {
+        return handle.createWritable();
+      }).then(function (writable) {
+        return {
+          write: function (data) { return writable.write(data); },
+          close: function () { return writable.close(); }
+        };
+      });
+    }
+    var parts = [];
+    return Promise.resolve({
+      write: function (data) { parts.push(new Blob([data])); return Promise.resolve(); },
+      close: function () {
+        var a = document.createElement('a');
+        a.href = URL.createObjectURL(new Blob(parts, {type: type || 'application/octet-stream'}));
+        a.download = name;
+        a.click();
+        return Promise.resolve();
+      }
+    });
+  }
+
+  function download() {
+    var drop = root.dataset.drop;
+    var key, info, out;
+    crypto.subtle.importKey('raw', unbase64url(location.hash.slice(1)), 'AES-GCM', false, ['decrypt'])
+      .then(function (k) {
+        key = k;
+        return fetch('/legaldrop/drops/' + drop).then(check).then(function (response) { return response.json(); });
+      }).then(function (i) {
+        info = i;
+        if (!info.complete) {
+          throw new Error('der Upload ist noch nicht abgeschlossen');
+        }
+        return decrypt(key, METADATA, 0, unbase64url(info.metadata));
+      }).then(function (metadata) {
+        metadata = JSON.parse(new TextDecoder().decode(metadata));
+        return sink(metadata.name, metadata.type);
+      }).then(function (s) {
+        out = s;
+        // in order, so the file can be written front to back
+        var index = 0;
+        return (function next() {
+          if (index >= info.chunks) {
+            return out.close();
+          }
+          return fetch('/legaldrop/drops/' + drop + '/chunks/' + index).then(check).then(function (response) {
+            return response.arrayBuffer();
+          }).then(function (data) {
+            return decrypt(key, CHUNK, index, data);
+          }).then(function (data) {
+            show('Herunterladen … ' + Math.round(100 * ++index / info.chunks) + '%');
+            return out.write(data);
+          }).then(next);
+        })();
+      }).then(function () {
+        show('Fertig');
+      }).catch(function (error) {
+        show(error.name === 'OperationError' ? 'Fehler: falscher Schlüssel im Link' : 'Fehler: ' + error.message);
+      });
+  }
+
+  document.getElementById('send').addEventListener('click', root.dataset.mode === 'upload' ? upload : download);
+})();
@@ -0,0 +1,228 @@
+# coding=utf-8
+import queue
+import secrets
+import socket
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional
+from urllib.parse import urlparse
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
+from itsdangerous import BadSignature, Signer
+
+
+class MemoryStore(object):
+    """In-process LRU store with expiry, for a single worker (or tests)."""
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic() + ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisStore(object):
+    """
+    Store speaking the Redis protocol (RESP), so it works against Redis or any
+    stand-in implementing GET/SET/DEL. Connections are kept alive in a pool of up
+    to `pool_size` sockets instead of being opened per request.
+    """
+
+    def __init__(self, url: str = 'redis://localhost:6379/0', pool_size: int = 16, timeout: float = 2.0,
+                 prefix: str = 'lt:session:'):
+        url = urlparse(url)
+        self.host = url.hostname or 'localhost'
+        self.port = url.port or 6379
+        self.db = int(url.path.strip('/') or 0)
+        self.password = url.password
+        self.timeout = timeout
+        self.prefix = prefix
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = (sock, sock.makefile('rb'))
+        if self.password:
+            self._call(connection, 'AUTH', self.password)
+        if self.db:
+            self._call(connection, 'SELECT', self.db)
+        return connection
+
+    @contextmanager
+    def _connection(self):
+        try:
+            connection = self._pool.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+        try:
+            yield connection
+        except (OSError, RedisError):
+            # the connection may be out of sync with the server, don't reuse it
+            connection[0].close()
+            raise
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection[0].close()
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        out = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            out.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(out)
+
+    def _read(self, reader):
+        line = reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise RedisError('connection closed')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest
+        if kind == b'-':
+            raise RedisError(rest.decode('utf-8', 'replace'))
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(rest)
+            return None if length < 0 else [self._read(reader) for _ in range(length)]
+        raise RedisError(f'unexpected reply {line!r}')
+
+    def _call(self, connection, *args):
+        connection[0].sendall(self._encode(args))
+        return self._read(connection[1])
+
+    def execute(self, *args):
+        with self._connection() as connection:
+            return self._call(connection, *args)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.execute('GET', self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self.execute('SET', self.prefix + key, value, 'EX', ttl)
+
+    def delete(self, key: str) -> None:
+        self.execute('DEL', self.prefix + key)
+
+
+def create_store(url: str):
+    """'memory' or 'memory://?maxsize=N' for the in-process store, 'redis://host:port/db' for Redis."""
+    if url.startswith('redis://'):
+        return RedisStore(url)
+    if url == 'memory' or url.startswith('memory://'):
+        query = dict(part.split('=', 1) for part in urlparse(url).query.split('&') if '=' in part)
+        return MemoryStore(maxsize=int(query.get('maxsize', 10000)))
+    raise ValueError(f'unknown session store {url}')
+
+
+class ServerSideSession(SecureCookieSession):
+
+    def __init__(self, initial=None, sid=None):
+        super(ServerSideSession, self).__init__(initial)
+        self.sid = sid
+        self.rotate_sid = False
+
+    def rotate(self):
+        """Issue a new session id when the session is saved (e.g. after login, against fixation)."""
+        self.rotate_sid = True
+        self.modified = True
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Keeps the session data in `store` and only a signed, random session id in the
+    cookie, so requests no longer carry (and verify) the whole session.
+    """
+
+    session_class = ServerSideSession
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store, ttl: int = 7 * 24 * 3600):
+        self.store = store
+        self.ttl = ttl
+
+    def _signer(self, app) -> Signer:
+        return Signer(app.secret_key, salt='lt-session')
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode('ascii')
+            except BadSignature:
+                sid = None
+            if sid:
+                data = self.store.get(sid)
+                if data is not None:
+                    return self.session_class(self.serializer.loads(data), sid=sid)
+        return self.session_class()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified and session.sid:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if not session.modified:
+            return
+
+        if session.rotate_sid and session.sid:
+            self.store.delete(session.sid)
+            session.sid = None
+        new_sid = session.sid is None
+        if new_sid:
+            session.sid = secrets.token_urlsafe(32)
+        self.store.set(session.sid, self.serializer.dumps(dict(session)).encode('utf-8'), self.ttl)
+
+        if new_sid or self.should_set_cookie(app, session):
+            response.set_cookie(name,
+                                self._signer(app).sign(session.sid.encode('ascii')).decode('ascii'),
+                                expires=self.get_expiration_time(app, session),
+                                httponly=self.get_cookie_httponly(app),
+                                domain=domain,
+                                path=path,
+                                secure=self.get_cookie_secure(app),
+                                samesite=self.get_cookie_samesite(app))
+        response.vary.add('Cookie')
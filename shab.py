@@ -0,0 +1,324 @@
+# coding=utf-8
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+# publication elements of a SHAB export (local tag names, namespaces are ignored) and how
+# many publications are committed at once while ingesting
+PUBLICATION_TAGS = ('publication', 'SHAB-Publication')
+BATCH_SIZE = 5000
+# most results on one page of a search, and most terms in one (each is joined to the
+# others, SQLite allows at most 64 tables in a join)
+MAX_LIMIT = 100
+MAX_TERMS = 20
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime REAL, size INTEGER, publications INTEGER);
+CREATE TABLE IF NOT EXISTS publications (
+    id INTEGER PRIMARY KEY,
+    number TEXT UNIQUE,
+    date TEXT,
+    type TEXT,
+    canton TEXT,
+    uid TEXT,
+    name TEXT,
+    title TEXT,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS publications_date ON publications (date, id);
+-- the inverted index: every term points at the publications containing it, newest first
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT,
+    date TEXT,
+    publication INTEGER,
+    PRIMARY KEY (term, date, publication)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, count INTEGER) WITHOUT ROWID;
+'''
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+class Publication(NamedTuple):
+    number: str
+    date: str
+    type: str
+    canton: str
+    uid: str
+    name: str
+    title: str
+    message: str = ''
+
+
+# fields returned by searches, the full text is left out
+RESULT_FIELDS = Publication._fields[:-1]
+
+_LOCAL_NAMES = {}  # type: Dict[str, str]
+
+
+def _local(tag: str) -> str:
+    name = _LOCAL_NAMES.get(tag)
+    if name is None:
+        name = _LOCAL_NAMES[tag] = tag.rsplit('}', 1)[-1]
+    return name
+
+
+def fold(text: str) -> str:
+    """Lower case without accents (ä -> a, é -> e, ß -> ss), for matching."""
+    text = text.lower()
+    if text.isascii():
+        return text
+    text = unicodedata.normalize('NFKD', text.replace('ß', 'ss'))
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def words(text: str) -> List[str]:
+    return _WORD_RE.findall(fold(text))
+
+
+def normalise_uid(uid: str) -> str:
+    """'CHE-123.456.789' -> 'CHE123456789'."""
+    digits = re.sub(r'\D', '', uid or '')
+    return 'CHE' + digits if digits else ''
+
+
+def terms(publication: Publication) -> set:
+    found = {'w:' + word for word in words(publication.name)}
+    if publication.uid:
+        found.update('uid:' + uid for uid in publication.uid.split(';'))
+    if publication.canton:
+        found.update('canton:' + canton for canton in publication.canton.split(';'))
+    if publication.type:
+        found.add('type:' + publication.type)
+    return found
+
+
+def _publication(element) -> Optional[Publication]:
+    fields = {}
+    names, uids = [], []
+    for child in element.iter():
+        tag = _local(child.tag)
+        text = (child.text or '').strip()
+        if tag == 'message':
+            fields.setdefault(tag, ' '.join(''.join(child.itertext()).split()))
+        elif tag == 'company':
+            for part in child:
+                value = (part.text or '').strip()
+                if _local(part.tag) == 'name' and value:
+                    names.append(value)
+                elif _local(part.tag) == 'uid' and value:
+                    uids.append(normalise_uid(value))
+        elif text and tag not in fields:
+            fields[tag] = text
+    number = fields.get('publicationNumber')
+    if not number:
+        return None
+    cantons = sorted(set(fields.get('cantons', '').replace(',', ' ').upper().split()))
+    return Publication(number=number,
+                       date=fields.get('publicationDate', '')[:10],
+                       type=fields.get('subRubric') or fields.get('rubric', ''),
+                       canton=';'.join(cantons),
+                       uid=';'.join(uid for uid in dict.fromkeys(uids) if uid),
+                       name='; '.join(dict.fromkeys(names)),
+                       title=fields.get('de') or fields.get('title', ''),
+                       message=fields.get('message', ''))
+
+
+def iter_publications(path: str) -> Iterator[Publication]:
+    """
+    Publications of a SHAB XML dump, parsed as a stream: each publication element is
+    dropped from the tree as soon as it is read, so memory does not grow with the file.
+    """
+    # the open elements, so a finished publication can be taken out of its parent
+    # however deep it is nested
+    parents = []
+    for event, element in ET.iterparse(path, events=('start', 'end')):
+        if event == 'start':
+            parents.append(element)
+            continue
+        parents.pop()
+        if _local(element.tag) in PUBLICATION_TAGS:
+            publication = _publication(element)
+            if publication is not None:
+                yield publication
+            element.clear()
+            if parents:
+                parents[-1].remove(element)
+
+
+class SearchResult(NamedTuple):
+    publications: List[Dict]
+    # pass as `cursor` for the next page, None if this was the last one
+    cursor: Optional[str]
+
+
+class ShabIndex(object):
+    """
+    On-disk inverted index over SHAB publications in SQLite. Every term (word of a
+    company name, UID, canton, publication type) has its postings stored in (term,
+    date, publication) order, so a query walks the rarest term's postings newest first
+    and checks the other terms by primary key; pages continue from a cursor instead of
+    an offset, so every page costs the same.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+            # indexes built before the full text was kept
+            if 'message' not in {row[1] for row in db.execute('PRAGMA table_info(publications)')}:
+                db.execute('ALTER TABLE publications ADD COLUMN message TEXT')
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def _insert(self, db: sqlite3.Connection, batch: Sequence[Publication]) -> int:
+        """Adds the publications of `batch` not in the index yet, returns how many."""
+        numbers = list(dict.fromkeys(p.number for p in batch))
+        known = {number for number, in db.execute(
+            'SELECT number FROM publications WHERE number IN (%s)' % ','.join('?' * len(numbers)), numbers)}
+        new = {}
+        for publication in batch:
+            if publication.number not in known:
+                new.setdefault(publication.number, publication)
+        if not new:
+            return 0
+        db.executemany('INSERT INTO publications (number, date, type, canton, uid, name, title, message) '
+                       'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', new.values())
+        ids = dict(db.execute('SELECT number, id FROM publications WHERE number IN (%s)'
+                              % ','.join('?' * len(new)), list(new)))
+        postings, counts = [], {}
+        for publication in new.values():
+            for term in terms(publication):
+                postings.append((term, publication.date, ids[publication.number]))
+                counts[term] = counts.get(term, 0) + 1
+        db.executemany('INSERT INTO postings VALUES (?, ?, ?)', postings)
+        db.executemany('INSERT INTO terms VALUES (?, ?) ON CONFLICT (term) DO UPDATE SET count = count + excluded.count',
+                       counts.items())
+        return len(new)
+
+    def ingest_file(self, path: str, batch_size: int = BATCH_SIZE) -> int:
+        """Adds the publications of one dump that are not in the index yet, returns how many."""
+        db = self._connect()
+        stat = os.stat(path)
+        count = 0
+        batch = []
+        for publication in iter_publications(path):
+            batch.append(publication)
+            if len(batch) >= batch_size:
+                with db:
+                    count += self._insert(db, batch)
+                batch = []
+        with db:
+            if batch:
+                count += self._insert(db, batch)
+            # only now, an interrupted run starts over with this file (skipping what it added)
+            db.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)',
+                       (os.path.abspath(path), stat.st_mtime, stat.st_size, count))
+        return count
+
+    def pending(self, directory: str) -> List[str]:
+        """The XML dumps in `directory` that are new or changed since they were ingested."""
+        known = {path: (mtime, size) for path, mtime, size in
+                 self._connect().execute('SELECT path, mtime, size FROM files')}
+        pending = []
+        for name in sorted(os.listdir(directory)):
+            path = os.path.abspath(os.path.join(directory, name))
+            if name.lower().endswith('.xml') and os.path.isfile(path):
+                stat = os.stat(path)
+                if known.get(path) != (stat.st_mtime, stat.st_size):
+                    pending.append(path)
+        return pending
+
+    def ingest_directory(self, directory: str) -> Dict[str, int]:
+        """Ingests the new and changed dumps in `directory`, returns the publications added per file."""
+        return {path: self.ingest_file(path) for path in self.pending(directory)}
+
+    def _query_terms(self, name: str, uid: str, canton: str, type: str) -> List[str]:
+        found = ['w:' + word for word in words(name or '')]
+        if uid:
+            found.append('uid:' + normalise_uid(uid))
+        if canton:
+            found.append('canton:' + canton.upper())
+        if type:
+            found.append('type:' + type.upper())
+        return list(dict.fromkeys(found))
+
+    def search(self, name: str = '', uid: str = '', canton: str = '', type: str = '',
+               date_from: str = '', date_to: str = '', limit: int = 20, cursor: Optional[str] = None) -> SearchResult:
+        """
+        Publications matching all given criteria (every word of `name`, the UID, canton,
+        type, ISO dates inclusive), newest first. Without any criteria all publications
+        of the date range are listed. `limit` is kept within 1..MAX_LIMIT, more than
+        MAX_TERMS terms are a ValueError.
+        """
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        db = self._connect()
+        query_terms = self._query_terms(name, uid, canton, type)
+        if len(query_terms) > MAX_TERMS:
+            raise ValueError(f'Zu viele Suchbegriffe, höchstens {MAX_TERMS}')
+        counts = dict(db.execute('SELECT term, count FROM terms WHERE term IN (%s)' % ','.join('?' * len(query_terms)),
+                                 query_terms)) if query_terms else {}
+        if any(term not in counts for term in query_terms):
+            return SearchResult([], None)
+        # walk the rarest term, look the others up
+        query_terms.sort(key=counts.get)
+
+        if query_terms:
+            sql = ['SELECT p0.publication, p0.date FROM postings p0']
+            params = []
+            for i, term in enumerate(query_terms[1:], 1):
+                sql.append(f'JOIN postings p{i} ON p{i}.term = ? AND p{i}.date = p0.date '
+                           f'AND p{i}.publication = p0.publication')
+                params.append(term)
+            sql.append('WHERE p0.term = ?')
+            params.append(query_terms[0])
+            date, id_ = 'p0.date', 'p0.publication'
+        else:
+            sql, params = ['SELECT id, date FROM publications WHERE 1'], []
+            date, id_ = 'date', 'id'
+        if date_from:
+            sql.append(f'AND {date} >= ?')
+            params.append(date_from)
+        if date_to:
+            sql.append(f'AND {date} <= ?')
+            params.append(date_to)
+        if cursor:
+            cursor_date, cursor_id = cursor.rsplit(':', 1)
+            # a row value, so SQLite turns it into a range on the index
+            sql.append(f'AND ({date}, {id_}) < (?, ?)')
+            params.extend([cursor_date, int(cursor_id)])
+        sql.append(f'ORDER BY {date} DESC, {id_} DESC LIMIT ?')
+        params.append(limit + 1)
+
+        hits = db.execute(' '.join(sql), params).fetchall()
+        more = len(hits) > limit
+        hits = hits[:limit]
+        rows = {row[0]: row[1:] for row in db.execute(
+            'SELECT id, %s FROM publications WHERE id IN (%s)'
+            % (', '.join(RESULT_FIELDS), ','.join('?' * len(hits))), [id_ for id_, _ in hits])} if hits else {}
+        publications = [dict(zip(RESULT_FIELDS, rows[id_])) for id_, _ in hits]
+        return SearchResult(publications, f'{hits[-1][1]}:{hits[-1][0]}' if more else None)
+
+    def since(self, last_id: int, limit: int = BATCH_SIZE) -> List[Tuple[int, Publication]]:
+        """Up to `limit` publications added after the one with id `last_id`, as (id, publication) in id order."""
+        return [(row[0], Publication(*row[1:])) for row in self._connect().execute(
+            'SELECT id, %s FROM publications WHERE id > ? ORDER BY id LIMIT ?' % ', '.join(Publication._fields),
+            (last_id, limit))]
+
+    def stats(self) -> Tuple[int, int]:
+        """(publications, files) in the index."""
+        db = self._connect()
+        return (db.execute('SELECT count(*) FROM publications').fetchone()[0],
+                db.execute('SELECT count(*) FROM files').fetchone()[0])
@@ -0,0 +1,305 @@
+# coding=utf-8
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_right
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+
+# bump whenever the layout of the compiled artifact changes
+ARTIFACT_VERSION = 1
+
+
+class Penalty(NamedTuple):
+    zone: str
+    band: str
+    consequence: str
+    criminal_record: bool
+    criminal_record_text: str
+    source: str
+
+
+def _text(value) -> str:
+    # empty cells come out of the sheet as None or NaN
+    if value is None or value != value:
+        return ''
+    return str(value).strip()
+
+
+def parse_band(band: str) -> float:
+    """Returns the lower edge (km/h over the limit) of a band like '1-5', '16-24' or 'ab 40'."""
+    band = band.strip().lower()
+    if band.startswith('ab'):
+        return float(band[2:].strip())
+    return float(band.split('-', 1)[0].strip())
+
+
+class SpeedLimitTable(object):
+    """
+    Per-zone interval index over the penalty bands.
+
+    Every zone keeps the lower band edges sorted, so a band is found by bisecting the
+    speed (km/h over the limit, after the tolerance deduction). A band reaches up to the
+    next band's lower edge; where the sheet overlaps bands ('21-30', '30-34') the higher
+    band wins, and the last band ('ab 60') is open ended.
+    """
+
+    def __init__(self, rows: Iterable[Sequence]):
+        zones = {}  # type: Dict[str, List[Penalty]]
+        zone = None
+        for row in rows:
+            zone = _text(row[0]) or zone
+            band = _text(row[1])
+            if not zone or not band:
+                continue
+            record = _text(row[3])
+            zones.setdefault(zone, []).append(Penalty(zone=zone,
+                                                      band=band,
+                                                      consequence=_text(row[2]),
+                                                      criminal_record=record.lower().startswith('ja'),
+                                                      criminal_record_text=record,
+                                                      source=_text(row[4])))
+
+        self._penalties = {}
+        self._edges = {}
+        self._arrays = {}
+        for zone, penalties in zones.items():
+            penalties.sort(key=lambda p: parse_band(p.band))
+            self._penalties[zone] = tuple(penalties)
+            self._edges[zone] = [parse_band(p.band) for p in penalties]
+            self._arrays[zone] = np.array(self._edges[zone], dtype=np.float64)
+
+    @classmethod
+    def from_frame(cls, frame) -> 'SpeedLimitTable':
+        """Builds the index from the sheet as read by `pandas.read_excel` (no index columns)."""
+        return cls(frame.itertuples(index=False, name=None))
+
+    @classmethod
+    def from_artifact(cls, artifact_path: str) -> 'SpeedLimitTable':
+        """Builds the index from an artifact written by `compile_artifact`, without pandas."""
+        with open(artifact_path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != ARTIFACT_VERSION:
+            raise ValueError(f'{artifact_path}: unsupported artifact version {data.get("version")}')
+        return cls(data['rows'])
+
+    @property
+    def zones(self) -> List[str]:
+        return list(self._penalties)
+
+    def penalties(self, zone: str) -> Sequence[Penalty]:
+        return self._penalties[zone]
+
+    def lookup(self, zone: str, speed: float) -> Optional[Penalty]:
+        """Returns the penalty for `speed` km/h over the limit in `zone`, None if nothing applies."""
+        i = bisect_right(self._edges[zone], speed) - 1
+        return self._penalties[zone][i] if i >= 0 else None
+
+    def band_indices(self, zones: Union[str, Sequence[str]], speeds) -> np.ndarray:
+        """
+        Vectorised lookup: returns for every speed the index of its band within its zone
+        (see `penalties`), -1 where nothing applies. `zones` is either a single zone for all
+        speeds or one zone per speed.
+        """
+        speeds = np.asarray(speeds, dtype=np.float64)
+        if isinstance(zones, str):
+            return np.searchsorted(self._arrays[zones], speeds, side='right') - 1
+
+        zones = np.asarray(zones, dtype=object)
+        if zones.shape != speeds.shape:
+            raise ValueError('zones and speeds must have the same length')
+        result = np.empty(speeds.shape, dtype=np.intp)
+        for zone in set(zones.tolist()):
+            mask = zones == zone
+            result[mask] = np.searchsorted(self._arrays[zone], speeds[mask], side='right') - 1
+        return result
+
+    def lookup_many(self, zones: Union[str, Sequence[str]], speeds) -> List[Optional[Penalty]]:
+        """Batch version of `lookup`, see `band_indices`."""
+        indices = self.band_indices(zones, speeds).tolist()
+        if isinstance(zones, str):
+            zones = [zones] * len(indices)
+        return [self._penalties[zone][i] if i >= 0 else None for zone, i in zip(zones, indices)]
+
+
+def _sha256(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def compile_artifact(xlsx_path: str, artifact_path: str) -> None:
+    """
+    Compiles the penalty sheet into a small versioned JSON artifact. This is the only
+    place that needs pandas (and its excel reader); the app itself loads the artifact.
+    """
+    import pandas as pd
+
+    frame = pd.read_excel(xlsx_path)
+    rows = [[_text(value) for value in row[:5]] for row in frame.itertuples(index=False, name=None)]
+    header = {'version': ARTIFACT_VERSION,
+              'source': os.path.basename(xlsx_path),
+              'source_sha256': _sha256(xlsx_path)}
+
+    # one row per line, so changes to the sheet show up as readable diffs
+    text = json.dumps(header, ensure_ascii=False, indent=1)[:-2]
+    text += ',\n "rows": [\n' + ',\n'.join('  ' + json.dumps(row, ensure_ascii=False) for row in rows) + '\n ]\n}'
+
+    tmp_path = artifact_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text + '\n')
+    os.replace(tmp_path, artifact_path)
+
+
+def artifact_is_stale(xlsx_path: str, artifact_path: str) -> bool:
+    """True if the artifact is missing, has an old version or was built from another spreadsheet."""
+    if not os.path.exists(artifact_path):
+        return True
+    if not os.path.exists(xlsx_path):
+        # deployed without the spreadsheet, the artifact is all we have
+        return False
+    try:
+        with open(artifact_path, encoding='utf-8') as f:
+            data = json.load(f)
+    except ValueError:
+        return True
+    return data.get('version') != ARTIFACT_VERSION or data.get('source_sha256') != _sha256(xlsx_path)
+
+
+# <canton>_<effective date>.json (an artifact) or .xlsx (its spreadsheet), e.g. ZH_2013-01-01.json
+DATASET_RE = re.compile(r'^([A-Z]{2})_(\d{4}-\d{2}-\d{2})\.(json|xlsx)$')
+
+
+class Dataset(NamedTuple):
+    canton: str
+    effective: date
+    path: str
+    table: SpeedLimitTable
+
+
+class _Snapshot(NamedTuple):
+    # (name, mtime_ns, size) of every artifact the snapshot was built from
+    fingerprint: Tuple[Tuple[str, int, int], ...]
+    # per canton, the datasets by effective date and their dates for bisecting
+    datasets: Dict[str, Tuple[Dataset, ...]]
+    dates: Dict[str, List[date]]
+
+
+class PenaltyRegistry(object):
+    """
+    The penalty tables of every canton and effective date in a directory, one artifact
+    per canton and date (see DATASET_RE). A query takes the dataset of the canton that
+    was in force on the given day.
+
+    `scan` rebuilds all tables when an artifact was added, changed or removed and
+    replaces the snapshot as a whole, so a query (which reads the snapshot once and no
+    lock) never sees a half-loaded table; a broken artifact keeps the previous snapshot.
+    A spreadsheet edited after its artifact was built is logged as a warning.
+    `start` scans in a background thread every few seconds.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._snapshot = _Snapshot((), {}, {})
+        self._lock = threading.Lock()
+        self._thread_pid = None  # type: Optional[int]
+        # (spreadsheet, mtime_ns) already checked against its artifact
+        self._checked = set()  # type: Set[Tuple[str, int]]
+
+    def _fingerprint(self) -> Tuple[Tuple[str, int, int], ...]:
+        entries = []
+        sheets = {}  # type: Dict[str, int]
+        for entry in os.scandir(self.directory):
+            match = DATASET_RE.match(entry.name)
+            if match and match.group(3) == 'json':
+                stat = entry.stat()
+                entries.append((entry.name, stat.st_mtime_ns, stat.st_size))
+            elif match:
+                sheets[entry.name] = entry.stat().st_mtime_ns
+        # only artifacts are loaded (compiling needs pandas), an edited spreadsheet is
+        # just reported, once per version; a newer file (e.g. after a checkout) is compared
+        # with the artifact's source hash first
+        artifacts = {name: mtime for name, mtime, _ in entries}
+        for name, mtime in sheets.items():
+            artifact = os.path.splitext(name)[0] + '.json'
+            if mtime > artifacts.get(artifact, -1) and (name, mtime) not in self._checked:
+                self._checked.add((name, mtime))
+                path = os.path.join(self.directory, name)
+                if artifact_is_stale(path, os.path.join(self.directory, artifact)):
+                    logging.getLogger(__name__).warning('%s is newer than its artifact, run `flask build-speedlimits`',
+                                                        path)
+        return tuple(sorted(entries))
+
+    def scan(self) -> bool:
+        """Reloads the datasets if the directory has changed, True if it did."""
+        with self._lock:
+            fingerprint = self._fingerprint()
+            if fingerprint == self._snapshot.fingerprint:
+                return False
+            datasets = {}  # type: Dict[str, List[Dataset]]
+            for name, _, _ in fingerprint:
+                canton, effective, _ = DATASET_RE.match(name).groups()
+                path = os.path.join(self.directory, name)
+                dataset = Dataset(canton, date.fromisoformat(effective), path, SpeedLimitTable.from_artifact(path))
+                datasets.setdefault(canton, []).append(dataset)
+            for versions in datasets.values():
+                versions.sort(key=lambda dataset: dataset.effective)
+            self._snapshot = _Snapshot(fingerprint,
+                                       {canton: tuple(versions) for canton, versions in datasets.items()},
+                                       {canton: [dataset.effective for dataset in versions]
+                                        for canton, versions in datasets.items()})
+            return True
+
+    @property
+    def cantons(self) -> List[str]:
+        return sorted(self._snapshot.datasets)
+
+    def versions(self, canton: str) -> Sequence[Dataset]:
+        return self._snapshot.datasets.get(canton, ())
+
+    def dataset(self, canton: str, on: Optional[date] = None) -> Dataset:
+        """The dataset of `canton` in force on `on` (today), KeyError if there is none."""
+        snapshot = self._snapshot
+        on = on or date.today()
+        i = bisect_right(snapshot.dates.get(canton, ()), on) - 1
+        if i < 0:
+            raise KeyError(canton)
+        return snapshot.datasets[canton][i]
+
+    def table(self, canton: str, on: Optional[date] = None) -> SpeedLimitTable:
+        return self.dataset(canton, on).table
+
+    def start(self, interval: float) -> None:
+        """Scans every `interval` seconds in a daemon thread, one per process (also after a fork)."""
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid != os.getpid():
+                self._thread_pid = os.getpid()
+                threading.Thread(target=self._run, args=(interval,), name='speedlimits-watcher', daemon=True).start()
+
+    def _run(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                self.scan()
+            except Exception:
+                # e.g. an artifact copied in by hand and not complete yet, retried next time
+                logging.getLogger(__name__).exception('reloading the speed-limit datasets failed')
+
+
+def spreadsheets(directory: str) -> List[Tuple[str, str]]:
+    """(spreadsheet, artifact) of every dataset spreadsheet in `directory`."""
+    pairs = []
+    for name in sorted(os.listdir(directory)):
+        match = DATASET_RE.match(name)
+        if match and match.group(3) == 'xlsx':
+            xlsx_path = os.path.join(directory, name)
+            pairs.append((xlsx_path, os.path.splitext(xlsx_path)[0] + '.json'))
+    return pairs
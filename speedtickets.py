@@ -0,0 +1,216 @@
+# coding=utf-8
+import csv
+import io
+import itertools
+import os
+import zipfile
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from speedlimits import SpeedLimitTable
+
+# tolerance deducted from the measured speed (VSKV-ASTRA Art. 8), for measured speeds
+# up to 100 km/h, from 101 to 150 km/h and above 150 km/h
+TOLERANCES = {'radar': (5, 6, 7), 'laser': (3, 4, 5)}
+_TOLERANCE_STEPS = np.array([100.0, 150.0])
+_TOLERANCE_TABLE = np.array([TOLERANCES[method] for method in sorted(TOLERANCES)], dtype=np.float64)
+_METHODS = {method: i for i, method in enumerate(sorted(TOLERANCES))}
+
+# zone by signalled limit when a file has no zone column: up to 30, up to 50, up to 100, above
+ZONES_BY_LIMIT = ('30er', 'Innerorts', 'Ausserorts / Autostrasse', 'Autobahn')
+_LIMIT_STEPS = np.array([30.0, 50.0, 100.0])
+
+# accepted header names (compared in lower case) per column
+COLUMNS = {
+    'speed': ('gemessen', 'geschwindigkeit', 'gemessene geschwindigkeit', 'speed', 'measured'),
+    'limit': ('limit', 'höchstgeschwindigkeit', 'signalisiert', 'erlaubt', 'speed limit'),
+    'zone': ('zone',),
+    'method': ('messart', 'messmethode', 'methode', 'method'),
+}
+OUTPUT_COLUMNS = ('Toleranz', 'Überschreitung', 'Bewertete Zone', 'Konsequenz', 'Strafregister', 'Quelle', 'Fehler')
+CHUNK_SIZE = 5000
+
+
+def tolerance(measured: np.ndarray, methods) -> np.ndarray:
+    """
+    Tolerance in km/h for every measured speed. `methods` is 'radar' or 'laser' for all
+    speeds or one per speed; unknown methods get NaN.
+    """
+    step = np.searchsorted(_TOLERANCE_STEPS, measured, side='left')
+    if isinstance(methods, str):
+        method = _METHODS.get(methods)
+        if method is None:
+            return np.full(measured.shape, np.nan)
+        return _TOLERANCE_TABLE[method][step]
+    index = np.array([_METHODS.get(method, -1) for method in methods], dtype=np.intp)
+    result = _TOLERANCE_TABLE[index, step]
+    result[index < 0] = np.nan
+    return result
+
+
+def zones_for_limits(limits: np.ndarray) -> np.ndarray:
+    """The zone (see ZONES_BY_LIMIT) for every signalled limit."""
+    return np.array(ZONES_BY_LIMIT, dtype=object)[np.searchsorted(_LIMIT_STEPS, limits, side='left')]
+
+
+def _float(value) -> float:
+    try:
+        return float(str(value).replace(',', '.'))
+    except ValueError:
+        return np.nan
+
+
+def _floats(values: Sequence) -> np.ndarray:
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        # decimal commas, empty cells, 'n/a'
+        return np.array([_float(value) for value in values], dtype=np.float64)
+
+
+def find_columns(header: Sequence) -> Dict[str, int]:
+    """Maps 'speed', 'limit' and, if present, 'zone' and 'method' to their column index."""
+    names = [str(name or '').strip().lower() for name in header]
+    columns = {}
+    for column, aliases in COLUMNS.items():
+        for i, name in enumerate(names):
+            if name in aliases:
+                columns[column] = i
+                break
+    missing = [COLUMNS[column][0] for column in ('speed', 'limit') if column not in columns]
+    if missing:
+        raise ValueError(f'Spalte(n) fehlen: {", ".join(missing)}')
+    return columns
+
+
+def read_csv(stream) -> Iterator[list]:
+    """Rows of a CSV file in UTF-8, separated by ';', ',' or tabs (sniffed from the start)."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+    sample = text.read(4096)
+    sample += text.readline()
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=';,\t')
+    except csv.Error:
+        dialect = csv.excel
+    return csv.reader(itertools.chain(io.StringIO(sample, newline=''), text), dialect)
+
+
+def read_xlsx(stream) -> Iterator[list]:
+    """Rows of the first sheet of an Excel workbook, read without loading the whole sheet."""
+    from openpyxl import load_workbook
+
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, KeyError) as ex:
+        raise ValueError(f'Keine gültige Excel-Datei: {ex}')
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        workbook.close()
+
+
+def read_rows(stream, filename: str) -> Tuple[list, Iterator[list]]:
+    """(header, remaining rows) of an uploaded .csv or .xlsx file, without blank rows."""
+    if os.path.splitext(filename or '')[1].lower() in ('.xlsx', '.xlsm'):
+        rows = read_xlsx(stream)
+    else:
+        rows = read_csv(stream)
+    rows = (row for row in rows if any(row))
+    header = next(rows, None)
+    if header is None:
+        raise ValueError('Die Datei ist leer')
+    return header, rows
+
+
+def _column(rows: List[list], index: Optional[int]) -> Optional[list]:
+    if index is None:
+        return None
+    return [row[index] if index < len(row) else None for row in rows]
+
+
+def _text(values: Optional[list]) -> Optional[list]:
+    if values is None:
+        return None
+    return [str(value).strip() if value is not None else '' for value in values]
+
+
+def score_chunk(table: SpeedLimitTable, columns: Dict[str, int], rows: List[list], method: str) -> List[list]:
+    """The rows with OUTPUT_COLUMNS appended, all at once per numpy operation."""
+    measured = _floats(_column(rows, columns['speed']))
+    limits = _floats(_column(rows, columns['limit']))
+
+    zones = zones_for_limits(limits)
+    given = _text(_column(rows, columns.get('zone')))
+    if given is not None:
+        given = np.array(given, dtype=object)
+        zones = np.where(given != '', given, zones)
+
+    methods = _text(_column(rows, columns.get('method')))
+    if methods is not None:
+        methods = [value.lower() or method for value in methods]
+    tolerances = tolerance(measured, methods if methods is not None else method)
+    excess = measured - tolerances - limits
+
+    known = np.isin(zones, table.zones)
+    valid = known & ~np.isnan(excess)
+    indices = np.full(len(rows), -1, dtype=np.intp)
+    if valid.any():
+        indices[valid] = table.band_indices(zones[valid], excess[valid])
+
+    # the columns after the zone are the same for every row of a band
+    tails = {}
+    out = []
+    for row, zone, tol, over, i, ok, zone_ok in zip(rows, zones.tolist(), tolerances.tolist(), excess.tolist(),
+                                                    indices.tolist(), valid.tolist(), known.tolist()):
+        if not ok:
+            if not zone_ok:
+                error = f'unbekannte Zone {zone}'
+            elif tol != tol:
+                error = 'unbekannte Messart'
+            else:
+                error = 'Geschwindigkeit oder Limit ungültig'
+            out.append(row + ['', '', zone, '', '', '', error])
+            continue
+        tail = tails.get((zone, i))
+        if tail is None:
+            if i < 0:
+                tail = ['Keine Übertretung', 'nein', '', '']
+            else:
+                penalty = table.penalties(zone)[i]
+                tail = [penalty.consequence, 'ja' if penalty.criminal_record else 'nein', penalty.source, '']
+            tails[zone, i] = tail
+        out.append(row + [f'{tol:g}', f'{over:g}', zone] + tail)
+    return out
+
+
+def score(table: SpeedLimitTable, header: list, rows: Iterable[list], method: str = 'radar',
+          chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """
+    Scores the recorded violations in `rows` chunk by chunk and returns the annotated
+    file as an iterator of CSV text (';' separated, as Excel expects it here), so memory
+    stays constant whatever the size of the input. `method` is the measuring method for
+    rows without one. Raises ValueError right away if a required column is missing.
+    """
+    columns = find_columns(header)
+    if method not in TOLERANCES:
+        raise ValueError(f'unbekannte Messart {method}')
+
+    def lines():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=';')
+        writer.writerow(list(header) + list(OUTPUT_COLUMNS))
+        remaining = iter(rows)
+        while True:
+            chunk = list(itertools.islice(remaining, chunk_size))
+            if not chunk:
+                break
+            writer.writerows(score_chunk(table, columns, chunk, method))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    return lines()
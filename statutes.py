@@ -0,0 +1,284 @@
+# coding=utf-8
+import hashlib
+import mmap
+import os
+import re
+import struct
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# the acts linked by Visible Article, as cited, with their SR number; the Fedlex dump of
+# an act is expected as <abbreviation>.xml (Akoma Ntoso, any case) in the source directory
+ACTS = {
+    'ArG': '822.11',
+    'ATSG': '830.1',
+    'AuG': '142.20',
+    'BGG': '173.110',
+    'BV': '101',
+    'BVG': '831.40',
+    'DBG': '642.11',
+    'DSG': '235.1',
+    'KVG': '832.10',
+    'MWSTG': '641.20',
+    'OBV': '314.11',
+    'OR': '220',
+    'SchKG': '281.1',
+    'StGB': '311.0',
+    'StPO': '312.0',
+    'SVG': '741.01',
+    'UVG': '832.20',
+    'VRV': '741.11',
+    'VTS': '741.41',
+    'ZGB': '210',
+    'ZPO': '272',
+}
+_ACTS_BY_KEY = {act.upper(): act for act in ACTS}
+
+# bump whenever the layout of the index changes
+INDEX_VERSION = 1
+MAGIC = b'LTSTATUT'
+# magic, version, number of records, key width, digest of the sources
+HEADER = struct.Struct('<8sIII32s')
+# offset and length of the text in the text section
+RECORD_VALUE = struct.Struct('<II')
+
+# elements whose text is separated from what follows, all others are inline
+_BLOCKS = {'p', 'num', 'heading', 'content', 'paragraph', 'blockList', 'item', 'listIntroduction', 'subparagraph'}
+
+_SUFFIXES = 'bis|ter|quater|quinquies|sexies|septies|octies|novies|decies'
+_ARTICLE_NUMBER_RE = re.compile(r'(\d+)\s*(%s|[a-z])?\b' % _SUFFIXES, re.IGNORECASE)
+CITATION_RE = re.compile(
+    r'\bArt(?:ikel|\.)?\s*(?P<article>\d+(?:[a-z]|\s?(?:%s))?)\b' % _SUFFIXES +
+    r'(?:\s*f{1,2}\.)?'
+    r'(?:\s*Abs\.\s*(?P<paragraph>\d+[a-z]*))?'
+    r'(?:\s*(?:lit\.|Bst\.|Buchst\.)\s*(?P<letter>[a-z]{1,2})\b)?'
+    r'(?:\s*Ziff\.\s*\d+)?'
+    r'(?:\s*f{1,2}\.)?'
+    r'\s+(?P<act>%s)\b' % '|'.join(sorted(ACTS, key=len, reverse=True)),
+    re.IGNORECASE)
+
+
+class Article(NamedTuple):
+    number: str
+    heading: str
+    # (number, text); a single unnumbered paragraph for articles without paragraphs
+    paragraphs: List[Tuple[str, str]]
+
+
+class Citation(NamedTuple):
+    start: int
+    end: int
+    citation: str
+    act: str
+    article: str
+    paragraph: Optional[str]
+    letter: Optional[str]
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _collect(element, parts: List[str], skip: Tuple[str, ...]) -> None:
+    if element.text:
+        parts.append(element.text)
+    for child in element:
+        tag = _local(child.tag)
+        # footnotes are not part of the text
+        if tag not in skip and tag != 'authorialNote':
+            _collect(child, parts, ())
+            if tag in _BLOCKS:
+                parts.append(' ')
+        if child.tail:
+            parts.append(child.tail)
+
+
+def _text(element, skip: Tuple[str, ...] = ()) -> str:
+    parts = []
+    _collect(element, parts, skip)
+    return ' '.join(''.join(parts).split())
+
+
+def article_number(text: str) -> str:
+    """'Art. 336 c' -> '336c', '4bis' -> '4bis'."""
+    match = _ARTICLE_NUMBER_RE.search(text)
+    if not match:
+        return ''
+    return (match.group(1) + (match.group(2) or '')).lower()
+
+
+def _article(element) -> Optional[Article]:
+    number, heading, paragraphs = '', '', []
+    for child in element:
+        tag = _local(child.tag)
+        if tag == 'num':
+            number = article_number(_text(child))
+        elif tag == 'heading':
+            heading = _text(child)
+        elif tag == 'paragraph':
+            paragraph = next((_text(c) for c in child if _local(c.tag) == 'num'), '')
+            paragraphs.append((paragraph.rstrip('.'), _text(child, skip=('num',))))
+    if not paragraphs:
+        body = _text(element, skip=('num', 'heading'))
+        if body:
+            paragraphs.append(('', body))
+    if not number:
+        return None
+    return Article(number, heading, paragraphs)
+
+
+def iter_articles(path: str) -> Iterator[Article]:
+    """Articles of a Fedlex (Akoma Ntoso) dump in document order, dropped from the tree once read."""
+    for _, element in ET.iterparse(path):
+        if _local(element.tag) == 'article':
+            article = _article(element)
+            if article is not None:
+                yield article
+            element.clear()
+
+
+def sources(source_dir: str) -> Dict[str, str]:
+    """act -> path of its dump, for the known acts found in `source_dir`."""
+    found = {}
+    if os.path.isdir(source_dir):
+        for name in sorted(os.listdir(source_dir)):
+            stem, extension = os.path.splitext(name)
+            if extension.lower() == '.xml' and stem.upper() in _ACTS_BY_KEY:
+                found[_ACTS_BY_KEY[stem.upper()]] = os.path.join(source_dir, name)
+    return found
+
+
+def sources_digest(source_dir: str) -> bytes:
+    # names, sizes and modification times, so checking for changes reads no dump
+    digest = hashlib.sha256()
+    for act, path in sources(source_dir).items():
+        stat = os.stat(path)
+        digest.update(f'{act}\0{stat.st_size}\0{stat.st_mtime_ns}\n'.encode())
+    return digest.digest()
+
+
+def _key(act: str, article: str, paragraph: Optional[str] = None) -> bytes:
+    key = f'{act.upper()} {article.lower()}'
+    if paragraph:
+        key += f' {paragraph.lower()}'
+    return key.encode('utf-8')
+
+
+def compile_index(source_dir: str, index_path: str) -> int:
+    """
+    Compiles the dumps in `source_dir` into the index at `index_path`, returns the
+    number of articles. An article's text is its heading and its numbered paragraphs,
+    one per line; a paragraph's record points into the text of its article.
+    """
+    records = {}  # type: Dict[bytes, Tuple[int, int]]
+    texts = []
+    offset = 0
+    articles = 0
+    for act, path in sources(source_dir).items():
+        for article in iter_articles(path):
+            key = _key(act, article.number)
+            # later articles of the same number (final and transitional provisions) are left out
+            if key in records:
+                continue
+            start = offset
+            if article.heading:
+                encoded = (article.heading + '\n').encode('utf-8')
+                texts.append(encoded)
+                offset += len(encoded)
+            for paragraph, text in article.paragraphs:
+                encoded = (f'{paragraph} {text}' if paragraph else text).encode('utf-8') + b'\n'
+                if paragraph:
+                    records.setdefault(_key(act, article.number, paragraph), (offset, len(encoded) - 1))
+                texts.append(encoded)
+                offset += len(encoded)
+            records[key] = (start, offset - start - 1 if offset > start else 0)
+            articles += 1
+
+    width = max((len(key) for key in records), default=1)
+    # one per process, so two compiling at once do not write into the same file
+    tmp_path = f'{index_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, INDEX_VERSION, len(records), width, sources_digest(source_dir)))
+        for key in sorted(records):
+            f.write(key.ljust(width, b'\0') + RECORD_VALUE.pack(*records[key]))
+        f.writelines(texts)
+    os.replace(tmp_path, index_path)
+    return articles
+
+
+def index_is_stale(source_dir: str, index_path: str) -> bool:
+    """True if the index is missing, has an old layout or was compiled from other dumps."""
+    if not os.path.exists(index_path):
+        return True
+    if not sources(source_dir):
+        # deployed without the dumps, the index is all we have
+        return False
+    with open(index_path, 'rb') as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return True
+    magic, version, _, _, digest = HEADER.unpack(header)
+    return magic != MAGIC or version != INDEX_VERSION or digest != sources_digest(source_dir)
+
+
+class StatuteIndex(object):
+    """
+    Read-only view of a compiled index. The file is memory-mapped and searched in
+    place (binary search over the sorted fixed-width keys), so opening it reads
+    nothing, and worker processes share its pages through the page cache.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self._width, _ = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != INDEX_VERSION:
+            raise ValueError(f'{path} is not a statute index of version {INDEX_VERSION}')
+        self._record_size = self._width + RECORD_VALUE.size
+        self._texts = HEADER.size + self.count * self._record_size
+
+    def _find(self, key: bytes) -> Optional[str]:
+        if len(key) > self._width:
+            return None
+        key = key.ljust(self._width, b'\0')
+        data, width, size = self._map, self._width, self._record_size
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            position = HEADER.size + mid * size
+            if data[position:position + width] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        position = HEADER.size + lo * size
+        if lo == self.count or data[position:position + width] != key:
+            return None
+        offset, length = RECORD_VALUE.unpack_from(data, position + width)
+        return data[self._texts + offset:self._texts + offset + length].decode('utf-8')
+
+    def lookup(self, act: str, article: str, paragraph: Optional[str] = None) -> Optional[str]:
+        """Text of an article, or of one of its paragraphs; None if the index does not have it."""
+        return self._find(_key(act, article_number(article) or article, paragraph))
+
+    def resolve(self, text: str) -> List[Dict]:
+        """Every citation in `text` with the text it refers to (None where unknown), in order."""
+        resolved = {}
+        citations = []
+        for citation in extract(text):
+            key = (citation.act, citation.article, citation.paragraph)
+            if key not in resolved:
+                resolved[key] = self.lookup(*key)
+            citations.append(dict(citation._asdict(), text=resolved[key]))
+        return citations
+
+    def close(self) -> None:
+        self._map.close()
+
+
+def extract(text: str) -> Iterator[Citation]:
+    """The citations of the known acts ('Art. 336c Abs. 1 lit. b OR', 'Art. 8 BV', ...) in `text`."""
+    for match in CITATION_RE.finditer(text):
+        yield Citation(start=match.start(), end=match.end(), citation=match.group(0),
+                       act=_ACTS_BY_KEY[match.group('act').upper()],
+                       article=match.group('article').replace(' ', '').lower(),
+                       paragraph=match.group('paragraph'), letter=match.group('letter'))
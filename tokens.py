@@ -0,0 +1,88 @@
+# coding=utf-8
+import threading
+import time
+from typing import Optional
+
+import requests
+from authlib.jose import jwt
+from authlib.jose.errors import JoseError
+
+
+class InvalidTokenError(Exception):
+    pass
+
+
+class JWKSCache(object):
+    """
+    JSON Web Key Set of the identity provider, fetched once and kept for `ttl`
+    seconds. A token signed with an unknown key id (the provider rotated its keys)
+    triggers a refetch, but at most once every `min_refresh` seconds.
+    """
+
+    def __init__(self, url: str, ttl: int = 3600, min_refresh: int = 60, http=None):
+        self.url = url
+        self.ttl = ttl
+        self.min_refresh = min_refresh
+        self.http = http or requests.Session()
+        self._keys = {}
+        self._fetched = None
+        self._lock = threading.Lock()
+
+    def _fetch(self):
+        response = self.http.get(self.url, timeout=5)
+        response.raise_for_status()
+        self._keys = {key.get('kid'): key for key in response.json().get('keys', [])
+                      if key.get('kty') == 'RSA' and key.get('use', 'sig') == 'sig'}
+        self._fetched = time.monotonic()
+
+    def get_key(self, kid: Optional[str]) -> dict:
+        now = time.monotonic()
+        key = self._keys.get(kid)
+        if key is not None and now - self._fetched < self.ttl:
+            return key
+
+        with self._lock:
+            key = self._keys.get(kid)
+            fresh = self._fetched is not None and now - self._fetched < self.ttl
+            if key is None or not fresh:
+                if self._fetched is None or now - self._fetched >= self.min_refresh:
+                    try:
+                        self._fetch()
+                        key = self._keys.get(kid)
+                    except (requests.RequestException, ValueError) as ex:
+                        if key is None:
+                            raise InvalidTokenError(f'could not fetch JWKS: {ex}')
+                        # keep using the known key while the provider is unreachable
+        if key is None:
+            raise InvalidTokenError(f'unknown key id {kid}')
+        return key
+
+
+class TokenVerifier(object):
+    """Verifies RS256 signed ID tokens against the provider's JWKS, locally."""
+
+    def __init__(self, jwks: JWKSCache, issuer: str, audience: str, leeway: int = 60):
+        self.jwks = jwks
+        self.issuer = issuer
+        self.audience = audience
+        self.leeway = leeway
+
+    def _key(self, header, payload):
+        if header.get('alg') != 'RS256':
+            raise InvalidTokenError(f'unexpected algorithm {header.get("alg")}')
+        return self.jwks.get_key(header.get('kid'))
+
+    def verify(self, token: Optional[str]) -> dict:
+        """Returns the claims of `token`, raises InvalidTokenError if it is not valid (anymore)."""
+        if not token:
+            raise InvalidTokenError('no token')
+        try:
+            claims = jwt.decode(token, self._key,
+                                claims_options={'iss': {'essential': True, 'value': self.issuer},
+                                                'aud': {'essential': True, 'value': self.audience},
+                                                'exp': {'essential': True},
+                                                'sub': {'essential': True}})
+            claims.validate(leeway=self.leeway)
+        except (JoseError, ValueError) as ex:
+            raise InvalidTokenError(str(ex))
+        return dict(claims)
@@ -0,0 +1,126 @@
+# coding=utf-8
+from typing import NamedTuple, Optional
+
+import dominate.tags as html
+
+from pagecache import PageCache, placeholder
+
+
+class Tool(NamedTuple):
+    title1: str
+    title2: str
+    short_text: str = ''
+    more_title: str = ''
+    more_content: str = ''
+    # tools hosted elsewhere are shown in an iframe, all others render their own app_content
+    iframe: Optional[str] = None
+    iframe_height: str = '1024'
+
+    def appinfo(self) -> dict:
+        if self.iframe:
+            content = html.iframe(src=self.iframe, height=self.iframe_height, width='100%', frameborder=0)
+        else:
+            content = placeholder('app_content')
+        return {'title1': self.title1,
+                'title2': self.title2,
+                'short_text': self.short_text,
+                'app_content': content,
+                'more_title': self.more_title,
+                'more_content': self.more_content}
+
+
+# one entry per tool page rendered from application.html, keyed by route/endpoint name
+TOOLS = {
+    'legaldrop': Tool(
+        title1='Legal',
+        title2='Drop',
+        short_text='Mit Legal Drop versenden Sie Ihre Daten End-zu-End verschlüsselt an Ihre Klienten.',
+        more_title='Volle Sicherheit',
+        more_content='Senden Sie Dateien über einen sicheren, privaten und verschlüsselten Link, der automatisch '
+                     'abläuft, damit Ihre Daten nicht für immer im Internet bleiben.',
+        iframe='https://legaldrop.lawyer.tools',
+        iframe_height='600'),
+    'datedelta': Tool(
+        title1='Date',
+        title2='Delta',
+        short_text='Datums Delta berechnet die Anzahl Tage zwischen zwei Daten.',
+        more_title='Berechnungsformel',
+        more_content='Differenz zwischen zwei Daten - wahlweise in Kalendertagen, in Werktagen ohne die Feiertage '
+                     'des Kantons oder ohne die Gerichtsferien (Art. 145 ZPO)'),
+    'duedate': Tool(
+        title1='Due',
+        title2='Date',
+        short_text='Berechnen Sie Ihre Frist in Sekundenschnelle',
+        more_title='Berechnungsformel',
+        more_content='Art. 142-146 ZPO (Fristberechnung, Gerichtsferien), '
+                     'Art. 31, 56 und 63 SchKG (Betreibungsferien)'),
+    'speedlimits': Tool(
+        title1='Speed',
+        title2='Limits',
+        short_text='Was droht Ihrem Klienten bei einer Geschwindigkeitsübertretung',
+        more_title='Methodik',
+        more_content='Siehe die einschlägigen Rechtsquellen'),
+    'visiblearticle': Tool(
+        title1='Visible',
+        title2='Article',
+        short_text='Schnelle Popups von Gesetzestexten bei Ihrer Onlinerecherche',
+        more_title='Verlinkte Rechtsquellen',
+        more_content='ARG, ATSG, AUG, BGG, BV, BVG, DBG, DSG, INDEX, KVG, MWSTG, OBV, OR, SCHKG, STGB, STPO, SVG, '
+                     'UVG, VRV, VTS, ZGB, ZPO',
+        iframe='https://va.lawyer.tools'),
+    'founderbot': Tool(
+        title1='Founder',
+        title2='Bot',
+        short_text='Erstellen der kompletten Gründungsunterlagen mit wenigen Klicks. Bekannt vom Swisslegaltech '
+                   'Hackathon 2017!',
+        more_title='Output',
+        more_content='Es werden die benötigten Gründungsunterlagen schnell und einfach mit Ihren Eingaben abgemischt'),
+    'flightdelay': Tool(
+        title1='Flight',
+        title2='Delay',
+        short_text='Welche Ausgleichszahlung steht Ihrem Klienten bei Verspätung, Annullierung oder '
+                   'Nichtbeförderung zu',
+        more_title='Methodik',
+        more_content='Verordnung (EG) Nr. 261/2004, in der Schweiz anwendbar über das Luftverkehrsabkommen mit der '
+                     'EU. Entfernung als Grosskreisentfernung zwischen den Flughäfen, Ausgleich ab 3 Stunden '
+                     'Ankunftsverspätung (EuGH C-402/07 Sturgeon).'),
+    'highdrive': Tool(title1='High', title2='Drive'),
+    'labourlaw': Tool(
+        title1='Labour',
+        title2='Law',
+        short_text='Berechnen Sie Kündigungsfrist, Kündigungstermin und Sperrfristen eines Arbeitsverhältnisses',
+        more_title='Berechnungsformel',
+        more_content='Art. 335b OR (Probezeit), Art. 335c OR (Kündigungsfristen, Ende auf das Monatsende), '
+                     'Art. 336c OR (Kündigung zur Unzeit: Sperrfristen bei Krankheit, Unfall, Militärdienst, '
+                     'Schwangerschaft und Hilfsaktionen, Unterbruch der Kündigungsfrist)'),
+    'shabscanner': Tool(
+        title1='SHAB',
+        title2='Scanner',
+        short_text='Durchsuchen Sie die Publikationen im Schweizerischen Handelsamtsblatt nach Firma, UID, Kanton '
+                   'und Publikationsart',
+        more_title='Datenbasis',
+        more_content='Die Publikationen des SHAB werden laufend eingelesen und stehen über mehrere Jahre zur '
+                     'Suche bereit.'),
+    'watchdog': Tool(
+        title1='Watch',
+        title2='Dog',
+        short_text='Lassen Sie sich über neue SHAB-Publikationen zu Ihren Mandanten, Gegenparteien und Personen '
+                   'informieren',
+        more_title='Abgleich',
+        more_content='Firmennamen werden ohne Rechtsform verglichen (Muster AG findet auch Muster GmbH), Umlaute '
+                     'unabhängig von der Schreibweise (Müller, Mueller). Treffer ab dem Erfassen der Watchlist.'),
+}
+
+
+def render_tool(pages: PageCache, name: str, pageinfo: dict, userinfo: dict, content='') -> str:
+    """
+    Renders the page of tool `name`. The page shell is rendered once per tool and
+    cached in `pages`; only the user block and `content` (the tool's dominate tree,
+    ignored for iframe tools) are filled in per request.
+    """
+    tool = TOOLS[name]
+
+    def build_context():
+        return {'appinfo': tool.appinfo()}
+
+    return pages.render('tool:' + name, 'application.html', build_context, pageinfo, userinfo, app_content=content)
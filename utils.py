@@ -1,9 +1,47 @@
 # coding=utf-8
 from datetime import timedelta, datetime
-from typing import Optional
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional
 
+import numpy as np
 
-def cnvt_date(date_str, fmt='%Y-%m-%d'):
+from calendars import CANTONS, FIRST_YEAR, LAST_YEAR, MODES, YEARS, count_days
+
+
+ISO_FORMAT = '%Y-%m-%d'
+
+
+@lru_cache(maxsize=8192)
+def _parse_date(date_str: str) -> Optional[datetime]:
+    # 'YYYY-MM-DD' as sent by <input type="date"> (also 'YYYY-M-D', like strptime), or the Swiss
+    # 'DD.MM.YYYY' (also 'D.M.YYYY')
+    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
+        year, month, day = date_str[:4], date_str[5:7], date_str[8:]
+    elif '-' in date_str:
+        parts = date_str.split('-')
+        if len(parts) != 3 or len(parts[0]) != 4 or not (0 < len(parts[1]) <= 2 and 0 < len(parts[2]) <= 2):
+            return None
+        year, month, day = parts
+    else:
+        parts = date_str.split('.')
+        if len(parts) != 3 or len(parts[2]) != 4:
+            return None
+        day, month, year = parts
+    digits = year + month + day
+    if not (digits.isascii() and digits.isdigit()):
+        return None
+    try:
+        return datetime(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+def cnvt_date(date_str, fmt=ISO_FORMAT):
+    if fmt == ISO_FORMAT:
+        # fast path without strptime; anything longer than a date is rejected before the cache
+        if not isinstance(date_str, str) or len(date_str) > 10:
+            return None
+        return _parse_date(date_str)
     try:
         date_str = datetime.strptime(date_str, fmt)
     except ValueError:
@@ -18,3 +56,61 @@ def delta(start: str, end: str) -> Optional[timedelta]:
     if dt_start and dt_end:
         return dt_end - dt_start
     return None
+
+
+def days_between(start: str, end: str, mode: str = 'calendar', canton: Optional[str] = None) -> Optional[int]:
+    dt_start = cnvt_date(start)
+    dt_end = cnvt_date(end)
+
+    if dt_start and dt_end:
+        days = count_days(np.array([dt_start.date()], dtype='datetime64[D]'),
+                          np.array([dt_end.date()], dtype='datetime64[D]'),
+                          mode=mode, canton=canton)
+        return int(days[0])
+    return None
+
+
+def batch_days_between(rows: Iterable[dict], chunk_size: int = 10000) -> Iterator[dict]:
+    """
+    Bulk version of `days_between` for rows like {'start': ..., 'end': ..., 'canton': ..., 'mode': ...}.
+    Yields one result per row, in order, computing a chunk of rows at a time with one
+    vectorised `count_days` call per (mode, canton) in the chunk.
+    """
+    rows = iter(rows)
+    while True:
+        chunk = [row for _, row in zip(range(chunk_size), rows)]
+        if not chunk:
+            return
+
+        results = [None] * len(chunk)
+        groups = {}
+        for i, row in enumerate(chunk):
+            if not isinstance(row, dict):
+                results[i] = {'days': None, 'error': 'row must be an object'}
+                continue
+            mode = row.get('mode') or 'calendar'
+            canton = row.get('canton') or None
+            dt_start = cnvt_date(str(row.get('start', '')))
+            dt_end = cnvt_date(str(row.get('end', '')))
+            if not isinstance(mode, str) or mode not in MODES:
+                results[i] = {'days': None, 'error': f'unknown mode {mode}'}
+            elif canton is not None and (not isinstance(canton, str) or canton not in CANTONS):
+                results[i] = {'days': None, 'error': f'unknown canton {canton}'}
+            elif not (dt_start and dt_end):
+                results[i] = {'days': None, 'error': 'start and end must be dates (YYYY-MM-DD)'}
+            elif mode != 'calendar' and not (dt_start.year in YEARS and dt_end.year in YEARS):
+                results[i] = {'days': None, 'error': f'dates must be in the years {FIRST_YEAR} to {LAST_YEAR}'}
+            else:
+                group = groups.setdefault((mode, canton), ([], [], []))
+                group[0].append(i)
+                group[1].append(dt_start.date())
+                group[2].append(dt_end.date())
+
+        for (mode, canton), (indices, starts, ends) in groups.items():
+            days = count_days(np.array(starts, dtype='datetime64[D]'),
+                              np.array(ends, dtype='datetime64[D]'),
+                              mode=mode, canton=canton)
+            for i, n in zip(indices, days.tolist()):
+                results[i] = {'days': n}
+
+        yield from results
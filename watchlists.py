@@ -0,0 +1,339 @@
+# coding=utf-8
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from shab import Publication, ShabIndex, normalise_uid, words
+
+KINDS = ('name', 'uid', 'person')
+
+# legal forms dropped from the end of watched company names, so that "Muster AG" also
+# finds "Muster GmbH" or "Muster SA in Liquidation" (in normalised words, see `normalise`)
+LEGAL_FORMS = sorted((tuple(form.split()) for form in (
+    'ag', 'sa', 'gmbh', 'sarl', 'sagl', 'srl', 'ltd', 'llc', 'inc', 'kg', 'co', 'cie', 'und co', 'and co', 'et cie',
+    'in liquidation', 'in liq', 'en liquidation', 'in liquidazione', 'aktiengesellschaft', 'societe anonyme',
+    'gesellschaft mit beschraenkter haftung', 'genossenschaft', 'societe cooperative', 'stiftung', 'fondation',
+    'fondazione', 'verein', 'association', 'einzelunternehmen', 'entreprise individuelle', 'kollektivgesellschaft',
+    'kommanditgesellschaft')), key=len, reverse=True)
+
+_UMLAUTS = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'Ä': 'Ae', 'Ö': 'Oe', 'Ü': 'Ue'})
+_UID_RE = re.compile(r'CHE[-\s.]?\d{3}[.\s]?\d{3}[.\s]?\d{3}')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS watchlists (id INTEGER PRIMARY KEY, user TEXT, name TEXT);
+CREATE INDEX IF NOT EXISTS watchlists_user ON watchlists (user);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    watchlist INTEGER,
+    kind TEXT,
+    value TEXT,
+    -- normalised words separated by spaces, alternatives (orders of a person's names) by '|'
+    pattern TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_watchlist ON entries (watchlist);
+CREATE TABLE IF NOT EXISTS hits (
+    watchlist INTEGER,
+    publication INTEGER,
+    entry INTEGER,
+    number TEXT,
+    date TEXT,
+    type TEXT,
+    name TEXT,
+    title TEXT,
+    PRIMARY KEY (watchlist, publication, entry)
+) WITHOUT ROWID;
+-- last_publication: id in the SHAB index up to which publications were matched,
+-- version: bumped on every change of the watchlists
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value INTEGER);
+'''
+
+
+def normalise(text: str) -> List[str]:
+    """Words for matching: 'Müller', 'Mueller' and 'MÜLLER' all become 'mueller', 'é' becomes 'e'."""
+    return words(text.translate(_UMLAUTS))
+
+
+def strip_legal_form(name: List[str]) -> List[str]:
+    stripped = True
+    while stripped:
+        stripped = False
+        for form in LEGAL_FORMS:
+            if len(name) > len(form) and tuple(name[-len(form):]) == form:
+                name = name[:-len(form)]
+                stripped = True
+                break
+    return name
+
+
+def pattern(kind: str, value: str) -> str:
+    """The pattern a watchlist entry is matched with, ValueError if there is nothing to match."""
+    if kind == 'uid':
+        uid = normalise_uid(value)
+        if len(uid) != 12:
+            raise ValueError(f'Ungültige UID: {value}')
+        return 'uid:' + uid
+    if kind == 'name':
+        found = strip_legal_form(normalise(value))
+        # a legal form alone ("AG") would match nearly every publication
+        if not found or tuple(found) in LEGAL_FORMS:
+            raise ValueError(f'Kein Firmenname: {value}')
+        return ' '.join(found)
+    if kind == 'person':
+        found = normalise(value)
+        if not found:
+            raise ValueError(f'Kein Name: {value}')
+        # "Hans Muster" is published as "Muster, Hans"
+        alternatives = [found, found[-1:] + found[:-1]] if len(found) > 1 else [found]
+        return '|'.join(dict.fromkeys(' '.join(words_) for words_ in alternatives))
+    raise ValueError(f'unknown kind {kind}')
+
+
+class Automaton(object):
+    """
+    Aho-Corasick automaton over words instead of characters: finds all patterns
+    (sequences of words) occurring in a text in one pass over the text, at a cost that
+    depends on the length of the text and the number of hits, but not on the number
+    of patterns. Transitions live in one dict keyed by state * vocabulary size + word,
+    words no pattern contains send the automaton straight back to the root.
+    """
+
+    def __init__(self, patterns: Sequence[Sequence[str]]):
+        vocabulary = {}  # type: Dict[str, int]
+        for words_ in patterns:
+            for word in words_:
+                vocabulary.setdefault(word, len(vocabulary))
+        width = max(len(vocabulary), 1)
+        goto = {}  # type: Dict[int, int]
+        output = {}  # type: Dict[int, List[int]]
+        children = [[]]  # type: List[List[Tuple[int, int]]]
+        for i, words_ in enumerate(patterns):
+            if not words_:
+                continue
+            state = 0
+            for word in words_:
+                key = state * width + vocabulary[word]
+                child = goto.get(key)
+                if child is None:
+                    child = goto[key] = len(children)
+                    children.append([])
+                    children[state].append((vocabulary[word], child))
+                state = child
+            output.setdefault(state, []).append(i)
+
+        # failure links breadth first, so the link of every shorter suffix is known already
+        fail = [0] * len(children)
+        queue = deque(child for _, child in children[0])
+        while queue:
+            state = queue.popleft()
+            for word, child in children[state]:
+                target = fail[state]
+                while target and target * width + word not in goto:
+                    target = fail[target]
+                target = goto.get(target * width + word, 0)
+                fail[child] = target
+                if target in output:
+                    output[child] = output.get(child, []) + output[target]
+                queue.append(child)
+
+        self.vocabulary = vocabulary
+        self.width = width
+        self.goto = goto
+        self.fail = fail
+        self.output = {state: tuple(found) for state, found in output.items()}
+
+    @property
+    def states(self) -> int:
+        return len(self.fail)
+
+    def find(self, *texts: Iterable[str]) -> Set[int]:
+        """Indexes of the patterns occurring in any of `texts` (word sequences, matched separately)."""
+        vocabulary, width, goto, fail, output = self.vocabulary, self.width, self.goto, self.fail, self.output
+        found = set()
+        for text in texts:
+            state = 0
+            for word in text:
+                word = vocabulary.get(word)
+                if word is None:
+                    state = 0
+                    continue
+                while state and state * width + word not in goto:
+                    state = fail[state]
+                state = goto.get(state * width + word, 0)
+                if state in output:
+                    found.update(output[state])
+        return found
+
+
+class Matcher(object):
+    """The entries of all watchlists compiled into one automaton."""
+
+    def __init__(self, entries: Iterable[Tuple[int, int, str]]):
+        # (entry, watchlist, pattern); entries with the same pattern share it
+        patterns = {}  # type: Dict[str, int]
+        targets = []  # type: List[List[Tuple[int, int]]]
+        for entry, watchlist, pattern_ in entries:
+            for alternative in pattern_.split('|'):
+                i = patterns.get(alternative)
+                if i is None:
+                    i = patterns[alternative] = len(targets)
+                    targets.append([])
+                targets[i].append((entry, watchlist))
+        self.automaton = Automaton([alternative.split() for alternative in patterns])
+        self.targets = targets
+
+    def match(self, publication: Publication) -> Set[Tuple[int, int]]:
+        """(entry, watchlist) of every entry found in `publication`."""
+        uids = [uid for uid in publication.uid.split(';') if uid]
+        uids.extend(normalise_uid(uid) for uid in _UID_RE.findall(publication.message))
+        found = self.automaton.find(normalise(publication.name), normalise(publication.title),
+                                    normalise(publication.message), ['uid:' + uid for uid in uids])
+        targets = self.targets
+        return {target for i in found for target in targets[i]}
+
+
+class Watchlists(object):
+    """
+    Users' watchlists of company names, UIDs and persons, kept in SQLite, and the hits
+    found for them in the SHAB index. `scan` matches only the publications added since
+    the last scan, against all watchlists of all users at once.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._matcher = None  # type: Optional[Tuple[int, Matcher]]
+        self._lock = threading.Lock()
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            # transactions are begun explicitly, see _transaction
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        # IMMEDIATE takes the write lock up front, so the checks at its start still hold at
+        # the commit
+        db = self._connect()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    @staticmethod
+    def _state(db: sqlite3.Connection, key: str) -> int:
+        row = db.execute('SELECT value FROM state WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _changed(db: sqlite3.Connection) -> None:
+        db.execute("INSERT INTO state VALUES ('version', 1) ON CONFLICT (key) DO UPDATE SET value = value + 1")
+
+    def add(self, user: str, name: str, entries: Sequence[Tuple[str, str]]) -> int:
+        """Adds a watchlist of (kind, value) entries, returns its id. ValueError for entries that cannot match."""
+        patterns = [(kind, value.strip(), pattern(kind, value)) for kind, value in entries if value.strip()]
+        if not patterns:
+            raise ValueError('Die Watchlist ist leer')
+        with self._transaction() as db:
+            watchlist = db.execute('INSERT INTO watchlists (user, name) VALUES (?, ?)', (user, name)).lastrowid
+            db.executemany('INSERT INTO entries (watchlist, kind, value, pattern) VALUES (?, ?, ?, ?)',
+                           [(watchlist,) + entry for entry in patterns])
+            self._changed(db)
+        return watchlist
+
+    def delete(self, user: str, watchlist: int) -> bool:
+        """Deletes one of the user's watchlists with its hits, False if there is no such watchlist."""
+        with self._transaction() as db:
+            if not db.execute('DELETE FROM watchlists WHERE id = ? AND user = ?', (watchlist, user)).rowcount:
+                return False
+            db.execute('DELETE FROM entries WHERE watchlist = ?', (watchlist,))
+            db.execute('DELETE FROM hits WHERE watchlist = ?', (watchlist,))
+            self._changed(db)
+        return True
+
+    def watchlists(self, user: str) -> List[Dict]:
+        db = self._connect()
+        found = {id_: {'id': id_, 'name': name, 'entries': []} for id_, name in db.execute(
+            'SELECT id, name FROM watchlists WHERE user = ? ORDER BY id', (user,))}
+        if found:
+            for watchlist, kind, value in db.execute(
+                    'SELECT watchlist, kind, value FROM entries WHERE watchlist IN (%s) ORDER BY id'
+                    % ','.join('?' * len(found)), list(found)):
+                found[watchlist]['entries'].append({'kind': kind, 'value': value})
+        return list(found.values())
+
+    def hits(self, user: str, limit: int = 50) -> List[Dict]:
+        """The user's latest hits, with the watchlist and the entries that matched."""
+        rows = self._connect().execute(
+            'SELECT w.name, h.publication, h.number, h.date, h.type, h.name, h.title, group_concat(e.value, ", ") '
+            'FROM hits h JOIN watchlists w ON w.id = h.watchlist JOIN entries e ON e.id = h.entry '
+            'WHERE w.user = ? GROUP BY h.watchlist, h.publication ORDER BY h.date DESC, h.publication DESC LIMIT ?',
+            (user, limit))
+        return [dict(zip(('watchlist', 'publication', 'number', 'date', 'type', 'name', 'title', 'entries'), row))
+                for row in rows]
+
+    def _current_matcher(self) -> Tuple[int, Matcher]:
+        # (version of the watchlists, automaton over their entries)
+        db = self._connect()
+        version = self._state(db, 'version')
+        with self._lock:
+            if self._matcher is None or self._matcher[0] != version:
+                self._matcher = (version, Matcher(db.execute('SELECT id, watchlist, pattern FROM entries')))
+            return self._matcher
+
+    def matcher(self) -> Matcher:
+        """The automaton over all current entries, rebuilt only when the watchlists changed."""
+        return self._current_matcher()[1]
+
+    def scan(self, index: ShabIndex, batch_size: int = 1000) -> Tuple[int, int]:
+        """
+        Matches the publications added to `index` since the last scan against all
+        watchlists and records the hits, returns (publications scanned, hits).
+        """
+        scanned = found = 0
+        while True:
+            # matched outside the transaction, which only writes the hits and moves the
+            # cursor; if another scan got there first or a watchlist changed in the
+            # meantime, the batch is matched again
+            version, matcher = self._current_matcher()
+            last = self._state(self._connect(), 'last_publication')
+            batch = index.since(last, batch_size)
+            if not batch:
+                break
+            hits = []
+            for id_, publication in batch:
+                for entry, watchlist in matcher.match(publication):
+                    hits.append((watchlist, id_, entry, publication.number, publication.date, publication.type,
+                                 publication.name, publication.title))
+            with self._transaction() as db:
+                if self._state(db, 'last_publication') != last or self._state(db, 'version') != version:
+                    continue
+                db.executemany('INSERT OR IGNORE INTO hits VALUES (?, ?, ?, ?, ?, ?, ?, ?)', hits)
+                db.execute('INSERT OR REPLACE INTO state VALUES (?, ?)', ('last_publication', batch[-1][0]))
+            scanned += len(batch)
+            found += len(hits)
+            if len(batch) < batch_size:
+                break
+        return scanned, found
+
+    def watch(self, index: ShabIndex, interval: float) -> None:
+        """Scans every `interval` seconds until interrupted, a failed scan is logged and retried."""
+        while True:
+            try:
+                self.scan(index)
+            except Exception:
+                logging.getLogger(__name__).exception('watchdog scan failed')
+            time.sleep(interval)